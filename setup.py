@@ -20,6 +20,7 @@ setup(
         "langchain>=0.3.0",
         "langchain-openai>=0.3.0",
         "langgraph>=0.2.0",
+        "langgraph-checkpoint-sqlite>=2.0.0",
         "rich>=13.0.0",
         "python-dotenv>=1.0.0",
         "langfuse>=2.0.0",
@@ -27,6 +28,9 @@ setup(
     entry_points={
         "console_scripts": [
             "codebase-analyst=src.cli:main",
+            "codebase-analyst-batch=src.batch:main",
+            "codebase-analyst-server=src.server:main",
+            "codebase-analyst-bench=src.benchmark:main",
         ],
     },
     classifiers=[
@@ -1,8 +1,8 @@
 """Codebase Analyst Agent - Source Package."""
 
 from .cli import main
-from .agent import create_codebase_agent
+from .agent import clear_agent_cache, create_codebase_agent
 
 __version__ = "1.2.0"
 
-__all__ = ["main", "create_codebase_agent"]
+__all__ = ["main", "create_codebase_agent", "clear_agent_cache"]
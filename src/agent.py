@@ -2,38 +2,72 @@
 
 Este módulo cria e configura o agente usando LangGraph, que é a API
 atual e recomendada do ecossistema LangChain para criação de agentes.
+
+Modelos e agentes compilados ficam em cache no processo, indexados pelo
+nome do modelo e pelos kwargs efetivos. Assim, um serviço de longa duração
+que chama `create_codebase_agent` a cada requisição reaproveita o grafo
+compilado e o client HTTP (e seu pool de conexões) do modelo.
 """
 
+import threading
+from typing import Any
+
 from langchain.agents import create_agent
-from langchain.chat_models import init_chat_model
+from langchain.chat_models import BaseChatModel, init_chat_model
+from langchain.rate_limiters import BaseRateLimiter
+from .profiling import ProfilingMiddleware, current_profile
+from .dedup import DedupMiddleware
+from .prefetch import PrefetchMiddleware
+from .prompt_cache import PromptCachingMiddleware
 from .prompts import SYSTEM_PROMPT, SUMMARIZATION_PROMPT
-from .tools import list_dir, read_file, write_file, remove_draft_file
+from .tools import (
+    import_graph,
+    list_dir,
+    next_files_to_read,
+    notes,
+    outline,
+    read_file,
+    remove_draft_file,
+    search_code,
+    write_file,
+)
 
+# Caches do processo: chave -> instância
+_MODEL_CACHE: dict[tuple, Any] = {}
+_AGENT_CACHE: dict[tuple, Any] = {}
+_CACHE_LOCK = threading.Lock()
 
-def create_codebase_agent(model_name: str = "anthropic:claude-sonnet-4-5"):
-    """Cria e retorna o agente de análise de codebase.
 
-    Args:
-        model_name: Nome do modelo no formato 'provider:model' ou apenas 'model'.
-                   Exemplos:
-                   - 'openai:gpt-4o-mini' ou 'gpt-4o-mini' (OpenAI)
-                   - 'anthropic:claude-3-5-sonnet-20241022' (Anthropic)
-                   - 'groq:llama-3.3-70b-versatile' (Groq)
-                   - 'google:gemini-2.0-flash-exp' (Google)
+def _freeze(value: Any) -> Any:
+    """Converte kwargs em uma chave hashable e estável para os caches.
 
-    Returns:
-        Agente configurado pronto para uso
+    Raises:
+        TypeError: Se algum valor não for hashable. O chamador não usa o cache:
+            a identidade (`id()`) pode ser reaproveitada por outro objeto.
     """
-    # Parse do provider e model name
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(v) for v in value)
+    hash(value)
+    return value
+
+
+def parse_model_name(model_name: str) -> tuple[str, str]:
+    """Separa 'provider:model' em (provider, model). Default: OpenAI."""
     if ":" in model_name:
         provider, model = model_name.split(":", 1)
     else:
         # Default para OpenAI se não especificado
         provider = "openai"
         model = model_name
+    return provider.strip(), model.strip()
+
 
+def _default_model_kwargs(provider: str, model: str) -> dict[str, Any]:
+    """Kwargs padrão de `init_chat_model` para o provider/modelo."""
     # Configurações base do modelo
-    model_kwargs = {
+    model_kwargs: dict[str, Any] = {
         "temperature": 0.3,  # Baixa temperatura para outputs consistentes
     }
 
@@ -44,24 +78,180 @@ def create_codebase_agent(model_name: str = "anthropic:claude-sonnet-4-5"):
         if (model.startswith("o") or model.startswith("gpt-5")):
             model_kwargs["reasoning_effort"] = "medium"
 
+    return model_kwargs
+
+
+def get_chat_model(
+    model_name: str | BaseChatModel,
+    rate_limiter: BaseRateLimiter | None = None,
+    model_kwargs: dict[str, Any] | None = None,
+    use_cache: bool = True,
+):
+    """Retorna o chat model para `model_name`, reaproveitando instâncias em cache.
+
+    Args:
+        model_name: Nome do modelo no formato 'provider:model' ou apenas 'model'.
+                   Uma instância de `BaseChatModel` é devolvida sem alterações.
+        rate_limiter: Limiter opcional aplicado às chamadas do modelo.
+        model_kwargs: Kwargs extras de `init_chat_model` (sobrescrevem os defaults).
+        use_cache: Se False, sempre cria uma instância nova.
+
+    Returns:
+        Instância de `BaseChatModel`.
+    """
+    if isinstance(model_name, BaseChatModel):
+        return model_name
+
+    provider, model = parse_model_name(model_name)
+    kwargs = _default_model_kwargs(provider, model)
+    kwargs.update(model_kwargs or {})
+    if rate_limiter is not None:
+        kwargs["rate_limiter"] = rate_limiter
+
+    try:
+        key = (provider, model, _freeze(kwargs))
+    except TypeError:
+        use_cache = False
+    if use_cache:
+        with _CACHE_LOCK:
+            cached = _MODEL_CACHE.get(key)
+        if cached is not None:
+            return cached
 
     # Inicializar o modelo usando init_chat_model
-    model = init_chat_model(
+    chat_model = init_chat_model(
         model=model,
         model_provider=provider,
-        **model_kwargs
+        **kwargs
+    )
+
+    if use_cache:
+        with _CACHE_LOCK:
+            chat_model = _MODEL_CACHE.setdefault(key, chat_model)
+    return chat_model
+
+
+def clear_agent_cache() -> None:
+    """Descarta todos os modelos e agentes em cache."""
+    with _CACHE_LOCK:
+        _MODEL_CACHE.clear()
+        _AGENT_CACHE.clear()
+
+
+def create_codebase_agent(
+    model_name: str | BaseChatModel = "anthropic:claude-sonnet-4-5",
+    rate_limiter: BaseRateLimiter | None = None,
+    model_kwargs: dict[str, Any] | None = None,
+    use_cache: bool = True,
+    checkpointer: Any = None,
+    system_prompt: str | None = None,
+    prompt_cache: bool = True,
+    summary_model: str | BaseChatModel | None = None,
+    summarizer: str = "model",
+    prefetch: bool = True,
+    dedup: bool = True,
+):
+    """Cria e retorna o agente de análise de codebase.
+
+    Args:
+        model_name: Nome do modelo no formato 'provider:model' ou apenas 'model'.
+                   Exemplos:
+                   - 'openai:gpt-4o-mini' ou 'gpt-4o-mini' (OpenAI)
+                   - 'anthropic:claude-3-5-sonnet-20241022' (Anthropic)
+                   - 'groq:llama-3.3-70b-versatile' (Groq)
+                   - 'google:gemini-2.0-flash-exp' (Google)
+                   Também aceita uma instância de `BaseChatModel` já configurada
+                   (ex.: o modelo determinístico do benchmark).
+        rate_limiter: Limiter opcional aplicado às chamadas do modelo. Permite
+                   que várias análises (ex.: modo batch) dividam a mesma cota.
+        model_kwargs: Kwargs extras de `init_chat_model` (sobrescrevem os defaults).
+        use_cache: Se True (padrão), reaproveita o agente compilado e o modelo
+                   criados anteriormente com os mesmos parâmetros. O grafo não
+                   guarda estado entre execuções, então pode ser reutilizado.
+                   Agentes com `checkpointer` ou com parâmetros não-hashable
+                   (ex.: uma instância de modelo) nunca vêm do cache.
+        checkpointer: Checkpointer do LangGraph (ex.: `checkpoints.create_checkpointer()`).
+                   Com ele, o estado é gravado a cada passo sob o `thread_id`
+                   da config e a execução pode ser retomada.
+        system_prompt: System prompt do agente (padrão: `SYSTEM_PROMPT`). O modo
+                   map-reduce usa prompts próprios para os sub-agentes e o reduce.
+        prompt_cache: Se True (padrão), marca o prefixo estático (tools + system
+                   prompt) e o histórico para o cache de prompt do provider
+                   (breakpoints `cache_control` na Anthropic).
+        summary_model: Modelo usado só nas sumarizações de contexto (ex.: um modelo
+                   menor e mais rápido). Padrão: o mesmo modelo do agente.
+        summarizer: 'model' (resumo pelo `summary_model`, com o extrativo local
+                   como fallback em caso de erro) ou 'extractive' (sem LLM).
+        prefetch: Se True (padrão), aquece em segundo plano o cache do `read_file`
+                   com os arquivos que o agente deve ler em seguida.
+        dedup: Se True (padrão), trechos do `read_file` iguais a leituras
+                   anteriores ainda no contexto viram referências curtas.
+
+    Returns:
+        Agente configurado pronto para uso
+    """
+    system_prompt = system_prompt or SYSTEM_PROMPT
+    if checkpointer is not None:
+        # O checkpointer é da execução (a conexão é fechada ao final): o grafo não é compartilhado
+        use_cache = False
+    try:
+        key = (
+            _freeze(model_name),
+            rate_limiter,
+            _freeze(model_kwargs or {}),
+            system_prompt,
+            prompt_cache,
+            _freeze(summary_model),
+            summarizer,
+            prefetch,
+            dedup,
+        )
+    except TypeError:
+        use_cache = False
+    profile = current_profile()
+    if use_cache:
+        with _CACHE_LOCK:
+            cached = _AGENT_CACHE.get(key)
+        if cached is not None:
+            if profile is not None:
+                profile.incr("agent_cache_hits")
+            return cached
+    if profile is not None:
+        profile.incr("agent_cache_misses")
+
+    model = get_chat_model(
+        model_name,
+        rate_limiter=rate_limiter,
+        model_kwargs=model_kwargs,
+        use_cache=use_cache,
     )
 
     # Lista de tools
-    tools = [list_dir, read_file, write_file, remove_draft_file]
+    tools = [
+        list_dir,
+        import_graph,
+        next_files_to_read,
+        outline,
+        search_code,
+        read_file,
+        notes,
+        write_file,
+        remove_draft_file,
+    ]
 
     from langchain.agents.middleware import TodoListMiddleware, ClearToolUsesEdit, ContextEditingMiddleware, ToolRetryMiddleware
     from .summarization import SummarizationMiddleware
 
     # Criar o agente usando create_react_agent do langgraph
     # Esta é a API atual e recomendada para criação de agentes
+    summary_chat_model = None
+    if summary_model is not None and summarizer == "model":
+        summary_chat_model = get_chat_model(summary_model, rate_limiter=rate_limiter, use_cache=use_cache)
+
     sum_middleware = SummarizationMiddleware(
         model=model,
+        summary_model=summary_chat_model,
+        summarizer=summarizer,
         trigger=("fraction", 0.5),       # Aumentado: sumariza menos frequentemente
         keep=("fraction", 0.2),          # Aumentado: mantém 50% do contexto após sumarização
         trim_tokens_to_summarize=6000,   # Aumentado: sumariza com mais informação de contexto
@@ -82,11 +272,25 @@ def create_codebase_agent(model_name: str = "anthropic:claude-sonnet-4-5"):
     tool_retry = ToolRetryMiddleware(tools=tools, retry_on=Exception)
     todo_middlware = TodoListMiddleware()
 
+    middleware = [ProfilingMiddleware(), sum_middleware, todo_middlware, tool_retry]
+    if dedup:
+        middleware.append(DedupMiddleware())
+    if prefetch:
+        middleware.append(PrefetchMiddleware())
+    if prompt_cache:
+        # Por último (mais interno): precisa ver o system prompt já com as instruções do TodoList
+        middleware.append(PromptCachingMiddleware())
+
     agent = create_agent(
         model=model,
-        middleware=[sum_middleware, todo_middlware, tool_retry],
+        # ProfilingMiddleware fica por fora para medir o custo total de cada chamada
+        middleware=middleware,
         tools=tools,
-        system_prompt=SYSTEM_PROMPT,
+        system_prompt=system_prompt,
+        checkpointer=checkpointer,
     )
 
-    return agent
\ No newline at end of file
+    if use_cache:
+        with _CACHE_LOCK:
+            agent = _AGENT_CACHE.setdefault(key, agent)
+    return agent
@@ -0,0 +1,429 @@
+"""Estado persistido das análises, para reanálises incrementais.
+
+Depois de cada execução bem-sucedida da tarefa `onboarding`, gravamos em
+`<repo>/.codebase-analyst/state.json`:
+
+  - as impressões digitais dos arquivos do repositório (`file_index`);
+  - o HEAD do git no momento da análise (quando o repositório é git);
+  - as notas que o agente escreveu no DRAFT.md, indexadas por arquivo;
+  - o mapeamento seção do ONBOARDING.md -> arquivos citados nela.
+
+Numa nova execução com `--incremental`, as mudanças são detectadas pelo git
+(ou, sem git, por mtime/tamanho/hash) e o agente recebe um prompt de
+atualização: lê apenas os arquivos alterados e reescreve apenas as seções
+que dependem deles em `ONBOARDING.update.md`, que é mesclado ao documento
+existente. Sem mudanças, nenhuma chamada ao modelo é feita.
+"""
+
+import json
+import os
+import re
+import subprocess
+import time
+from pathlib import Path
+from typing import Any
+
+from .file_index import file_sha1, fingerprint_repo, is_indexed_path
+
+STATE_DIR = ".codebase-analyst"
+STATE_FILE = "state.json"
+STATE_VERSION = 1
+
+DOCUMENT_FILE = "ONBOARDING.md"
+DRAFT_FILE = "DRAFT.md"
+UPDATE_FILE = "ONBOARDING.update.md"
+
+# Arquivos produzidos pelo próprio agente (não contam como mudanças do repositório)
+_GENERATED = {DOCUMENT_FILE, DRAFT_FILE, UPDATE_FILE}
+
+# Acima dessa fração de arquivos alterados, uma análise completa sai mais barata
+FULL_RUN_CHANGE_RATIO = 0.4
+
+_MAX_NOTES_CHARS = 200_000
+_MAX_PROMPT_FILES = 200
+_MAX_PROMPT_NOTES_CHARS = 12_000
+
+_PATH_TOKEN = re.compile(r"[\w./\\-]+\.[A-Za-z0-9]+|[\w-]+/[\w./-]+")
+_HEADING = re.compile(r"^##\s+(.+?)\s*#*\s*$")
+
+
+def state_path(repo: Path) -> Path:
+    return Path(repo) / STATE_DIR / STATE_FILE
+
+
+def load_state(repo: Path) -> dict[str, Any] | None:
+    try:
+        state = json.loads(state_path(repo).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if state.get("version") != STATE_VERSION:
+        return None
+    return state
+
+
+def save_state(repo: Path, state: dict[str, Any]) -> Path:
+    """Grava o estado de forma atômica (arquivo temporário + rename)."""
+    path = state_path(repo)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(state, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
+    return path
+
+
+# ---------------------------------------------------------------------------
+# git
+# ---------------------------------------------------------------------------
+
+
+def _git(repo: Path, *args: str) -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "-C", str(repo), *args],
+            capture_output=True,
+            text=True,
+            timeout=30,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout if result.returncode == 0 else None
+
+
+def git_head(repo: Path) -> str | None:
+    out = _git(repo, "rev-parse", "HEAD")
+    return out.strip() if out else None
+
+
+def git_candidates(repo: Path, since: str) -> set[str] | None:
+    """Arquivos possivelmente alterados desde o commit `since` (relativos a `repo`).
+
+    Inclui mudanças commitadas, staged, não staged e arquivos não rastreados.
+    Retorna None se o git não puder responder (ex.: commit inexistente).
+    """
+    diff = _git(repo, "diff", "--name-only", "--relative", since)
+    untracked = _git(repo, "ls-files", "--others", "--exclude-standard")
+    if diff is None or untracked is None:
+        return None
+    return {line.strip() for line in (diff + untracked).splitlines() if line.strip()}
+
+
+# ---------------------------------------------------------------------------
+# Seções e referências a arquivos
+# ---------------------------------------------------------------------------
+
+
+def split_sections(markdown: str) -> list[tuple[str, str]]:
+    """Divide um Markdown em seções de nível 2: [(título, texto completo)].
+
+    O texto antes do primeiro `## ` vira a seção de título vazio.
+    """
+    sections: list[tuple[str, list[str]]] = [("", [])]
+    in_fence = False
+    for line in markdown.splitlines(keepends=True):
+        if line.lstrip().startswith("```"):
+            in_fence = not in_fence
+        match = None if in_fence else _HEADING.match(line.rstrip("\n"))
+        if match:
+            sections.append((match.group(1).strip(), [line]))
+        else:
+            sections[-1][1].append(line)
+    result = [(title, "".join(lines)) for title, lines in sections]
+    if result and result[0][0] == "" and not result[0][1].strip():
+        result = result[1:]
+    return result
+
+
+def _normalize_title(title: str) -> str:
+    return re.sub(r"[^\w]+", " ", title.lower()).strip()
+
+
+class _PathMatcher:
+    """Encontra referências a arquivos do repositório em um texto."""
+
+    def __init__(self, files: list[str]) -> None:
+        # Todo sufixo de caminho ("a/b/c.py", "b/c.py", "c.py") -> arquivos
+        self.by_suffix: dict[str, list[str]] = {}
+        for rel in files:
+            parts = rel.split("/")
+            for i in range(len(parts)):
+                self.by_suffix.setdefault("/".join(parts[i:]), []).append(rel)
+
+    def find(self, text: str) -> set[str]:
+        found: set[str] = set()
+        for token in _PATH_TOKEN.findall(text):
+            token = token.replace("\\", "/").strip("./")
+            matches = self.by_suffix.get(token)
+            if not matches:
+                continue
+            if token in matches:
+                found.add(token)
+            elif "/" in token or len(matches) == 1:
+                # Nomes de arquivo isolados só valem quando não são ambíguos
+                found.update(matches)
+        return found
+
+
+def map_section_sources(markdown: str, files: list[str]) -> dict[str, list[str]]:
+    """Mapeia cada seção do documento para os arquivos do repositório citados nela."""
+    matcher = _PathMatcher(files)
+    return {title: sorted(matcher.find(text)) for title, text in split_sections(markdown)}
+
+
+def notes_by_file(notes: str, files: list[str]) -> dict[str, str]:
+    """Agrupa os parágrafos das notas do DRAFT.md pelos arquivos que eles citam."""
+    matcher = _PathMatcher(files)
+    grouped: dict[str, list[str]] = {}
+    for paragraph in re.split(r"\n\s*\n", notes):
+        for rel in matcher.find(paragraph):
+            grouped.setdefault(rel, []).append(paragraph.strip())
+    return {rel: "\n\n".join(parts) for rel, parts in grouped.items()}
+
+
+# ---------------------------------------------------------------------------
+# Coleta durante a execução
+# ---------------------------------------------------------------------------
+
+
+class DraftCollector:
+    """Observa os eventos do agente e guarda as notas do DRAFT.md e os arquivos lidos.
+
+    O DRAFT.md é removido pelo agente ao final da análise; por isso o
+    conteúdo é capturado dos argumentos das chamadas a `write_file`. As
+    notas gravadas com a tool `notes` vêm do caderno do repositório
+    (`all_notes`).
+    """
+
+    def __init__(self, repo: Path) -> None:
+        self.repo = Path(repo).resolve()
+        self.notes = ""
+        self.files_read: set[str] = set()
+
+    def _relative(self, path: str) -> str | None:
+        try:
+            return Path(path).resolve().relative_to(self.repo).as_posix()
+        except (ValueError, OSError):
+            return None
+
+    def observe(self, event: dict[str, Any]) -> None:
+        if event.get("type") != "tool_call":
+            return
+        args = event.get("args") or {}
+        rel = self._relative(str(args.get("path", "")))
+        if rel is None:
+            return
+        if event.get("name") == "read_file":
+            self.files_read.add(rel)
+        elif event.get("name") == "write_file" and rel == DRAFT_FILE:
+            content = str(args.get("content") or "")
+            self.notes = f"{self.notes}\n\n{content}" if args.get("append") and self.notes else content
+
+    def all_notes(self) -> str:
+        """Notas do DRAFT.md somadas às do documento `draft` do caderno (`notes`)."""
+        from .draft_store import get_store  # import tardio: draft_store importa este módulo
+
+        stored = get_store(self.repo).render_markdown("draft")
+        return "\n\n".join(part for part in (self.notes.strip(), stored.strip()) if part)
+
+
+# ---------------------------------------------------------------------------
+# Planejamento e aplicação das atualizações
+# ---------------------------------------------------------------------------
+
+
+class IncrementalPlan:
+    """Resultado da comparação do repositório com o estado da última análise.
+
+    Attributes:
+        mode: 'unchanged' (nada a fazer), 'update' (atualizar seções) ou
+            'full' (análise completa; ver `reason`).
+    """
+
+    def __init__(self, mode: str, reason: str = "", state: dict[str, Any] | None = None) -> None:
+        self.mode = mode
+        self.reason = reason
+        self.state = state
+        self.modified: list[str] = []
+        self.added: list[str] = []
+        self.deleted: list[str] = []
+        self.sections: list[str] = []
+        self.detection = ""
+
+    @property
+    def changed(self) -> list[str]:
+        return sorted({*self.modified, *self.added, *self.deleted})
+
+
+def _detect_changes(repo: Path, state: dict[str, Any]) -> tuple[list[str], list[str], list[str], str]:
+    files: dict[str, dict[str, Any]] = state.get("files", {})
+    head = state.get("git_head")
+    candidates = git_candidates(repo, head) if head else None
+
+    modified, added, deleted = [], [], []
+    if candidates is not None:
+        # git aponta candidatos; o hash confirma (ex.: arquivo tocado sem mudança real)
+        for rel in sorted(c for c in candidates - _GENERATED if is_indexed_path(c)):
+            path = repo / rel
+            old = files.get(rel)
+            if not path.is_file():
+                if old:
+                    deleted.append(rel)
+            elif old is None:
+                added.append(rel)
+            elif old.get("sha1") != file_sha1(path):
+                modified.append(rel)
+        return modified, added, deleted, "git"
+
+    current = fingerprint_repo(repo, previous=files)
+    for rel in sorted(set(current) - _GENERATED):
+        old = files.get(rel)
+        if old is None:
+            added.append(rel)
+        elif old.get("sha1") != current[rel].get("sha1"):
+            modified.append(rel)
+    deleted = sorted(set(files) - set(current) - _GENERATED)
+    return modified, added, deleted, "mtime"
+
+
+def plan_incremental(repo: Path) -> IncrementalPlan:
+    """Decide como atualizar o ONBOARDING.md de `repo` em relação à última análise."""
+    repo = Path(repo).resolve()
+    if not (repo / DOCUMENT_FILE).exists():
+        return IncrementalPlan("full", f"{DOCUMENT_FILE} não existe")
+    state = load_state(repo)
+    if state is None:
+        return IncrementalPlan("full", "nenhum estado de análise anterior")
+
+    modified, added, deleted, detection = _detect_changes(repo, state)
+    total = max(1, len(state.get("files", {})))
+    plan = IncrementalPlan("update", state=state)
+    plan.modified, plan.added, plan.deleted, plan.detection = modified, added, deleted, detection
+
+    if not plan.changed:
+        plan.mode = "unchanged"
+        return plan
+    if len(plan.changed) / total > FULL_RUN_CHANGE_RATIO:
+        plan.mode = "full"
+        plan.reason = f"{len(plan.changed)} de {total} arquivos mudaram"
+        return plan
+
+    changed = set(plan.changed)
+    structural = bool(added or deleted)
+    for title, sources in state.get("sections", {}).items():
+        if changed.intersection(sources) or (structural and not sources):
+            plan.sections.append(title)
+    return plan
+
+
+def build_update_message(repo: Path, plan: IncrementalPlan) -> str:
+    """Prompt da reanálise incremental (apenas arquivos e seções afetados)."""
+    repo = Path(repo).resolve()
+
+    def _listing(label: str, items: list[str]) -> str:
+        if not items:
+            return ""
+        shown = "\n".join(f"  - {rel}" for rel in items[:_MAX_PROMPT_FILES])
+        extra = f"\n  - ... e mais {len(items) - _MAX_PROMPT_FILES}" if len(items) > _MAX_PROMPT_FILES else ""
+        return f"{label}:\n{shown}{extra}\n"
+
+    notes_index = (plan.state or {}).get("notes", {})
+    notes = ""
+    for rel in plan.changed:
+        if rel in notes_index and len(notes) < _MAX_PROMPT_NOTES_CHARS:
+            notes += f"\n### {rel}\n{notes_index[rel]}\n"
+    notes = notes[:_MAX_PROMPT_NOTES_CHARS]
+
+    sections = "\n".join(f"  - ## {title}" for title in plan.sections if title) or (
+        "  - (nenhuma seção existente cita esses arquivos; crie seções novas apenas se necessário)"
+    )
+    return (
+        f"O arquivo {DOCUMENT_FILE} em '{repo}' foi gerado por uma análise anterior e está atualizado, "
+        f"exceto pelas mudanças abaixo.\n\n"
+        + _listing("Arquivos modificados", plan.modified)
+        + _listing("Arquivos adicionados", plan.added)
+        + _listing("Arquivos removidos", plan.deleted)
+        + f"\nSeções de {DOCUMENT_FILE} afetadas:\n{sections}\n"
+        + (f"\nNotas da análise anterior sobre esses arquivos:\n{notes}\n" if notes else "")
+        + f"\nLeia apenas os arquivos alterados (e, se necessário, os que dependem deles) e reescreva "
+        f"SOMENTE as seções afetadas, completas e com os mesmos títulos (sem o '## '), uma a uma com "
+        f"notes(path='{repo}', action='upsert', document='onboarding', section=<título>, content=...). "
+        f"Depois chame notes(path='{repo}', action='render') uma vez: nesta reanálise ele grava "
+        f"'{repo / UPDATE_FILE}', que é mesclado ao {DOCUMENT_FILE}. Não use write_file para o "
+        f"documento, não reescreva as demais seções e não refaça a exploração completa do repositório."
+    )
+
+
+def apply_section_updates(repo: Path) -> list[str]:
+    """Mescla `ONBOARDING.update.md` no `ONBOARDING.md` seção a seção.
+
+    Seções com o mesmo título são substituídas; seções novas são anexadas
+    ao final. O arquivo de atualização é removido.
+
+    Returns:
+        Títulos das seções atualizadas ou adicionadas.
+    """
+    repo = Path(repo)
+    update_path = repo / UPDATE_FILE
+    document_path = repo / DOCUMENT_FILE
+    if not update_path.exists():
+        return []
+    updates = [(t, text) for t, text in split_sections(update_path.read_text(encoding="utf-8")) if t]
+    sections = split_sections(document_path.read_text(encoding="utf-8")) if document_path.exists() else []
+
+    positions = {_normalize_title(title): i for i, (title, _) in enumerate(sections) if title}
+    sections = [(title, text.rstrip("\n") + "\n\n") for title, text in sections]
+    applied = []
+    for title, text in updates:
+        text = text.rstrip("\n") + "\n\n"
+        key = _normalize_title(title)
+        if key in positions:
+            sections[positions[key]] = (title, text)
+        else:
+            positions[key] = len(sections)
+            sections.append((title, text))
+        applied.append(title)
+
+    merged = "".join(text for _, text in sections).rstrip("\n") + "\n"
+    tmp = document_path.with_suffix(".md.tmp")
+    tmp.write_text(merged, encoding="utf-8")
+    os.replace(tmp, document_path)
+    update_path.unlink()
+    return applied
+
+
+def record_analysis(repo: Path, collector: DraftCollector | None = None, model: str | None = None) -> Path | None:
+    """Grava o estado da análise recém-concluída de `repo`.
+
+    As notas e os arquivos lidos em execuções anteriores são preservados e
+    atualizados com os da execução atual.
+    """
+    repo = Path(repo).resolve()
+    document_path = repo / DOCUMENT_FILE
+    if not document_path.exists():
+        return None
+    previous = load_state(repo) or {}
+    files = fingerprint_repo(repo, previous=previous.get("files"))
+    for name in _GENERATED:
+        files.pop(name, None)
+    paths = sorted(files)
+
+    raw_notes = previous.get("raw_notes", "")
+    files_read = set(previous.get("files_read", []))
+    if collector is not None:
+        notes = collector.all_notes()
+        if notes:
+            raw_notes = f"{raw_notes}\n\n{notes}" if raw_notes else notes
+        files_read |= collector.files_read
+    raw_notes = raw_notes[-_MAX_NOTES_CHARS:]
+
+    state = {
+        "version": STATE_VERSION,
+        "updated_at": time.time(),
+        "model": model,
+        "git_head": git_head(repo),
+        "files": files,
+        "files_read": sorted(files_read & set(paths)),
+        "raw_notes": raw_notes,
+        "notes": notes_by_file(raw_notes, paths),
+        "sections": map_section_sources(document_path.read_text(encoding="utf-8"), paths),
+    }
+    return save_state(repo, state)
@@ -0,0 +1,389 @@
+"""Modo batch: analisa vários repositórios em paralelo.
+
+Cada repositório é analisado em um processo de um `ProcessPoolExecutor`.
+Todos os processos compartilham um único rate limiter (hospedado em um
+`RateLimiterManager`) e reportam progresso por uma fila para o processo
+principal, que imprime o andamento e grava um manifesto JSON com tempos e
+uso de tokens por repositório.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import Manager
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from rich.console import Console
+from rich.text import Text
+
+from .token_rate_limiter import ProxyRateLimiter, RateLimiterManager
+
+console = Console()
+
+# Estado por processo worker (inicializado em `_init_worker`)
+_worker_events = None
+_worker_limiter = None
+
+
+def expand_repo_paths(patterns: list[str], from_file: str | None = None) -> list[Path]:
+    """Expande caminhos/globs em uma lista ordenada de diretórios únicos.
+
+    Args:
+        patterns: Caminhos ou padrões glob (ex.: 'repos/*').
+        from_file: Arquivo opcional com um caminho/glob por linha ('#' comenta).
+
+    Returns:
+        Lista de caminhos absolutos de diretórios existentes, sem duplicatas.
+    """
+    items = list(patterns)
+    if from_file:
+        with open(from_file, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    items.append(line)
+
+    seen: set[Path] = set()
+    repos: list[Path] = []
+    for item in items:
+        matches = glob.glob(os.path.expanduser(item)) if glob.has_magic(item) else [item]
+        for match in sorted(matches):
+            path = Path(match).expanduser().resolve()
+            if path.is_dir() and path not in seen:
+                seen.add(path)
+                repos.append(path)
+    return repos
+
+
+def _init_worker(events, limiter_proxy) -> None:
+    """Inicializa o estado de cada processo do pool."""
+    global _worker_events, _worker_limiter
+    _worker_events = events
+    _worker_limiter = ProxyRateLimiter(limiter_proxy) if limiter_proxy is not None else None
+
+
+def _emit(repo: str, kind: str, **payload) -> None:
+    if _worker_events is not None:
+        _worker_events.put({"repo": repo, "kind": kind, "time": time.time(), **payload})
+
+
+def _analyze_repo(repo: str, task: str, model_name: str, overwrite: bool, incremental: bool = False) -> dict:
+    """Analisa um repositório dentro de um processo do pool.
+
+    Nunca propaga exceções: falhas viram um resultado com status 'error'.
+    """
+    from .agent import create_codebase_agent
+    from .analysis_state import (
+        DOCUMENT_FILE,
+        UPDATE_FILE,
+        DraftCollector,
+        apply_section_updates,
+        build_update_message,
+        plan_incremental,
+        record_analysis,
+    )
+    from .draft_store import rendering_to, reset_store
+    from .profiling import RunProfile
+    from .runner import OUTPUT_FILES, prepare_output_file, run_analysis
+
+    result = {"repo": repo, "task": task, "model": model_name, "pid": os.getpid()}
+    target_path = Path(repo)
+    output_name = OUTPUT_FILES.get(task)
+
+    plan = None
+    if incremental and task == "onboarding":
+        plan = plan_incremental(target_path)
+        if plan.mode == "unchanged":
+            result["status"] = "skipped"
+            result["reason"] = "sem mudanças desde a última análise"
+            _emit(repo, "skipped", reason=result["reason"])
+            return result
+        if plan.mode == "full":
+            # Reanálise completa: o documento existente só é substituído com --overwrite
+            result["full_run_reason"] = plan.reason
+            plan = None
+
+    reason = None if plan is not None else prepare_output_file(target_path, task, overwrite)
+    if reason:
+        if result.get("full_run_reason"):
+            reason = f"{reason}; reanálise completa necessária: {result['full_run_reason']}"
+        result["status"] = "skipped"
+        result["reason"] = reason
+        _emit(repo, "skipped", reason=reason)
+        return result
+
+    _emit(repo, "started")
+    try:
+        # O agente (em cache) é reaproveitado entre repositórios do mesmo processo
+        agent = create_codebase_agent(model_name=model_name, rate_limiter=_worker_limiter)
+
+        reset_store(target_path)
+        collector = DraftCollector(target_path)
+
+        def on_event(event: dict) -> None:
+            collector.observe(event)
+            if event["type"] == "tool_call":
+                _emit(repo, "tool_call", name=event["name"])
+
+        profile = RunProfile()
+        # Na reanálise incremental, o render das notas grava só as seções reescritas
+        with rendering_to(UPDATE_FILE if plan is not None else DOCUMENT_FILE):
+            stats = run_analysis(
+                agent,
+                target_path,
+                task=task,
+                on_event=on_event,
+                profile=profile,
+                user_message=build_update_message(target_path, plan) if plan is not None else None,
+            )
+        result.update(stats.as_dict())
+        result["profile"] = profile.as_dict()
+        if task == "onboarding":
+            if plan is not None:
+                result["incremental"] = {
+                    "changed_files": len(plan.changed),
+                    "sections_updated": apply_section_updates(target_path),
+                }
+            record_analysis(target_path, collector, model=model_name)
+        result["status"] = "ok"
+        if output_name:
+            result["output"] = str(target_path / output_name)
+        _emit(repo, "finished", wall_time_s=result["wall_time_s"], tokens=result["tokens"])
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+        result["traceback"] = traceback.format_exc()
+        _emit(repo, "error", error=result["error"])
+    return result
+
+
+def _print_progress(event: dict) -> None:
+    repo_name = Path(event["repo"]).name
+    kind = event["kind"]
+    if kind == "started":
+        console.print(Text(f"  ▶ {repo_name}: iniciado", style="cyan"))
+    elif kind == "tool_call":
+        console.print(Text(f"    · {repo_name}: {event['name']}", style="white"))
+    elif kind == "finished":
+        tokens = event.get("tokens", {}).get("total", 0)
+        console.print(
+            Text(
+                f"  ✓ {repo_name}: concluído em {event['wall_time_s']:.1f}s ({tokens} tokens)",
+                style="green",
+            )
+        )
+    elif kind == "skipped":
+        console.print(Text(f"  - {repo_name}: ignorado ({event['reason']})", style="yellow"))
+    elif kind == "error":
+        console.print(Text(f"  ✖ {repo_name}: {event['error']}", style="red"))
+
+
+def _drain_events(events, stop: threading.Event, verbose: bool) -> None:
+    """Consome a fila de progresso no processo principal."""
+    while True:
+        try:
+            event = events.get(timeout=0.2)
+        except Exception:
+            if stop.is_set():
+                return
+            continue
+        if event is None:
+            return
+        if event["kind"] == "tool_call" and not verbose:
+            continue
+        _print_progress(event)
+
+
+def write_manifest(path: Path, manifest: dict) -> None:
+    """Grava o manifesto de forma atômica (arquivo temporário + rename)."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def run_batch(
+    repos: list[Path],
+    task: str = "onboarding",
+    model_name: str = "anthropic:claude-sonnet-4-5",
+    workers: int = 4,
+    requests_per_second: float | None = None,
+    overwrite: bool = False,
+    manifest_path: Path | None = None,
+    verbose: bool = False,
+    incremental: bool = False,
+) -> dict:
+    """Executa a análise de vários repositórios em um pool de processos.
+
+    Args:
+        repos: Diretórios a analisar.
+        task: Tarefa a executar em cada repositório.
+        model_name: Modelo no formato 'provider:model'.
+        workers: Número máximo de análises simultâneas.
+        requests_per_second: Cota global de chamadas ao modelo, compartilhada por
+            todos os workers. None desabilita o rate limiting.
+        overwrite: Se True, sobrescreve arquivos de saída existentes.
+        manifest_path: Onde gravar o manifesto JSON (atualizado a cada repo).
+        verbose: Se True, imprime também cada tool call.
+        incremental: Se True, repositórios já analisados só têm revisitadas as
+            seções afetadas pelos arquivos alterados (ou são ignorados, sem mudanças).
+
+    Returns:
+        O manifesto com os resultados de todos os repositórios.
+    """
+    manifest = {
+        "task": task,
+        "model": model_name,
+        "workers": workers,
+        "requests_per_second": requests_per_second,
+        "started_at": time.time(),
+        "results": [],
+    }
+
+    limiter_manager = None
+    limiter_proxy = None
+    if requests_per_second:
+        limiter_manager = RateLimiterManager()
+        limiter_manager.start()
+        limiter_proxy = limiter_manager.TokenAndRequestRateLimiter(
+            requests_per_second=requests_per_second,
+            max_request_bucket_size=max(1.0, float(workers)),
+        )
+
+    t0 = time.perf_counter()
+    with Manager() as manager:
+        events = manager.Queue()
+        stop = threading.Event()
+        drainer = threading.Thread(target=_drain_events, args=(events, stop, verbose), daemon=True)
+        drainer.start()
+
+        try:
+            with ProcessPoolExecutor(
+                max_workers=max(1, workers),
+                initializer=_init_worker,
+                initargs=(events, limiter_proxy),
+            ) as pool:
+                futures = {
+                    pool.submit(_analyze_repo, str(repo), task, model_name, overwrite, incremental): repo
+                    for repo in repos
+                }
+                for future in as_completed(futures):
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        # Falha do próprio processo (ex.: worker morto por OOM)
+                        result = {
+                            "repo": str(futures[future]),
+                            "status": "error",
+                            "error": f"{type(e).__name__}: {e}",
+                        }
+                        console.print(Text(f"  ✖ {futures[future].name}: {result['error']}", style="red"))
+                    manifest["results"].append(result)
+                    if manifest_path is not None:
+                        write_manifest(manifest_path, manifest)
+        finally:
+            events.put(None)
+            stop.set()
+            drainer.join(timeout=5)
+            if limiter_manager is not None:
+                limiter_manager.shutdown()
+
+    statuses = [r.get("status") for r in manifest["results"]]
+    manifest["wall_time_s"] = round(time.perf_counter() - t0, 3)
+    manifest["summary"] = {
+        "total": len(repos),
+        "ok": statuses.count("ok"),
+        "error": statuses.count("error"),
+        "skipped": statuses.count("skipped"),
+        "tokens": sum(r.get("tokens", {}).get("total", 0) for r in manifest["results"]),
+    }
+    if manifest_path is not None:
+        write_manifest(manifest_path, manifest)
+    return manifest
+
+
+def main():
+    """Entry point do modo batch."""
+    from .cli import print_error, validate_api_key
+
+    parser = argparse.ArgumentParser(
+        description="Codebase Analyst Agent (batch) - Analisa vários repositórios em paralelo",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Exemplos de uso:
+  codebase-analyst-batch 'repos/*' --workers 8
+  codebase-analyst-batch repo-a repo-b --task analyze --manifest resultados.json
+  codebase-analyst-batch --from-file repos.txt --requests-per-second 2 --overwrite
+        """,
+    )
+    parser.add_argument("paths", nargs="*", help="Caminhos ou globs dos repositórios")
+    parser.add_argument("--from-file", help="Arquivo com um caminho/glob por linha")
+    parser.add_argument("--model", default="anthropic:claude-sonnet-4-5", help="Modelo no formato 'provider:model'")
+    parser.add_argument("--task", default="onboarding", choices=["analyze", "onboarding"], help="Tarefa (default: onboarding)")
+    parser.add_argument("--workers", type=int, default=4, help="Análises simultâneas (default: 4)")
+    parser.add_argument(
+        "--requests-per-second",
+        type=float,
+        default=None,
+        help="Cota global de chamadas ao modelo compartilhada entre os workers (default: sem limite)",
+    )
+    parser.add_argument("--manifest", default="batch_manifest.json", help="Manifesto JSON de saída (default: batch_manifest.json)")
+    parser.add_argument("--overwrite", action="store_true", help="Sobrescreve arquivos de saída existentes sem perguntar")
+    parser.add_argument("--verbose", action="store_true", help="Mostra cada tool call no progresso")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Reanalisa só o que mudou desde a última análise de cada repositório (ideal para refresh noturno)",
+    )
+    args = parser.parse_args()
+
+    if not validate_api_key(args.model):
+        sys.exit(1)
+
+    repos = expand_repo_paths(args.paths, args.from_file)
+    if not repos:
+        print_error("Nenhum repositório encontrado para os caminhos informados.")
+        sys.exit(1)
+
+    manifest_path = Path(args.manifest).resolve()
+    console.print(Text(f"◆ Batch: {len(repos)} repositório(s), {args.workers} worker(s)", style="bold cyan"))
+
+    try:
+        manifest = run_batch(
+            repos,
+            task=args.task,
+            model_name=args.model,
+            workers=args.workers,
+            requests_per_second=args.requests_per_second,
+            overwrite=args.overwrite,
+            manifest_path=manifest_path,
+            verbose=args.verbose,
+            incremental=args.incremental,
+        )
+    except KeyboardInterrupt:
+        console.print(Text("⚠ Batch cancelado pelo usuário", style="yellow"))
+        sys.exit(130)
+
+    summary = manifest["summary"]
+    console.print()
+    console.print(
+        Text(
+            f"✓ {summary['ok']} ok, {summary['error']} com erro, {summary['skipped']} ignorado(s) "
+            f"em {manifest['wall_time_s']:.1f}s — manifesto: {manifest_path}",
+            style="green" if summary["error"] == 0 else "yellow",
+        )
+    )
+    sys.exit(1 if summary["error"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,598 @@
+"""Benchmark offline dos caminhos quentes do analista.
+
+Gera repositórios sintéticos (por padrão com 1k, 10k e 100k arquivos) e mede,
+sem nenhum acesso à rede:
+
+  - `list_dir` (listagem padrão e listagem ampla);
+  - `read_file` (amostra de arquivos pequenos e um arquivo grande paginado);
+  - contagem aproximada de tokens de um histórico de mensagens;
+  - a busca do ponto de corte do `SummarizationMiddleware`;
+  - o loop completo do agente, com um chat model determinístico
+    (`ScriptedChatModel`) que segue um roteiro fixo ou replay de uma
+    transcrição gravada de tool calls (`--transcript`).
+
+Os resultados são gravados em JSON. Com `--baseline`, cada métrica é
+comparada com um resultado anterior e o comando sai com código 1 quando
+alguma fica mais lenta que a tolerância configurada.
+"""
+
+import argparse
+import json
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import ChatGeneration, ChatResult
+from rich.console import Console
+from rich.table import Table
+
+from . import __version__
+from .agent import create_codebase_agent
+from .draft_store import reset_store
+from .profiling import RunProfile
+from .runner import prepare_output_file, run_analysis
+from .search import clear_search_cache, get_corpus
+from .summarization import SummarizationMiddleware
+from .tools import list_dir, read_file, search_code
+
+console = Console()
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+
+# Janela de contexto do modelo falso: pequena o bastante para o roteiro
+# padrão disparar ao menos uma sumarização.
+_FAKE_MAX_INPUT_TOKENS = 24_000
+
+# Arquivos por diretório nos repositórios sintéticos
+_FILES_PER_DIR = 50
+_DIRS_PER_PACKAGE = 20
+_MARKER = ".bench-repo.json"
+_REPO_FORMAT = 1
+
+_MODULE_TEMPLATE = '''"""Módulo sintético {name}."""
+
+import os
+from typing import Any
+
+from .{sibling} import helper_{sibling_idx}
+
+CONSTANT_{idx} = {value}
+
+
+class Service{idx}:
+    """Serviço sintético número {idx}."""
+
+    def __init__(self, config: dict[str, Any]) -> None:
+        self.config = config
+        self.counter = {value}
+
+{methods}
+
+def helper_{idx}(value: int) -> int:
+    """Função auxiliar de {name}."""
+    return value * {value} + len(os.sep)
+'''
+
+_METHOD_TEMPLATE = '''    def method_{m}(self, item: int) -> int:
+        """Método {m} do serviço."""
+        total = self.counter
+        for step in range(item % {mod}):
+            total += step * {m}
+        return total
+'''
+
+
+# ---------------------------------------------------------------------------
+# Repositórios sintéticos
+# ---------------------------------------------------------------------------
+
+
+def generate_synthetic_repo(root: Path, n_files: int, seed: int = 0) -> Path:
+    """Cria (ou reaproveita) um repositório sintético com `n_files` arquivos.
+
+    A estrutura é determinística para um mesmo `seed`:
+    `src/pkg_XXX/sub_YY/mod_NNNNNN.py`, um README e um arquivo grande em
+    `data/large_module.py` (para medir a paginação do `read_file`).
+
+    Returns:
+        Caminho do repositório.
+    """
+    repo = root / f"synthetic_{n_files}"
+    marker = repo / _MARKER
+    expected = {"format": _REPO_FORMAT, "files": n_files, "seed": seed}
+    if marker.exists():
+        try:
+            if json.loads(marker.read_text(encoding="utf-8")) == expected:
+                return repo
+        except (OSError, ValueError):
+            pass
+        shutil.rmtree(repo)
+
+    rng = random.Random(seed)
+    repo.mkdir(parents=True, exist_ok=True)
+    (repo / "README.md").write_text(
+        f"# Repositório sintético\n\nGerado pelo benchmark com {n_files} arquivos.\n",
+        encoding="utf-8",
+    )
+    (repo / "pyproject.toml").write_text('[project]\nname = "synthetic"\nversion = "0.1.0"\n', encoding="utf-8")
+
+    large = repo / "data" / "large_module.py"
+    large.parent.mkdir(parents=True, exist_ok=True)
+    large.write_text(
+        "\n".join(f"VALUE_{i} = {rng.randint(0, 10**6)}  # linha {i}" for i in range(20_000)) + "\n",
+        encoding="utf-8",
+    )
+
+    written = 3
+    idx = 0
+    while written < n_files:
+        pkg, rest = divmod(idx // _FILES_PER_DIR, _DIRS_PER_PACKAGE)
+        directory = repo / "src" / f"pkg_{pkg:03d}" / f"sub_{rest:02d}"
+        if idx % _FILES_PER_DIR == 0:
+            directory.mkdir(parents=True, exist_ok=True)
+        methods = "\n".join(
+            _METHOD_TEMPLATE.format(m=m, mod=rng.randint(2, 9)) for m in range(rng.randint(1, 6))
+        )
+        sibling_idx = max(0, idx - 1)
+        (directory / f"mod_{idx:06d}.py").write_text(
+            _MODULE_TEMPLATE.format(
+                name=f"mod_{idx:06d}",
+                sibling=f"mod_{sibling_idx:06d}",
+                sibling_idx=sibling_idx,
+                idx=idx,
+                value=rng.randint(1, 1000),
+                methods=methods,
+            ),
+            encoding="utf-8",
+        )
+        idx += 1
+        written += 1
+
+    marker.write_text(json.dumps(expected), encoding="utf-8")
+    return repo
+
+
+def _sample_files(repo: Path, count: int, seed: int = 0) -> list[Path]:
+    """Amostra determinística de módulos do repositório sintético."""
+    files = sorted((repo / "src").rglob("mod_*.py"))
+    if len(files) <= count:
+        return files
+    return random.Random(seed).sample(files, count)
+
+
+# ---------------------------------------------------------------------------
+# Modelo determinístico
+# ---------------------------------------------------------------------------
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model determinístico que segue um roteiro de respostas.
+
+    Cada chamada com tools vinculadas consome o próximo passo do roteiro
+    (`{"content": ..., "tool_calls": [{"name", "args"}]}`); depois do último
+    passo, repete uma resposta final sem tool calls. Chamadas sem tools (a
+    sumarização) recebem um resumo fixo. O uso de tokens reportado é a
+    contagem aproximada das mensagens de entrada.
+    """
+
+    script: list[dict[str, Any]] = []
+    cursor: dict[str, int] = {}
+    tools_bound: bool = False
+    summary_text: str = "Resumo determinístico do histórico (benchmark)."
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-benchmark"
+
+    def bind_tools(self, tools, **kwargs):
+        # Cópia rasa: o cursor é compartilhado com o modelo original
+        return self.model_copy(update={"tools_bound": True})
+
+    def _next_step(self) -> dict[str, Any]:
+        position = self.cursor.setdefault("step", 0)
+        self.cursor["step"] = position + 1
+        if position < len(self.script):
+            return self.script[position]
+        return {"content": "Análise concluída."}
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        input_tokens = count_tokens_approximately(messages)
+        if not self.tools_bound:
+            step: dict[str, Any] = {"content": self.summary_text}
+        else:
+            step = self._next_step()
+        tool_calls = [
+            {"name": call["name"], "args": call.get("args", {}), "id": call.get("id") or f"call_{i}_{id(step)}"}
+            for i, call in enumerate(step.get("tool_calls", []))
+        ]
+        content = step.get("content", "")
+        output_tokens = max(1, len(content) // 4 + 20 * len(tool_calls))
+        message = AIMessage(
+            content=content,
+            tool_calls=tool_calls,
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+            },
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def default_script(repo: Path, read_count: int = 24) -> list[dict[str, Any]]:
+    """Roteiro padrão: explora o repositório, lê arquivos, anota e escreve o onboarding pelo `notes`."""
+    files = _sample_files(repo, read_count)
+    root = str(repo)
+    steps: list[dict[str, Any]] = [
+        {"content": "Explorando a estrutura.", "tool_calls": [{"name": "list_dir", "args": {"path": root, "max_depth": 3}}]},
+        {
+            "tool_calls": [
+                {"name": "next_files_to_read", "args": {"path": root, "count": 10}},
+                {"name": "read_file", "args": {"path": str(repo / "README.md")}},
+                {"name": "read_file", "args": {"path": str(repo / "pyproject.toml")}},
+            ]
+        },
+        {
+            "tool_calls": [
+                {"name": "search_code", "args": {"query": "class Service", "path": root, "glob": "*.py", "max_results": 20}},
+                {"name": "outline", "args": {"path": str(repo / "data" / "large_module.py"), "max_symbols": 50}},
+            ]
+        },
+        {"tool_calls": [{"name": "read_file", "args": {"path": str(repo / "data" / "large_module.py"), "start": 1, "end": 400}}]},
+    ]
+    for i in range(0, len(files), 3):
+        batch = files[i:i + 3]
+        calls = [{"name": "outline", "args": {"path": str(batch[0])}}] if i % 6 == 0 else []
+        calls += [{"name": "read_file", "args": {"path": str(path)}} for path in batch]
+        steps.append({"tool_calls": calls})
+        if i % 12 == 0:
+            steps.append(
+                {
+                    "tool_calls": [
+                        {
+                            "name": "notes",
+                            "args": {
+                                "path": root,
+                                "action": "upsert" if i == 0 else "append",
+                                "section": "Módulos lidos",
+                                "content": "\n".join(f"- {p.name}: Service e helper" for p in batch),
+                            },
+                        },
+                        {"name": "next_files_to_read", "args": {"path": root, "count": 5}},
+                    ]
+                }
+            )
+    steps.append(
+        {
+            "tool_calls": [
+                {"name": "search_code", "args": {"query": r"def helper_\d+", "path": root, "regex": True, "max_results": 20}},
+                {"name": "notes", "args": {"path": root, "action": "get", "section": "Módulos lidos"}},
+            ]
+        }
+    )
+    for title in ("Visão geral", "Estrutura", "Módulos principais"):
+        steps.append(
+            {
+                "tool_calls": [
+                    {
+                        "name": "notes",
+                        "args": {
+                            "path": root,
+                            "action": "upsert",
+                            "document": "onboarding",
+                            "section": title,
+                            "content": "Conteúdo sintético.\n" * 70,
+                        },
+                    }
+                ]
+            }
+        )
+    steps += [
+        {"tool_calls": [{"name": "notes", "args": {"path": root, "action": "render", "content": "# Onboarding"}}]},
+        {"content": "Documento ONBOARDING.md gerado."},
+    ]
+    return steps
+
+
+def load_transcript(path: Path, repo: Path) -> list[dict[str, Any]]:
+    """Carrega uma transcrição gravada de tool calls.
+
+    Formato: lista de passos (ou `{"steps": [...]}`) no formato do
+    `ScriptedChatModel`. O marcador `{repo}` nos argumentos string é
+    substituído pelo caminho do repositório sintético.
+    """
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+    steps = data["steps"] if isinstance(data, dict) else data
+
+    def _subst(value: Any) -> Any:
+        if isinstance(value, str):
+            return value.replace("{repo}", str(repo))
+        if isinstance(value, dict):
+            return {k: _subst(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [_subst(v) for v in value]
+        return value
+
+    return [_subst(step) for step in steps]
+
+
+# ---------------------------------------------------------------------------
+# Medições
+# ---------------------------------------------------------------------------
+
+
+def _measure(fn: Callable[[], Any], repeat: int) -> dict[str, Any]:
+    """Executa `fn` `repeat` vezes e resume os tempos de parede."""
+    times = []
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return {
+        "runs": len(times),
+        "min_s": round(min(times), 6),
+        "median_s": round(statistics.median(times), 6),
+        "mean_s": round(statistics.fmean(times), 6),
+    }
+
+
+def _synthetic_history(repo: Path, n_messages: int) -> list:
+    """Histórico de mensagens parecido com o de uma análise real."""
+    files = _sample_files(repo, max(1, n_messages // 2))
+    contents = [read_file.func(path=str(p)) for p in files]
+    messages: list = [HumanMessage(content="Analise o repositório.")]
+    for i in range(n_messages // 2):
+        call_id = f"call_{i}"
+        path = str(files[i % len(files)])
+        messages.append(
+            AIMessage(content="", tool_calls=[{"name": "read_file", "args": {"path": path}, "id": call_id}])
+        )
+        messages.append(ToolMessage(content=contents[i % len(contents)], name="read_file", tool_call_id=call_id))
+    return messages
+
+
+def bench_tools(repo: Path, repeat: int) -> dict[str, Any]:
+    sample = _sample_files(repo, 50)
+    large = str(repo / "data" / "large_module.py")
+
+    def _read_sample() -> None:
+        for path in sample:
+            read_file.func(path=str(path))
+
+    def _page_large() -> None:
+        for start in range(1, 20_000, 400):
+            read_file.func(path=large, start=start, end=start + 399)
+
+    def _build_corpus() -> None:
+        clear_search_cache()
+        get_corpus(repo)
+
+    # O corpus de busca é montado uma vez; as consultas medem só a busca
+    corpus_build = _measure(_build_corpus, 1)
+    return {
+        "list_dir_default": _measure(lambda: list_dir.func(path=str(repo)), repeat),
+        "list_dir_wide": _measure(
+            lambda: list_dir.func(path=str(repo), max_entries=5_000, max_depth=10), repeat
+        ),
+        "read_file_sample_50": _measure(_read_sample, repeat),
+        "read_file_page_large": _measure(_page_large, repeat),
+        "read_file_skeleton_large": _measure(lambda: read_file.func(path=large), repeat),
+        "search_corpus_build": corpus_build,
+        "search_code_literal_miss": _measure(
+            lambda: search_code.func(query="nonexistent_symbol_zzz", path=str(repo)), repeat
+        ),
+        "search_code_regex_glob": _measure(
+            lambda: search_code.func(query=r"def method_\d+\(", path=str(repo), regex=True, glob="*.py"),
+            repeat,
+        ),
+    }
+
+
+def bench_context(repo: Path, repeat: int, n_messages: int = 400) -> dict[str, Any]:
+    messages = _synthetic_history(repo, n_messages)
+    model = ScriptedChatModel(profile={"max_input_tokens": _FAKE_MAX_INPUT_TOKENS})
+    middleware = SummarizationMiddleware(model=model, trigger=("fraction", 0.5), keep=("fraction", 0.2))
+    return {
+        "messages": len(messages),
+        "tokens": count_tokens_approximately(messages),
+        "count_tokens": _measure(lambda: count_tokens_approximately(messages), repeat),
+        "summarization_cutoff": _measure(lambda: middleware._determine_cutoff_index(messages), repeat),
+    }
+
+
+def bench_agent_loop(repo: Path, repeat: int, transcript: Path | None = None) -> dict[str, Any]:
+    script = load_transcript(transcript, repo) if transcript else default_script(repo)
+    times = []
+    last: dict[str, Any] = {}
+    for _ in range(max(1, repeat)):
+        prepare_output_file(repo, "onboarding", overwrite=True)
+        reset_store(repo)
+        model = ScriptedChatModel(
+            script=script, cursor={}, profile={"max_input_tokens": _FAKE_MAX_INPUT_TOKENS}
+        )
+        agent = create_codebase_agent(model_name=model, use_cache=False)
+        profile = RunProfile()
+        t0 = time.perf_counter()
+        stats = run_analysis(agent, repo, task="onboarding", profile=profile)
+        times.append(time.perf_counter() - t0)
+        data = profile.as_dict()
+        last = {
+            "turns": stats.turns,
+            "tool_calls": stats.tool_calls,
+            "breakdown_s": data["breakdown_s"],
+            "summarizations": data["summarization"]["count"],
+        }
+    return {
+        "runs": len(times),
+        "min_s": round(min(times), 6),
+        "median_s": round(statistics.median(times), 6),
+        "mean_s": round(statistics.fmean(times), 6),
+        **last,
+    }
+
+
+def run_benchmarks(
+    sizes: list[int],
+    workdir: Path,
+    repeat: int = 5,
+    transcript: Path | None = None,
+    skip_agent: bool = False,
+) -> dict[str, Any]:
+    """Executa todas as medições para cada tamanho de repositório."""
+    results: dict[str, Any] = {
+        "meta": {
+            "version": __version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeat": repeat,
+            "transcript": str(transcript) if transcript else None,
+        },
+        "sizes": {},
+    }
+    for n_files in sizes:
+        with console.status(f"[cyan]Gerando repositório sintético com {n_files} arquivos..."):
+            t0 = time.perf_counter()
+            repo = generate_synthetic_repo(workdir, n_files)
+            setup_s = time.perf_counter() - t0
+        console.print(f"[cyan]▶[/cyan] {n_files} arquivos ({setup_s:.1f}s de preparo)")
+        entry: dict[str, Any] = {"repo": str(repo)}
+        entry["tools"] = bench_tools(repo, repeat)
+        entry["context"] = bench_context(repo, repeat)
+        if not skip_agent:
+            entry["agent_loop"] = bench_agent_loop(repo, repeat, transcript)
+        results["sizes"][str(n_files)] = entry
+    return results
+
+
+def _metrics(results: dict[str, Any]):
+    """Itera (tamanho, métrica, mediana) de um resultado."""
+    for size, entry in results.get("sizes", {}).items():
+        for group in ("tools", "context"):
+            for name, value in entry.get(group, {}).items():
+                if isinstance(value, dict) and "median_s" in value:
+                    yield size, name, value["median_s"]
+        if "agent_loop" in entry:
+            yield size, "agent_loop", entry["agent_loop"]["median_s"]
+
+
+def compare_results(
+    current: dict[str, Any], baseline: dict[str, Any], tolerance: float
+) -> list[dict[str, Any]]:
+    """Lista as métricas cuja mediana piorou mais que `tolerance` (fração)."""
+    base = {(size, name): value for size, name, value in _metrics(baseline)}
+    rows = []
+    for size, name, value in _metrics(current):
+        previous = base.get((size, name))
+        if not previous:
+            continue
+        ratio = value / previous
+        rows.append(
+            {
+                "size": size,
+                "metric": name,
+                "baseline_s": previous,
+                "current_s": value,
+                "ratio": round(ratio, 3),
+                "regression": ratio > 1 + tolerance,
+            }
+        )
+    return rows
+
+
+def print_results(results: dict[str, Any], comparison: list[dict[str, Any]] | None = None) -> None:
+    table = Table(title="Benchmark (mediana)", title_justify="left")
+    table.add_column("Arquivos", justify="right")
+    table.add_column("Métrica", style="cyan")
+    table.add_column("Mediana (s)", justify="right")
+    table.add_column("vs. baseline", justify="right")
+    ratios = {(row["size"], row["metric"]): row for row in comparison or []}
+    for size, name, value in _metrics(results):
+        row = ratios.get((size, name))
+        delta = ""
+        if row:
+            style = "red" if row["regression"] else "green"
+            delta = f"[{style}]{row['ratio']:.2f}x[/{style}]"
+        table.add_row(size, name, f"{value:.4f}", delta)
+    console.print(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="codebase-analyst-bench",
+        description="Benchmark offline (sem rede) dos caminhos quentes do analista",
+    )
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(s) for s in DEFAULT_SIZES),
+        help="Tamanhos dos repositórios sintéticos, em arquivos, separados por vírgula (padrão: %(default)s)",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Repetições por medição (padrão: %(default)s)")
+    parser.add_argument(
+        "--workdir",
+        default=None,
+        help="Diretório onde os repositórios sintéticos são gerados e reaproveitados (padrão: temporário)",
+    )
+    parser.add_argument(
+        "--transcript",
+        default=None,
+        help="Transcrição JSON de tool calls para o replay do loop do agente (padrão: roteiro embutido)",
+    )
+    parser.add_argument("--skip-agent", action="store_true", help="Não mede o loop completo do agente")
+    parser.add_argument(
+        "--output",
+        default="benchmark_results.json",
+        help="Arquivo JSON de resultados (padrão: %(default)s)",
+    )
+    parser.add_argument("--baseline", default=None, help="Resultado anterior para comparação")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Piora relativa tolerada antes de acusar regressão (padrão: %(default)s = 25%%)",
+    )
+    args = parser.parse_args()
+
+    try:
+        sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    except ValueError:
+        console.print(f"[red]✗[/red] --sizes inválido: {args.sizes}")
+        sys.exit(2)
+
+    transcript = Path(args.transcript) if args.transcript else None
+    cleanup = args.workdir is None
+    workdir = Path(args.workdir) if args.workdir else Path(tempfile.mkdtemp(prefix="codebase-analyst-bench-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    try:
+        results = run_benchmarks(sizes, workdir, args.repeat, transcript, args.skip_agent)
+    finally:
+        if cleanup:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    comparison = None
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        comparison = compare_results(results, baseline, args.tolerance)
+        results["comparison"] = comparison
+
+    output = Path(args.output).resolve()
+    output.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+    print_results(results, comparison)
+    console.print(f"[white]Resultados salvos em: {output}[/white]")
+
+    if comparison and any(row["regression"] for row in comparison):
+        console.print(f"[red]✗ Regressão acima de {args.tolerance:.0%} detectada[/red]")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Checkpoints locais (SQLite) e metadados das execuções do CLI.
+
+Cada execução do CLI recebe um *run id*, usado como `thread_id` do LangGraph.
+Com o checkpointer SQLite, o estado do grafo (mensagens, todos, resultados
+de tool calls já concluídas, resumos da sumarização) é gravado a cada
+passo. Se a execução morrer no meio (Ctrl-C, OOM, queda do provider),
+`codebase-analyst --resume <run-id>` continua do último checkpoint, sem
+repetir tool calls ou sumarizações já registradas.
+
+Tudo fica em `~/.codebase-analyst` (ou em `$CODEBASE_ANALYST_HOME`):
+  - `checkpoints.sqlite`: checkpoints do LangGraph;
+  - `runs/<run-id>.json`: caminho, tarefa, modelo e status de cada execução.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import time
+import uuid
+from pathlib import Path
+from typing import Any
+
+RUN_STATUSES = ("running", "interrupted", "error", "done")
+
+
+def analyst_home() -> Path:
+    """Diretório de dados locais do analista."""
+    home = os.getenv("CODEBASE_ANALYST_HOME")
+    return Path(home).expanduser().resolve() if home else Path.home() / ".codebase-analyst"
+
+
+def checkpoint_db_path() -> Path:
+    return analyst_home() / "checkpoints.sqlite"
+
+
+def _runs_dir() -> Path:
+    return analyst_home() / "runs"
+
+
+def new_run_id() -> str:
+    """Gera um run id curto e ordenável pela data de criação."""
+    return time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+
+
+def save_run(run_id: str, **fields: Any) -> dict[str, Any]:
+    """Cria ou atualiza os metadados de uma execução (escrita atômica)."""
+    runs_dir = _runs_dir()
+    runs_dir.mkdir(parents=True, exist_ok=True)
+    path = runs_dir / f"{run_id}.json"
+    data = load_run(run_id) or {"run_id": run_id, "created_at": time.time()}
+    data.update(fields)
+    data["updated_at"] = time.time()
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
+    return data
+
+
+def load_run(run_id: str) -> dict[str, Any] | None:
+    """Metadados de uma execução, ou None se o run id não existir."""
+    path = _runs_dir() / f"{Path(run_id).name}.json"
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def list_runs(limit: int = 20) -> list[dict[str, Any]]:
+    """Execuções mais recentes primeiro."""
+    runs_dir = _runs_dir()
+    if not runs_dir.is_dir():
+        return []
+    runs = []
+    for path in sorted(runs_dir.glob("*.json"), reverse=True)[:limit]:
+        try:
+            runs.append(json.loads(path.read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            continue
+    return runs
+
+
+def create_checkpointer(db_path: Path | None = None):
+    """Cria o checkpointer SQLite (requer `langgraph-checkpoint-sqlite`).
+
+    O checkpointer é dono da conexão SQLite: feche-o com `close()` ao final
+    da execução, ou use-o como context manager (`with create_checkpointer() as cp:`).
+
+    Raises:
+        RuntimeError: se o pacote `langgraph-checkpoint-sqlite` não estiver instalado.
+    """
+    try:
+        from langgraph.checkpoint.sqlite import SqliteSaver
+    except ImportError as e:
+        raise RuntimeError(
+            "Checkpoints requerem o pacote 'langgraph-checkpoint-sqlite' "
+            "(pip install langgraph-checkpoint-sqlite) ou use --no-checkpoint"
+        ) from e
+
+    class ThreadedSqliteSaver(SqliteSaver):
+        """`SqliteSaver` com a API assíncrona delegada para threads.
+
+        O `SqliteSaver` só implementa a API síncrona; para o modo `--async`
+        as operações rodam em `asyncio.to_thread`, serializadas pelo lock
+        interno do saver (a conexão é aberta com `check_same_thread=False`).
+        """
+
+        async def aget_tuple(self, config):
+            return await asyncio.to_thread(self.get_tuple, config)
+
+        async def alist(self, config, *, filter=None, before=None, limit=None):
+            items = await asyncio.to_thread(
+                lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+            )
+            for item in items:
+                yield item
+
+        async def aput(self, config, checkpoint, metadata, new_versions):
+            return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+        async def aput_writes(self, config, writes, task_id, task_path=""):
+            return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+        async def adelete_thread(self, thread_id):
+            return await asyncio.to_thread(self.delete_thread, thread_id)
+
+        def close(self) -> None:
+            """Fecha a conexão SQLite (idempotente)."""
+            with self.lock:
+                self.conn.close()
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc) -> None:
+            self.close()
+
+    path = Path(db_path) if db_path else checkpoint_db_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), check_same_thread=False)
+    # WAL: escritas por passo sem bloquear leituras de outras execuções
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return ThreadedSqliteSaver(conn)
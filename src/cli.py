@@ -4,6 +4,7 @@ Este módulo fornece uma interface CLI para análise de codebases
 usando um agente LangChain com ferramentas de sistema de arquivos.
 """
 
+import asyncio
 import os
 import sys
 from pathlib import Path
@@ -13,7 +14,6 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import argparse
-from rich.console import Console
 from rich.panel import Panel
 from rich.markdown import Markdown
 from rich.text import Text
@@ -22,26 +22,36 @@ from rich.table import Table
 from rich import box
 
 from .agent import create_codebase_agent
-
-from langfuse import get_client
-from langfuse.langchain import CallbackHandler
-
-# Configuração do console Rich
-console = Console()
-
-# Cores do tema (inspirado no Claude Code)
-THEME = {
-    "primary": "cyan",
-    "secondary": "magenta",
-    "success": "green",
-    "warning": "yellow",
-    "error": "red",
-    "muted": "white",
-    "text": "bright_white",
-    "agent": "cyan",
-    "tool": "yellow",
-    "result": "green",
-}
+from .analysis_state import (
+    UPDATE_FILE,
+    DraftCollector,
+    apply_section_updates,
+    build_update_message,
+    plan_incremental,
+    record_analysis,
+)
+from .checkpoints import analyst_home, create_checkpointer, load_run, new_run_id, save_run
+from .code_index import warm_index
+from .mapreduce import (
+    DEFAULT_MAX_PARTITIONS,
+    DEFAULT_PARTITION_TOKEN_BUDGET,
+    print_progress as print_partition_progress,
+    run_map_reduce,
+)
+from .search import warm_corpus
+from .render import (
+    OUTPUT_MODES,
+    THEME,
+    RichRenderer,
+    console,
+    make_renderer,
+)
+from .runner import aiter_agent_events, build_user_message, iter_agent_events
+from .profiling import RunProfile, activate as activate_profile
+from .draft_store import reset_store, set_render_target
+from .file_writer import DEFAULT_FSYNC, FSYNC_POLICIES, configure_writes, flush_writes
+from .ranking import start_reading_session
+from .tracing import TRACE_SINKS, create_tracing
 
 
 def print_header(path: str, task: str, model: str):
@@ -67,90 +77,40 @@ def print_header(path: str, task: str, model: str):
     console.print()
 
 
-def print_agent_message(content: str):
-    """Imprime mensagem do agente com formatação Markdown."""
-    if not content:
-        return
-
-    console.print()
-    console.print(Text("◆ Agente", style=f"bold {THEME['agent']}"))
-
-    # Renderiza como Markdown
-    md = Markdown(content)
-    console.print(Panel(md, box=box.ROUNDED, border_style=THEME["agent"], padding=(1, 2)))
-
-
-def print_tool_call(tool_name: str, tool_args: dict):
-    """Imprime chamada de ferramenta com destaque."""
-    console.print()
-
-    # Header da tool
-    tool_header = Text()
-    tool_header.append("⚡ ", style=f"bold {THEME['tool']}")
-    tool_header.append("Tool: ", style=THEME["tool"])
-    tool_header.append(tool_name, style=f"bold {THEME['tool']}")
-
-    console.print(tool_header)
-
-    # Argumentos
-    if tool_args:
-        args_table = Table(show_header=False, box=box.SIMPLE, padding=(0, 1))
-        args_table.add_column("Param", style="cyan")
-        args_table.add_column("Value", style="white", overflow="fold")
-
-        for key, value in tool_args.items():
-            value_str = str(value)
-            # Truncar valores muito longos
-            if len(value_str) > 150:
-                value_str = value_str[:150] + "..."
-
-            # Se parece ser código ou path, destacar
-            if key in ["path", "file_path", "dir_path"]:
-                args_table.add_row(f"  {key}", Text(value_str, style="bold blue"))
-            elif key == "content" and len(value_str) > 50:
-                args_table.add_row(f"  {key}", Text(f"[{len(value)} chars]", style="italic white"))
-            else:
-                args_table.add_row(f"  {key}", value_str)
-
-        console.print(args_table)
-
-
-def print_tool_result(content: str, tool_name: str = None, max_lines: int = 20):
-    """Imprime resultado de ferramenta."""
-    if not content:
-        return
-
-    lines = content.split("\n")
-    truncated = False
-
-    if len(lines) > max_lines:
-        lines = lines[:max_lines]
-        truncated = True
-
-    display_content = "\n".join(lines)
-    if truncated:
-        display_content += f"\n... [+{len(content.split(chr(10))) - max_lines} linhas]"
+async def stream_agent_async(agent, agent_input: dict | None, config: dict, renderer, exporter=None, on_event=None):
+    """Executa o agente com `astream` sem bloquear o event loop na renderização.
 
-    # Header do resultado
-    result_header = Text()
-    result_header.append("✓ ", style=f"bold {THEME['result']}")
-    if tool_name:
-        result_header.append(f"Resultado de ", style=THEME["result"])
-        result_header.append(tool_name, style=f"bold {THEME['result']}")
-    else:
-        result_header.append("Resultado", style=THEME["result"])
+    Os eventos são enfileirados e consumidos por uma task que os entrega ao
+    renderer em uma thread separada, de modo que o streaming do modelo e as
+    tool calls concorrentes continuam progredindo enquanto o terminal é desenhado.
+    `agent_input` é None ao retomar uma execução a partir do checkpoint.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
 
-    console.print(result_header)
+    async def _render_worker():
+        while True:
+            event = await queue.get()
+            if event is None:
+                return
+            await asyncio.to_thread(renderer.handle, event)
 
-    # Conteúdo em painel
-    console.print(
-        Panel(
-            Text(display_content, style="white"),
-            box=box.SIMPLE,
-            border_style="green",
-            padding=(0, 1),
+    render_task = asyncio.create_task(_render_worker())
+    try:
+        chunks = agent.astream(
+            agent_input,
+            stream_mode="updates",
+            config=config,
         )
-    )
+        async for event in aiter_agent_events(chunks):
+            if on_event is not None:
+                on_event(event)
+            queue.put_nowait(event)
+            # Tracing: apenas sinaliza o exporter de fundo (não bloqueia)
+            if exporter is not None:
+                exporter.notify()
+    finally:
+        queue.put_nowait(None)
+        await render_task
 
 
 def print_error(message: str):
@@ -328,6 +288,87 @@ def check_existing_file(target_path: Path, task: str) -> bool:
         return False
 
 
+def agent_options(args) -> dict:
+    """Opções de `create_codebase_agent` vindas da linha de comando (exceto modelo e checkpointer)."""
+    return {
+        "prompt_cache": not args.no_prompt_cache,
+        "summary_model": args.summary_model,
+        "summarizer": args.summarizer,
+        "prefetch": not args.no_prefetch,
+        "dedup": not args.no_dedup,
+    }
+
+
+def run_map_reduce_mode(args, target_path: Path, profile: RunProfile) -> None:
+    """Executa o modo map-reduce: sub-agentes por partição e etapa de reduce."""
+    console.print(Rule("Map-reduce", style="white"))
+    console.print()
+    # Índice, grafo de imports e corpus de busca são compartilhados pelos sub-agentes
+    warm_index(target_path)
+    warm_corpus(target_path)
+
+    exporter = None
+    config = {"recursion_limit": 1000}
+    if args.trace:
+        callback, exporter = create_tracing(args.trace_sink, args.trace_flush_interval)
+        config["callbacks"] = [callback]
+
+    def on_progress(event: dict) -> None:
+        print_partition_progress(event, verbose=True)
+        if exporter is not None:
+            exporter.notify()
+
+    def finish() -> None:
+        if exporter is not None:
+            exporter.close()
+        profile.finish()
+        if args.profile_json:
+            profile_path = profile.write_json(args.profile_json)
+            console.print(Text(f"  ℹ Perfil salvo em: {profile_path}", style="white"))
+
+    try:
+        manifest = run_map_reduce(
+            target_path,
+            model_name=args.model,
+            workers=args.partition_workers,
+            requests_per_second=args.requests_per_second,
+            token_budget=args.partition_token_budget or None,
+            max_partitions=args.max_partitions,
+            config=config,
+            on_progress=on_progress,
+            profile=profile,
+            agent_options=agent_options(args),
+        )
+    except KeyboardInterrupt:
+        finish()
+        print_cancelled()
+        sys.exit(0)
+    except Exception as e:
+        finish()
+        print_error(str(e))
+        sys.exit(1)
+    finish()
+
+    try:
+        record_analysis(target_path, model=args.model)
+    except OSError as e:
+        console.print(Text(f"  ⚠ Não foi possível salvar o estado da análise: {e}", style="yellow"))
+    console.print()
+    console.print(
+        Text(
+            f"  ℹ {len(manifest['partitions'])} partição(ões): map em {manifest['map_wall_time_s']:.1f}s, "
+            f"total {manifest['wall_time_s']:.1f}s, {manifest['tokens']} tokens",
+            style="white",
+        )
+    )
+    console.print()
+    console.print(profile.summary_table())
+    console.print()
+    console.print(Rule("Concluído", style="white"))
+    print_success()
+    console.print(Text(f"✓ Arquivo salvo em: {manifest['output']}", style="green"))
+
+
 def main():
     """Função principal do CLI."""
     parser = argparse.ArgumentParser(
@@ -379,6 +420,139 @@ Notas:
         action="store_true",
         help="Habilita tracing com Langfuse para observabilidade (default: desabilitado)",
     )
+    parser.add_argument(
+        "--trace-sink",
+        default="langfuse",
+        choices=list(TRACE_SINKS),
+        help="Destino do tracing: langfuse ou noop (local, para medir o overhead de --trace)",
+    )
+    parser.add_argument(
+        "--trace-flush-interval",
+        type=float,
+        default=5.0,
+        help="Intervalo em segundos entre flushes de fundo do tracing (default: 5.0)",
+    )
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Executa o agente com asyncio (astream), rodando tool calls do mesmo turno em paralelo",
+    )
+    parser.add_argument(
+        "--output",
+        default="auto",
+        choices=list(OUTPUT_MODES),
+        help=(
+            "Formato da saída dos eventos: rich (painéis), plain (texto simples), "
+            "jsonl (um JSON por linha) ou auto (rich em terminal, plain fora dele)"
+        ),
+    )
+    parser.add_argument(
+        "--profile-json",
+        metavar="ARQUIVO",
+        default=None,
+        help="Salva o perfil de desempenho da execução (tempos, tokens, bytes, sumarizações) em JSON",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=(
+            "Se o ONBOARDING.md já existe, revisita apenas os arquivos alterados desde a última "
+            "análise e atualiza só as seções afetadas"
+        ),
+    )
+    parser.add_argument(
+        "--resume",
+        metavar="RUN_ID",
+        default=None,
+        help="Retoma uma execução interrompida a partir do último checkpoint (mesmo caminho, tarefa e modelo)",
+    )
+    parser.add_argument(
+        "--no-checkpoint",
+        action="store_true",
+        help="Não grava checkpoints da execução (impede retomar com --resume)",
+    )
+    parser.add_argument(
+        "--map-reduce",
+        action="store_true",
+        help=(
+            "Divide o repositório por pacote/serviço de nível superior, analisa cada partição com um "
+            "sub-agente em paralelo e mescla os relatórios parciais no ONBOARDING.md"
+        ),
+    )
+    parser.add_argument(
+        "--partition-workers",
+        type=int,
+        default=4,
+        help="Sub-agentes simultâneos no modo --map-reduce (default: 4)",
+    )
+    parser.add_argument(
+        "--partition-token-budget",
+        type=int,
+        default=DEFAULT_PARTITION_TOKEN_BUDGET,
+        help=(
+            "Orçamento de tokens de cada partição no modo --map-reduce; 0 desativa "
+            f"(default: {DEFAULT_PARTITION_TOKEN_BUDGET})"
+        ),
+    )
+    parser.add_argument(
+        "--max-partitions",
+        type=int,
+        default=DEFAULT_MAX_PARTITIONS,
+        help=f"Máximo de partições no modo --map-reduce (default: {DEFAULT_MAX_PARTITIONS})",
+    )
+    parser.add_argument(
+        "--requests-per-second",
+        type=float,
+        default=None,
+        help="Cota de chamadas ao modelo compartilhada pelos sub-agentes do --map-reduce (default: sem limite)",
+    )
+    parser.add_argument(
+        "--summary-model",
+        default=None,
+        help=(
+            "Modelo usado só para sumarizar o contexto, no mesmo formato de --model "
+            "(ex.: anthropic:claude-haiku-4-5) (default: o próprio --model)"
+        ),
+    )
+    parser.add_argument(
+        "--summarizer",
+        default="model",
+        choices=["model", "extractive"],
+        help=(
+            "Como o contexto é sumarizado: model (LLM, com fallback extrativo em caso de erro) "
+            "ou extractive (local, sem chamadas ao modelo) (default: model)"
+        ),
+    )
+    parser.add_argument(
+        "--no-prefetch",
+        action="store_true",
+        help="Não aquece em segundo plano os arquivos que o agente deve ler em seguida",
+    )
+    parser.add_argument(
+        "--no-dedup",
+        action="store_true",
+        help="Não troca releituras de trechos já presentes no contexto por referências curtas",
+    )
+    parser.add_argument(
+        "--no-prompt-cache",
+        action="store_true",
+        help="Não marca o system prompt e as tools para o cache de prompt do provider (Anthropic)",
+    )
+    parser.add_argument(
+        "--fsync",
+        default=None,
+        choices=list(FSYNC_POLICIES),
+        help=(
+            "Política de fsync dos arquivos escritos pelo agente: never, atomic (fsync antes do rename "
+            f"das sobrescritas) ou always (também diretório e appends) (default: {DEFAULT_FSYNC})"
+        ),
+    )
+    parser.add_argument(
+        "--write-behind",
+        action="store_true",
+        help="Acumula os appends do agente (ex.: DRAFT.md) em memória e os grava em lote",
+    )
     parser.add_argument(
         "--version",
         action="version",
@@ -387,9 +561,36 @@ Notas:
 
     args = parser.parse_args()
 
+    configure_writes(fsync=args.fsync, write_behind=args.write_behind or None)
+
+    if args.output == "jsonl":
+        # stdout fica reservado para os eventos; mensagens decorativas vão para stderr
+        console.file = sys.stderr
+
+    # Retomada: caminho, tarefa e modelo vêm dos metadados da execução original
+    if args.resume:
+        if args.no_checkpoint:
+            print_error("--resume não pode ser usado com --no-checkpoint")
+            sys.exit(1)
+        run_meta = load_run(args.resume)
+        if run_meta is None:
+            print_error(f"Execução '{args.resume}' não encontrada em {analyst_home() / 'runs'}")
+            sys.exit(1)
+        args.path, args.task, args.model = run_meta["path"], run_meta["task"], run_meta["model"]
+        args.incremental = bool(run_meta.get("incremental"))
+
+    if args.map_reduce and (args.resume or args.incremental or args.task != "onboarding"):
+        print_error(
+            "--map-reduce gera um ONBOARDING.md completo e não pode ser usado com "
+            "--resume, --incremental ou --task analyze"
+        )
+        sys.exit(1)
+
     # Validações
     if not validate_api_key(args.model):
         sys.exit(1)
+    if args.summary_model and args.summarizer == "model" and not validate_api_key(args.summary_model):
+        sys.exit(1)
 
     # Resolve path para absoluto (cross-platform)
     target_path = Path(args.path).resolve()
@@ -397,94 +598,243 @@ Notas:
     if not validate_path(str(target_path)):
         sys.exit(1)
 
+    # Reanálise incremental: compara o repositório com o estado da última análise
+    plan = None
+    if args.incremental and args.task == "onboarding" and not args.resume:
+        plan = plan_incremental(target_path)
+        if plan.mode == "unchanged":
+            console.print(
+                Text(
+                    f"✓ Nenhuma mudança desde a última análise (detecção: {plan.detection}); "
+                    "ONBOARDING.md já está atualizado",
+                    style="green",
+                )
+            )
+            sys.exit(0)
+        if plan.mode == "full":
+            console.print(Text(f"ℹ Análise completa: {plan.reason}", style="white"))
+            plan = None
+
     # Verificar se arquivo já existe (para tarefas readme e architecture)
-    if not check_existing_file(target_path, args.task):
+    if plan is None and not args.resume and not check_existing_file(target_path, args.task):
         sys.exit(0)  # Usuário cancelou, saída limpa
 
     # Header
     print_header(str(target_path), args.task, args.model)
 
+    # Perfil de desempenho da execução (modelo, tools, sumarização, caches)
+    profile = RunProfile()
+    activate_profile(profile)
+    start_reading_session()
+    if plan is not None or (args.resume and args.incremental):
+        # O render das notas grava só as seções reescritas, mescladas ao final
+        set_render_target(UPDATE_FILE)
+    if not args.resume:
+        # Nova análise: as notas de uma execução anterior não valem mais
+        reset_store(target_path)
+
+    if args.map_reduce:
+        run_map_reduce_mode(args, target_path, profile)
+        return
+
     # Criar o agente
     console.print(Rule("Inicializando", style="white"))
+    checkpointer = None
+
+    def close_checkpointer():
+        """Fecha a conexão SQLite dos checkpoints (os metadados da execução ficam em JSON)."""
+        if checkpointer is not None:
+            checkpointer.close()
+
+    if not args.no_checkpoint:
+        try:
+            checkpointer = create_checkpointer()
+        except RuntimeError as e:
+            if args.resume:
+                print_error(str(e))
+                sys.exit(1)
+            console.print(Text(f"  ⚠ Checkpoints desabilitados: {e}", style="yellow"))
+
     with console.status("[cyan]Criando agente...", spinner="dots"):
         try:
-            agent = create_codebase_agent(model_name=args.model)
+            agent = create_codebase_agent(
+                model_name=args.model,
+                checkpointer=checkpointer,
+                **agent_options(args),
+            )
         except Exception as e:
+            close_checkpointer()
             print_error(f"Falha ao criar agente: {e}")
             sys.exit(1)
 
     console.print(Text("  ✓ Agente instanciado", style="green"))
 
-    # Construir o prompt baseado na tarefa
-    task_prompts = {
-        "analyze": f"Analise a codebase em '{target_path}' e forneça um resumo técnico completo.",
-        "onboarding": f"Analise a codebase em '{target_path}' e gere um arquivo ONBOARDING.md completo e detalhado na raiz do projeto. Este arquivo deve facilitar o entendimento do código para novos desenvolvedores, incluindo: estrutura do projeto, entry points, arquivos principais, fluxos de execução, configurações, dependências e um roadmap de leitura do código.",
-    }
+    # Índice de símbolos e corpus de busca montados em segundo plano enquanto o modelo faz o primeiro turno
+    warm_index(target_path)
+    warm_corpus(target_path)
 
-    user_message = task_prompts[args.task]
+    # Identificador da execução (thread_id dos checkpoints)
+    run_id = args.resume or new_run_id()
+    run_config = {"configurable": {"thread_id": run_id}} if checkpointer is not None else {}
 
-    # Mostrar prompt
-    console.print()
-    console.print(Rule("Executando", style="white"))
-    console.print()
-    console.print(Text("◇ Prompt", style="cyan"))
-    console.print(Text(f"  {user_message}", style="italic white"))
+    if args.resume:
+        state = agent.get_state(run_config)
+        if not state.values:
+            close_checkpointer()
+            print_error(f"Nenhum checkpoint encontrado para a execução '{run_id}'")
+            sys.exit(1)
+        if not state.next:
+            close_checkpointer()
+            console.print(Text(f"  ✓ A execução '{run_id}' já foi concluída; nada a retomar", style="green"))
+            save_run(run_id, status="done")
+            sys.exit(0)
+        agent_input = None
+        console.print()
+        console.print(Rule("Retomando", style="white"))
+        console.print()
+        console.print(
+            Text(
+                f"  ◇ Execução {run_id}: {len(state.values.get('messages', []))} mensagens no checkpoint, "
+                f"próximo passo: {', '.join(state.next)}",
+                style="cyan",
+            )
+        )
+    else:
+        # Construir o prompt baseado na tarefa
+        if plan is not None:
+            user_message = build_update_message(target_path, plan)
+        else:
+            user_message = build_user_message(args.task, target_path)
+        agent_input = {"messages": [{"role": "user", "content": user_message}]}
+
+        # Mostrar prompt
+        console.print()
+        console.print(Rule("Executando", style="white"))
+        console.print()
+        console.print(Text("◇ Prompt", style="cyan"))
+        console.print(Text(f"  {user_message}", style="italic white"))
+        if plan is not None:
+            console.print(
+                Text(
+                    f"  ✓ Reanálise incremental: {len(plan.changed)} arquivo(s) alterado(s), "
+                    f"{len(plan.sections)} seção(ões) afetada(s)",
+                    style="green",
+                )
+            )
+
+    if checkpointer is not None:
+        save_run(
+            run_id,
+            path=str(target_path),
+            task=args.task,
+            model=args.model,
+            incremental=plan is not None or (args.resume and args.incremental),
+            status="running",
+        )
+        console.print(Text(f"  ✓ Checkpoints habilitados (run id: {run_id})", style="green"))
 
     # Configurar callbacks (somente se --trace estiver ativado)
+    exporter = None
     if args.trace:
-        callback = CallbackHandler()
-        langfuse = get_client()
-        config = {"callbacks": [callback], "recursion_limit": 1000}
-        console.print(Text("  ✓ Tracing com Langfuse habilitado", style="yellow"))
+        callback, exporter = create_tracing(args.trace_sink, args.trace_flush_interval)
+        config = {"callbacks": [callback], "recursion_limit": 1000, **run_config}
+        sink_label = "Langfuse" if args.trace_sink == "langfuse" else "sink no-op (local)"
+        console.print(Text(f"  ✓ Tracing com {sink_label} habilitado", style="yellow"))
     else:
-        langfuse = None
-        config = {"recursion_limit": 1000}
+        config = {"recursion_limit": 1000, **run_config}
         console.print(Text("  ℹ Tracing desabilitado (use --trace para habilitar)", style="white"))
 
-    # Rastrear última tool chamada
-    last_tool_name = None
+    renderer = make_renderer(args.output)
+    # Notas do DRAFT.md e arquivos lidos, para o estado da análise
+    collector = DraftCollector(target_path)
+
+    def finish_stream():
+        """Desenha eventos pendentes, fecha os checkpoints, faz o flush final do tracing e salva o perfil."""
+        renderer.close()
+        close_checkpointer()
+        flush_writes(target_path)
+        if exporter is not None:
+            exporter.close()
+        profile.finish()
+        if args.profile_json:
+            profile_path = profile.write_json(args.profile_json)
+            console.print(Text(f"  ℹ Perfil salvo em: {profile_path}", style="white"))
+
+    def mark_run(status: str):
+        """Atualiza o status da execução e mostra como retomá-la, se for o caso."""
+        if checkpointer is None:
+            return
+        save_run(run_id, status=status)
+        if status != "done":
+            console.print(Text(f"  ℹ Retome com: codebase-analyst --resume {run_id}", style="yellow"))
 
     # Executar com streaming
     try:
-        for chunk in agent.stream(
-            {"messages": [{"role": "user", "content": user_message}]},
-            stream_mode="updates",
-            config=config,
-        ):
-            for step, data in chunk.items():
-                if step == "agent":
-                    msg = data["messages"][-1]
-                    if hasattr(msg, "content") and msg.content:
-                        print_agent_message(msg.content)
-                    if hasattr(msg, "tool_calls") and msg.tool_calls:
-                        for tc in msg.tool_calls:
-                            tool_name = tc.get("name", tc.get("type", "unknown"))
-                            tool_args = tc.get("args", {})
-                            last_tool_name = tool_name  # Armazena para usar no resultado
-                            print_tool_call(tool_name, tool_args)
-                elif step == "tools":
-                    msg = data["messages"][-1]
-                    content = str(msg.content) if hasattr(msg, "content") else str(msg)
-                    print_tool_result(content, tool_name=last_tool_name)
-
-                # Flush Langfuse somente se estiver habilitado
-                if langfuse:
-                    langfuse.flush()
+        if args.use_async:
+            asyncio.run(
+                stream_agent_async(agent, agent_input, config, renderer, exporter, on_event=collector.observe)
+            )
+        else:
+            chunks = agent.stream(
+                agent_input,
+                stream_mode="updates",
+                config=config,
+            )
+            for event in iter_agent_events(chunks):
+                collector.observe(event)
+                renderer.handle(event)
+
+                # Tracing: apenas sinaliza o exporter de fundo (não bloqueia)
+                if exporter is not None:
+                    exporter.notify()
 
     except KeyboardInterrupt:
+        finish_stream()
         print_cancelled()
+        mark_run("interrupted")
         sys.exit(0)
     except Exception as e:
+        finish_stream()
         print_error(str(e))
+        mark_run("error")
         sys.exit(1)
+    finish_stream()
+    mark_run("done")
+
+    if args.task == "onboarding":
+        updated_sections = apply_section_updates(target_path)
+        if updated_sections:
+            console.print(
+                Text(f"  ✓ Seções atualizadas: {', '.join(updated_sections)}", style="green")
+            )
+        try:
+            state_file = record_analysis(target_path, collector, model=args.model)
+        except OSError as e:
+            console.print(Text(f"  ⚠ Não foi possível salvar o estado da análise: {e}", style="yellow"))
+        else:
+            if state_file is not None:
+                console.print(Text(f"  ℹ Estado da análise salvo em: {state_file}", style="white"))
+    if exporter is not None:
+        trace_stats = exporter.stats()
+        console.print(
+            Text(
+                f"  ℹ Tracing: {trace_stats['flushes']} flush(es) em "
+                f"{trace_stats['flush_time_s']:.3f}s fora do loop do agente",
+                style="white",
+            )
+        )
+    console.print()
+    console.print(profile.summary_table())
 
     # Finalização
     console.print()
     console.print(Rule("Concluído", style="white"))
     print_success()
 
-    # Renderizar markdown conforme a tarefa
-    if args.task == "onboarding":
+    # Renderizar markdown conforme a tarefa (somente no terminal interativo)
+    if args.task == "onboarding" and not isinstance(renderer, RichRenderer):
+        console.print(Text(f"✓ Arquivo salvo em: {target_path / 'ONBOARDING.md'}", style="green"))
+    elif args.task == "onboarding":
         onboarding_path = target_path / "ONBOARDING.md"
         if onboarding_path.exists():
             console.print()
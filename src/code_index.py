@@ -0,0 +1,531 @@
+"""Índice de símbolos (outline) do código do repositório analisado.
+
+Em vez de ler módulos inteiros para descobrir o que eles definem, o agente
+consulta um outline compacto: módulo -> classes -> métodos -> assinaturas,
+com números de linha, e depois pagina com `read_file(start, end)` apenas os
+trechos que interessam.
+
+  - Python é analisado com `ast` (assinaturas completas, decorators,
+    docstrings resumidas);
+  - outras linguagens usam expressões regulares leves por linguagem
+    (JS/TS, Go, Rust, Java/Kotlin/C#, Ruby, PHP, C/C++);
+  - junto com os símbolos são extraídos os imports de Python, JS/TS e Go,
+    usados pelo grafo de dependências (`import_graph.py`);
+  - o índice de um diretório é construído em paralelo (pool de processos)
+    e cacheado por arquivo pelo par (mtime, tamanho), em memória e em
+    `<repo>/.codebase-analyst/symbols.json`.
+"""
+
+import ast
+import json
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from .file_index import iter_repo_files
+
+INDEX_VERSION = 2
+CACHE_DIR = ".codebase-analyst"
+CACHE_FILE = "symbols.json"
+
+# Arquivos maiores que isso não são indexados (gerados, minificados, dados)
+MAX_INDEX_BYTES = 2 * 1024 * 1024
+
+# Abaixo disso, indexar em série é mais barato que subir processos
+_PARALLEL_MIN_FILES = 200
+_CHUNK_SIZE = 64
+
+LANGUAGES = {
+    ".py": "python",
+    ".pyi": "python",
+    ".js": "javascript",
+    ".jsx": "javascript",
+    ".mjs": "javascript",
+    ".cjs": "javascript",
+    ".ts": "typescript",
+    ".tsx": "typescript",
+    ".go": "go",
+    ".rs": "rust",
+    ".java": "java",
+    ".kt": "kotlin",
+    ".kts": "kotlin",
+    ".cs": "csharp",
+    ".rb": "ruby",
+    ".php": "php",
+    ".c": "c",
+    ".h": "c",
+    ".cc": "cpp",
+    ".cpp": "cpp",
+    ".cxx": "cpp",
+    ".hpp": "cpp",
+}
+
+# (tipo, regex) por linguagem. O grupo "name" é o nome do símbolo e o
+# grupo "sig" (opcional) a assinatura exibida.
+_JS_PATTERNS = [
+    ("class", re.compile(r"^\s*(?:export\s+)?(?:default\s+)?(?:abstract\s+)?class\s+(?P<name>[\w$]+)(?P<sig>[^{]*)")),
+    ("interface", re.compile(r"^\s*(?:export\s+)?interface\s+(?P<name>[\w$]+)(?P<sig>[^{]*)")),
+    ("type", re.compile(r"^\s*(?:export\s+)?type\s+(?P<name>[\w$]+)\s*(?P<sig><[^=]*>)?\s*=")),
+    ("enum", re.compile(r"^\s*(?:export\s+)?(?:const\s+)?enum\s+(?P<name>[\w$]+)")),
+    ("function", re.compile(r"^\s*(?:export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*(?P<name>[\w$]+)\s*(?P<sig>(?:<[^>]*>)?\([^)]*\)?[^{]*)")),
+    ("function", re.compile(r"^\s*(?:export\s+)?(?:const|let|var)\s+(?P<name>[\w$]+)\s*(?::[^=]+)?=\s*(?:async\s+)?(?P<sig>\([^)]*\)?[^=]*)=>")),
+    ("method", re.compile(r"^\s+(?:(?:public|private|protected|static|readonly|async|get|set|override)\s+)*(?P<name>(?!if\b|for\b|while\b|switch\b|catch\b|return\b|function\b)[\w$]+)\s*(?P<sig>\([^)]*\)?[^;{=]*)\{\s*$")),
+]
+_PATTERNS: dict[str, list[tuple[str, re.Pattern]]] = {
+    "javascript": _JS_PATTERNS,
+    "typescript": _JS_PATTERNS,
+    "go": [
+        ("method", re.compile(r"^func\s+\((?P<recv>[^)]*)\)\s*(?P<name>\w+)(?P<sig>\s*(?:\[[^\]]*\])?\([^)]*\)?[^{]*)")),
+        ("function", re.compile(r"^func\s+(?P<name>\w+)(?P<sig>\s*(?:\[[^\]]*\])?\([^)]*\)?[^{]*)")),
+        ("struct", re.compile(r"^type\s+(?P<name>\w+)\s+struct\b")),
+        ("interface", re.compile(r"^type\s+(?P<name>\w+)\s+interface\b")),
+        ("type", re.compile(r"^type\s+(?P<name>\w+)\s+(?P<sig>[^{]+)$")),
+    ],
+    "rust": [
+        ("struct", re.compile(r"^\s*(?:pub(?:\([^)]*\))?\s+)?struct\s+(?P<name>\w+)(?P<sig>[^{;]*)")),
+        ("enum", re.compile(r"^\s*(?:pub(?:\([^)]*\))?\s+)?enum\s+(?P<name>\w+)")),
+        ("trait", re.compile(r"^\s*(?:pub(?:\([^)]*\))?\s+)?trait\s+(?P<name>\w+)(?P<sig>[^{]*)")),
+        ("impl", re.compile(r"^\s*impl(?:<[^>]*>)?\s+(?P<name>[\w:<>, ]+?)(?P<sig>\s+for\s+[\w:<>, ]+)?\s*\{")),
+        ("function", re.compile(r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:const\s+)?(?:async\s+)?(?:unsafe\s+)?fn\s+(?P<name>\w+)(?P<sig>\s*(?:<[^>]*>)?\([^)]*\)?[^{;]*)")),
+    ],
+    "java": [
+        ("class", re.compile(r"^\s*(?:(?:public|private|protected|abstract|final|static|sealed)\s+)*(?P<kind>class|interface|enum|record)\s+(?P<name>\w+)(?P<sig>[^{]*)")),
+        ("method", re.compile(r"^\s+(?:@\w+\s+)*(?:(?:public|private|protected|static|final|abstract|synchronized|native|default)\s+)+(?:<[^>]+>\s+)?[\w<>\[\],.? ]+\s+(?P<name>\w+)\s*(?P<sig>\([^)]*\)?)")),
+    ],
+    "kotlin": [
+        ("class", re.compile(r"^\s*(?:(?:public|private|internal|protected|abstract|open|data|sealed|enum|inner)\s+)*(?P<kind>class|interface|object)\s+(?P<name>\w+)(?P<sig>[^{]*)")),
+        ("function", re.compile(r"^\s*(?:(?:public|private|internal|protected|override|open|suspend|inline)\s+)*fun\s+(?:<[^>]+>\s+)?(?:[\w.]+\.)?(?P<name>\w+)\s*(?P<sig>\([^)]*\)?[^{=]*)")),
+    ],
+    "csharp": [
+        ("class", re.compile(r"^\s*(?:(?:public|private|protected|internal|abstract|sealed|static|partial)\s+)*(?P<kind>class|interface|struct|enum|record)\s+(?P<name>\w+)(?P<sig>[^{]*)")),
+        ("method", re.compile(r"^\s+(?:(?:public|private|protected|internal|static|virtual|override|abstract|async|sealed)\s+)+[\w<>\[\],.? ]+\s+(?P<name>\w+)\s*(?P<sig>\([^)]*\)?)")),
+    ],
+    "ruby": [
+        ("class", re.compile(r"^\s*(?P<kind>class|module)\s+(?P<name>[\w:]+)(?P<sig>.*)")),
+        ("method", re.compile(r"^\s*def\s+(?P<name>(?:self\.)?[\w?!=]+)(?P<sig>.*)")),
+    ],
+    "php": [
+        ("class", re.compile(r"^\s*(?:(?:abstract|final)\s+)*(?P<kind>class|interface|trait)\s+(?P<name>\w+)(?P<sig>[^{]*)")),
+        ("function", re.compile(r"^\s*(?:(?:public|private|protected|static|abstract|final)\s+)*function\s+(?P<name>\w+)\s*(?P<sig>\([^)]*\)?[^{;]*)")),
+    ],
+    "c": [
+        ("struct", re.compile(r"^\s*(?:typedef\s+)?(?P<kind>struct|enum|union)\s+(?P<name>\w+)\s*\{")),
+        ("function", re.compile(r"^(?!\s)(?!(?:if|for|while|switch|return|else)\b)[\w\s\*]+?\b(?P<name>\w+)\s*(?P<sig>\([^;]*\)?)\s*\{?\s*$")),
+    ],
+}
+_PATTERNS["cpp"] = [
+    ("class", re.compile(r"^\s*(?:template\s*<[^>]*>\s*)?(?P<kind>class|struct|namespace)\s+(?P<name>\w+)(?P<sig>[^{;]*)\{?\s*$")),
+    *_PATTERNS["c"],
+]
+
+# Imports por linguagem (especificadores como aparecem no código)
+_JS_IMPORT_RE = re.compile(
+    r"""(?:\bimport\s[^'";]*?\bfrom\s*|\bexport\s[^'";]*?\bfrom\s*|\bimport\s*\(?\s*|\brequire\s*\(\s*)['"]([^'"\n]+)['"]"""
+)
+_GO_IMPORT_BLOCK_RE = re.compile(r"^import\s*\(([^)]*)\)", re.MULTILINE)
+_GO_IMPORT_LINE_RE = re.compile(r'^import\s+(?:[\w.]+\s+)?"([^"]+)"', re.MULTILINE)
+_GO_PACKAGE_RE = re.compile(r"^package\s+(\w+)", re.MULTILINE)
+
+# Cache em memória: caminho absoluto -> (mtime_ns, tamanho, entrada)
+_MEMORY_CACHE: dict[str, tuple[int, int, dict[str, Any]]] = {}
+_CACHE_LOCK = threading.Lock()
+
+
+def language_of(path: str | Path) -> str | None:
+    return LANGUAGES.get(Path(path).suffix.lower())
+
+
+# ---------------------------------------------------------------------------
+# Parsers
+# ---------------------------------------------------------------------------
+
+
+def _first_doc_line(node: ast.AST) -> str | None:
+    doc = ast.get_docstring(node, clean=True) if isinstance(
+        node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)
+    ) else None
+    if not doc:
+        return None
+    line = doc.strip().splitlines()[0]
+    return line[:120]
+
+
+def _py_signature(node: ast.FunctionDef | ast.AsyncFunctionDef) -> str:
+    try:
+        args = ast.unparse(node.args)
+    except Exception:
+        args = "..."
+    returns = f" -> {ast.unparse(node.returns)}" if node.returns is not None else ""
+    return f"({args}){returns}"
+
+
+def _py_symbol(node: ast.AST) -> dict[str, Any] | None:
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+        prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+        symbol = {
+            "kind": prefix,
+            "name": node.name,
+            "signature": _py_signature(node),
+            "line": node.lineno,
+            "end_line": getattr(node, "end_lineno", node.lineno),
+        }
+    elif isinstance(node, ast.ClassDef):
+        bases = ", ".join(ast.unparse(b) for b in node.bases)
+        symbol = {
+            "kind": "class",
+            "name": node.name,
+            "signature": f"({bases})" if bases else "",
+            "line": node.lineno,
+            "end_line": getattr(node, "end_lineno", node.lineno),
+            "children": [
+                child for child in (_py_symbol(n) for n in node.body) if child is not None
+            ],
+        }
+    else:
+        return None
+    decorators = [ast.unparse(d) for d in getattr(node, "decorator_list", [])]
+    if decorators:
+        symbol["decorators"] = decorators
+    doc = _first_doc_line(node)
+    if doc:
+        symbol["doc"] = doc
+    return symbol
+
+
+def is_main_guard(node: ast.AST) -> bool:
+    """`if __name__ == "__main__":` no nível do módulo."""
+    if not isinstance(node, ast.If) or not isinstance(node.test, ast.Compare):
+        return False
+    test = node.test
+    operands = [test.left, *test.comparators]
+    return any(isinstance(o, ast.Name) and o.id == "__name__" for o in operands) and any(
+        isinstance(o, ast.Constant) and o.value == "__main__" for o in operands
+    )
+
+
+def _py_imports(tree: ast.Module) -> list[list[Any]]:
+    """Imports do módulo como `[módulo, nível, [nomes]]` (inclui imports locais/condicionais)."""
+    imports: list[list[Any]] = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.extend([alias.name, 0, []] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            imports.append([node.module or "", node.level, [alias.name for alias in node.names]])
+    return imports
+
+
+def outline_python(source: str) -> dict[str, Any]:
+    """Outline de um módulo Python via `ast`."""
+    tree = ast.parse(source)
+    symbols = []
+    constants = []
+    main = False
+    for node in tree.body:
+        symbol = _py_symbol(node)
+        if symbol is not None:
+            symbols.append(symbol)
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            for target in targets:
+                if isinstance(target, ast.Name) and target.id.isupper():
+                    constants.append({"name": target.id, "line": node.lineno})
+        elif is_main_guard(node):
+            main = True
+    return {
+        "doc": _first_doc_line(tree),
+        "symbols": symbols,
+        "constants": constants,
+        "imports": _py_imports(tree),
+        "main": main,
+    }
+
+
+def regex_imports(source: str, language: str) -> tuple[list[str], bool]:
+    """Especificadores de import de JS/TS e Go e se o arquivo é um executável (`package main`)."""
+    if language in ("javascript", "typescript"):
+        return sorted({m.group(1) for m in _JS_IMPORT_RE.finditer(source)}), False
+    if language == "go":
+        specs = set(_GO_IMPORT_LINE_RE.findall(source))
+        for block in _GO_IMPORT_BLOCK_RE.findall(source):
+            specs.update(re.findall(r'"([^"]+)"', block))
+        package = _GO_PACKAGE_RE.search(source)
+        return sorted(specs), bool(package and package.group(1) == "main")
+    return [], False
+
+
+def outline_regex(source: str, language: str) -> dict[str, Any]:
+    """Outline aproximado por regex, com aninhamento pela indentação."""
+    patterns = _PATTERNS.get(language, [])
+    symbols: list[dict[str, Any]] = []
+    # Pilha de (indentação, símbolo container) para aninhar métodos em classes
+    stack: list[tuple[int, dict[str, Any]]] = []
+    for lineno, line in enumerate(source.splitlines(), start=1):
+        stripped = line.strip()
+        if not stripped or stripped.startswith(("//", "#", "*", "/*")):
+            continue
+        for kind, pattern in patterns:
+            match = pattern.match(line)
+            if not match:
+                continue
+            groups = match.groupdict()
+            indent = len(line) - len(line.lstrip())
+            signature = " ".join((groups.get("sig") or "").split()).rstrip("{ ").strip()
+            name = groups["name"].strip()
+            if groups.get("recv"):
+                name = f"({groups['recv'].strip()}) {name}"
+            symbol = {
+                "kind": groups.get("kind") or kind,
+                "name": name,
+                "signature": signature[:200],
+                "line": lineno,
+            }
+            while stack and stack[-1][0] >= indent:
+                stack.pop()
+            if stack:
+                stack[-1][1].setdefault("children", []).append(symbol)
+            elif kind == "method" and language not in ("go", "ruby"):
+                # Método fora de classe: provavelmente um falso positivo
+                break
+            else:
+                symbols.append(symbol)
+            if symbol["kind"] in ("class", "interface", "struct", "trait", "impl", "module", "object", "record", "enum", "namespace"):
+                stack.append((indent, symbol))
+            break
+    return {"doc": None, "symbols": symbols, "constants": []}
+
+
+def outline_source(source: str, language: str) -> dict[str, Any]:
+    if language == "python":
+        try:
+            return outline_python(source)
+        except SyntaxError as e:
+            return {"doc": None, "symbols": [], "constants": [], "error": f"SyntaxError na linha {e.lineno}"}
+    entry = outline_regex(source, language)
+    imports, main = regex_imports(source, language)
+    if imports:
+        entry["imports"] = imports
+    if main:
+        entry["main"] = True
+    return entry
+
+
+def _index_file(path: str) -> dict[str, Any] | None:
+    """Indexa um arquivo (executado nos processos do pool)."""
+    language = language_of(path)
+    if language is None:
+        return None
+    try:
+        st = os.stat(path)
+        if st.st_size > MAX_INDEX_BYTES:
+            return {"language": language, "lines": None, "skipped": "arquivo grande demais", "symbols": []}
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            source = f.read()
+    except OSError as e:
+        return {"language": language, "lines": None, "error": str(e), "symbols": []}
+    entry = outline_source(source, language)
+    entry["language"] = language
+    entry["lines"] = source.count("\n") + (0 if source.endswith("\n") or not source else 1)
+    return entry
+
+
+def _index_chunk(paths: list[str]) -> list[tuple[str, dict[str, Any] | None]]:
+    return [(path, _index_file(path)) for path in paths]
+
+
+# ---------------------------------------------------------------------------
+# Índice com cache
+# ---------------------------------------------------------------------------
+
+
+def _cache_path(root: Path) -> Path:
+    return root / CACHE_DIR / CACHE_FILE
+
+
+def _load_disk_cache(root: Path) -> dict[str, Any]:
+    try:
+        data = json.loads(_cache_path(root).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return data.get("files", {}) if data.get("version") == INDEX_VERSION else {}
+
+
+def _save_disk_cache(root: Path, files: dict[str, Any]) -> None:
+    path = _cache_path(root)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps({"version": INDEX_VERSION, "files": files}, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError:
+        # Repositório somente leitura: o cache em memória continua valendo
+        pass
+
+
+def build_index(
+    root: str | Path, workers: int | None = None, persist: bool = True
+) -> dict[str, dict[str, Any]]:
+    """Indexa todos os arquivos de código sob `root`.
+
+    Só os arquivos novos ou com (mtime, tamanho) diferentes do cache são
+    reprocessados; com muitos arquivos pendentes, o trabalho é dividido em
+    lotes entre processos.
+
+    Args:
+        root: Diretório a indexar.
+        workers: Máximo de processos (padrão: número de CPUs).
+        persist: Se True, lê e grava o cache em `<root>/.codebase-analyst/`.
+            Use False para subdiretórios, evitando espalhar caches pelo repositório.
+
+    Returns:
+        `{caminho relativo: entrada}` de todos os arquivos de código.
+    """
+    root = Path(root).resolve()
+    disk = _load_disk_cache(root) if persist else {}
+    index: dict[str, dict[str, Any]] = {}
+    pending: list[tuple[str, int, int]] = []
+
+    # A varredura do repositório fica fora do lock: só as consultas ao cache o seguram
+    files = [(rel, st) for rel, st in iter_repo_files(root) if language_of(rel) is not None]
+    with _CACHE_LOCK:
+        for rel, st in files:
+            abs_path = str(root / rel)
+            cached = _MEMORY_CACHE.get(abs_path)
+            if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+                index[rel] = cached[2]
+                continue
+            on_disk = disk.get(rel)
+            if on_disk and on_disk.get("mtime_ns") == st.st_mtime_ns and on_disk.get("size") == st.st_size:
+                index[rel] = on_disk
+                _MEMORY_CACHE[abs_path] = (st.st_mtime_ns, st.st_size, on_disk)
+                continue
+            pending.append((rel, st.st_mtime_ns, st.st_size))
+
+    if pending:
+        paths = [str(root / rel) for rel, _, _ in pending]
+        if len(paths) >= _PARALLEL_MIN_FILES and (workers or os.cpu_count() or 1) > 1:
+            chunks = [paths[i:i + _CHUNK_SIZE] for i in range(0, len(paths), _CHUNK_SIZE)]
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = [item for chunk in pool.map(_index_chunk, chunks) for item in chunk]
+        else:
+            results = _index_chunk(paths)
+        with _CACHE_LOCK:
+            for (rel, mtime_ns, size), (_, entry) in zip(pending, results):
+                if entry is None:
+                    continue
+                entry["mtime_ns"] = mtime_ns
+                entry["size"] = size
+                index[rel] = entry
+                _MEMORY_CACHE[str(root / rel)] = (mtime_ns, size, entry)
+        if persist:
+            _save_disk_cache(root, index)
+    return index
+
+
+def file_outline(path: str | Path) -> dict[str, Any] | None:
+    """Outline de um único arquivo, usando o cache em memória quando válido."""
+    path = Path(path).resolve()
+    st = path.stat()
+    key = str(path)
+    with _CACHE_LOCK:
+        cached = _MEMORY_CACHE.get(key)
+    if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+    entry = _index_file(key)
+    if entry is not None:
+        entry["mtime_ns"] = st.st_mtime_ns
+        entry["size"] = st.st_size
+        with _CACHE_LOCK:
+            _MEMORY_CACHE[key] = (st.st_mtime_ns, st.st_size, entry)
+    return entry
+
+
+def clear_index_cache() -> None:
+    with _CACHE_LOCK:
+        _MEMORY_CACHE.clear()
+
+
+# Pré-aquecimento: raiz -> thread que está construindo o índice
+_WARMUPS: dict[Path, threading.Thread] = {}
+
+
+def warm_index(root: str | Path) -> threading.Thread:
+    """Constrói o índice de `root` em segundo plano (ex.: enquanto o agente inicia)."""
+    root = Path(root).resolve()
+
+    def _build() -> None:
+        try:
+            build_index(root)
+        except Exception:
+            # Falhas no pré-aquecimento só custam o cache; a tool reconstrói sob demanda
+            pass
+
+    thread = threading.Thread(target=_build, name="code-index-warmup", daemon=True)
+    _WARMUPS[root] = thread
+    thread.start()
+    return thread
+
+
+def is_warmed_root(path: str | Path) -> bool:
+    """Indica se `path` é a raiz de um repositório pré-aquecido com `warm_index`."""
+    return Path(path).resolve() in _WARMUPS
+
+
+def warmed_root_of(path: str | Path) -> Path | None:
+    """A raiz pré-aquecida que contém `path` (ou None)."""
+    path = Path(path).resolve()
+    for root in list(_WARMUPS):
+        if path == root or root in path.parents:
+            return root
+    return None
+
+
+def wait_for_warmup(path: str | Path) -> None:
+    """Aguarda o pré-aquecimento que cobre `path`, evitando indexar em dobro."""
+    path = Path(path).resolve()
+    for root, thread in list(_WARMUPS.items()):
+        if thread.is_alive() and (path == root or root in path.parents or path in root.parents):
+            thread.join()
+
+
+# ---------------------------------------------------------------------------
+# Formatação
+# ---------------------------------------------------------------------------
+
+
+def _format_symbol(symbol: dict[str, Any], depth: int, lines: list[str], with_docs: bool) -> int:
+    indent = "  " * depth
+    span = f"L{symbol['line']}"
+    if symbol.get("end_line") and symbol["end_line"] != symbol["line"]:
+        span += f"-{symbol['end_line']}"
+    decorators = "".join(f"@{d.split('(')[0]} " for d in symbol.get("decorators", []))
+    signature = symbol.get("signature", "")
+    if signature and not signature.startswith(("(", "<", "[")):
+        signature = " " + signature
+    text = f"{indent}{decorators}{symbol['kind']} {symbol['name']}{signature}  [{span}]"
+    if with_docs and symbol.get("doc"):
+        text += f"  # {symbol['doc']}"
+    lines.append(text)
+    count = 1
+    for child in symbol.get("children", []):
+        count += _format_symbol(child, depth + 1, lines, with_docs)
+    return count
+
+
+def format_outline(rel: str, entry: dict[str, Any], with_docs: bool = True) -> list[str]:
+    header = f"{rel} ({entry.get('language')}, {entry.get('lines') or '?'} linhas)"
+    if entry.get("doc") and with_docs:
+        header += f"  # {entry['doc']}"
+    lines = [header]
+    if entry.get("skipped") or entry.get("error"):
+        lines.append(f"  [{entry.get('skipped') or entry.get('error')}]")
+    constants = entry.get("constants") or []
+    if constants:
+        shown = ", ".join(f"{c['name']} (L{c['line']})" for c in constants[:10])
+        more = f" +{len(constants) - 10}" if len(constants) > 10 else ""
+        lines.append(f"  const: {shown}{more}")
+    for symbol in entry.get("symbols", []):
+        _format_symbol(symbol, 1, lines, with_docs)
+    return lines
@@ -0,0 +1,102 @@
+"""Orçamento de contexto das tools: folga até a próxima sumarização.
+
+O `SummarizationMiddleware` sumariza quando a conversa atinge o gatilho de
+tokens. Antes de cada tool call ele mede a folga (`trigger - tokens atuais`)
+no estado do agente e a publica aqui, via `contextvars`, durante a execução
+da tool. O `read_file` usa essa folga para dimensionar a página quando o
+modelo não passa `max_lines`/`max_chars`:
+
+  - muita folga: páginas maiores, menos turnos para ler um arquivo;
+  - perto do gatilho: páginas menores, que não forçam uma sumarização só
+    para caber uma leitura.
+
+Tool calls paralelas do mesmo turno dividem a folga entre si. Sem
+middleware ativo (ex.: tool chamada diretamente), valem os padrões fixos.
+Cada decisão é registrada no perfil da execução (`record_event`).
+"""
+
+import contextvars
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from .profiling import current_profile
+
+# Página padrão do read_file (sem informação de folga)
+DEFAULT_PAGE_LINES = 400
+DEFAULT_PAGE_CHARS = 20_000
+# Limites da página adaptativa
+MIN_PAGE_LINES = 60
+MAX_PAGE_LINES = 1_500
+MIN_PAGE_CHARS = 3_000
+MAX_PAGE_CHARS = 75_000
+# Fração da folga que uma única leitura pode ocupar (o resto fica para os turnos seguintes)
+PAGE_SHARE = 0.25
+# Conversão aproximada tokens → caracteres (a mesma ordem do contador aproximado)
+CHARS_PER_TOKEN = 3.5
+
+
+@dataclass(frozen=True)
+class ContextBudget:
+    """Folga de tokens até o gatilho de sumarização, vista por uma tool call."""
+
+    tokens: int
+    trigger: int
+    parallel_calls: int = 1
+
+    @property
+    def headroom(self) -> int:
+        """Tokens disponíveis para esta tool call antes do gatilho."""
+        return max(0, self.trigger - self.tokens) // max(1, self.parallel_calls)
+
+
+_ACTIVE_BUDGET: contextvars.ContextVar[ContextBudget | None] = contextvars.ContextVar(
+    "codebase_analyst_context_budget", default=None
+)
+
+
+def current_budget() -> ContextBudget | None:
+    """Folga publicada para a tool call em execução (ou None)."""
+    return _ACTIVE_BUDGET.get()
+
+
+@contextmanager
+def context_budget(budget: ContextBudget | None):
+    """Publica `budget` para as tools executadas dentro do bloco `with`."""
+    token = _ACTIVE_BUDGET.set(budget)
+    try:
+        yield budget
+    finally:
+        _ACTIVE_BUDGET.reset(token)
+
+
+def _clamp(value: int, low: int, high: int) -> int:
+    return max(low, min(high, value))
+
+
+def page_size(path: str = "") -> tuple[int, int]:
+    """`(max_lines, max_chars)` da próxima página do read_file, conforme a folga atual."""
+    budget = current_budget()
+    if budget is None:
+        return DEFAULT_PAGE_LINES, DEFAULT_PAGE_CHARS
+
+    max_chars = _clamp(int(budget.headroom * PAGE_SHARE * CHARS_PER_TOKEN), MIN_PAGE_CHARS, MAX_PAGE_CHARS)
+    # Mantém a proporção caracteres/linha da página padrão
+    max_lines = _clamp(max_chars * DEFAULT_PAGE_LINES // DEFAULT_PAGE_CHARS, MIN_PAGE_LINES, MAX_PAGE_LINES)
+
+    profile = current_profile()
+    if profile is not None:
+        if max_chars > DEFAULT_PAGE_CHARS:
+            profile.incr("read_pages_grown")
+        elif max_chars < DEFAULT_PAGE_CHARS:
+            profile.incr("read_pages_shrunk")
+        profile.record_event(
+            "read_page_size",
+            path=path,
+            tokens=budget.tokens,
+            trigger=budget.trigger,
+            parallel_calls=budget.parallel_calls,
+            headroom=budget.headroom,
+            max_lines=max_lines,
+            max_chars=max_chars,
+        )
+    return max_lines, max_chars
@@ -0,0 +1,234 @@
+"""Deduplicação das leituras repetidas de um mesmo arquivo na conversa.
+
+O agente relê com frequência intervalos que se sobrepõem ao que já está no
+contexto (ex.: linhas 1-400 e depois 100-300 do mesmo módulo), e o texto
+idêntico entra duas vezes na conversa. O `DedupMiddleware` intercepta cada
+resultado do `read_file` e compara o hash de cada linha numerada com as
+leituras anteriores do mesmo arquivo que ainda estão no estado do agente.
+Trechos de pelo menos `MIN_DEDUP_LINES` linhas iguais viram uma
+referência curta:
+
+    [UNCHANGED] linhas 0-119 inalteradas, ver leitura anterior (call_abc)
+
+As referências apontam sempre para uma `ToolMessage` presente no estado.
+Quando o `SummarizationMiddleware` resume a mensagem de origem, as
+referências das mensagens preservadas são expandidas de volta para o texto
+original (`expand_references`), de modo que nenhuma referência fica órfã.
+O perfil da execução conta `dedup_lines` e `dedup_chars_saved`.
+"""
+
+import re
+from typing import Any, Callable, Iterable
+
+from langchain.agents.middleware import AgentMiddleware
+
+from .profiling import current_profile
+
+# Trechos menores que isso não compensam a referência
+MIN_DEDUP_LINES = 8
+# Separador entre header/corpo/rodapé do read_file
+_RULE = "-" * 60
+_TRUNCATED = "…[TRUNCATED_OUTPUT_MAX_CHARS]"
+_HEADER_PATH = re.compile(r"^Arquivo: (.+)$", re.MULTILINE)
+_HEADER_RANGE = re.compile(r"^Linhas: (\d+)-(\d+) \(0-indexed\)", re.MULTILINE)
+_REFERENCE = re.compile(r"^\[UNCHANGED\] linhas (\d+)-(\d+) inalteradas, ver leitura anterior \((.+)\)$")
+
+
+class _Page:
+    """Saída paginada do read_file decomposta em header, corpo e rodapé."""
+
+    def __init__(self, path: str, width: int, header: list[str], body: list[str], footer: list[str]) -> None:
+        self.path = path
+        self.width = width
+        self.header = header
+        self.body = body
+        self.footer = footer
+
+    def numbered(self, line: str) -> tuple[int, str] | None:
+        """`(linha 0-indexed, texto)` de uma linha do corpo; None para marcadores."""
+        prefix = line[: self.width]
+        if line[self.width : self.width + 5] != "     " or not prefix.strip().isdigit():
+            return None
+        text = line[self.width + 5 :]
+        # A última linha cortada por max_chars não é o conteúdo real da linha
+        if text.endswith(_TRUNCATED):
+            return None
+        return int(prefix), text
+
+    def format(self, number: int, text: str) -> str:
+        return f"{str(number).ljust(self.width)}     {text}"
+
+    def render(self) -> str:
+        parts = ["\n".join(self.header), "\n".join(self.body)]
+        if self.footer:
+            parts.append("\n".join(self.footer))
+        return "\n".join(parts)
+
+
+def _parse(content: Any) -> _Page | None:
+    """Decompõe uma saída paginada do read_file (None para esqueletos, erros etc.)."""
+    if not isinstance(content, str) or not content.startswith("Arquivo: "):
+        return None
+    path, span = _HEADER_PATH.search(content), _HEADER_RANGE.search(content)
+    lines = content.split("\n")
+    if path is None or span is None or _RULE not in lines:
+        return None
+    split = lines.index(_RULE) + 1
+    header, rest = lines[:split], lines[split:]
+    footer: list[str] = []
+    # O rodapé (opcional) vem depois da última régua; linhas do corpo sempre têm número ou marcador
+    if _RULE in rest:
+        cut = len(rest) - 1 - rest[::-1].index(_RULE)
+        rest, footer = rest[:cut], rest[cut:]
+    return _Page(path.group(1), len(span.group(2)), header, rest, footer)
+
+
+def _is_read(message: Any) -> bool:
+    return getattr(message, "type", "") == "tool" and getattr(message, "name", None) == "read_file"
+
+
+def _lines_of(page: _Page, resolved: dict[str, dict[int, str]]) -> dict[int, str]:
+    """Linhas de `page`, com as referências resolvidas a partir de `resolved`."""
+    lines: dict[int, str] = {}
+    for line in page.body:
+        ref = _REFERENCE.match(line)
+        if ref is not None:
+            source = resolved.get(ref.group(3), {})
+            for number in range(int(ref.group(1)), int(ref.group(2)) + 1):
+                if number in source:
+                    lines[number] = source[number]
+            continue
+        entry = page.numbered(line)
+        if entry is not None:
+            lines[entry[0]] = entry[1]
+    return lines
+
+
+def expand_references(preserved: list[Any], removed: Iterable[Any]) -> list[Any]:
+    """`preserved` com as referências a leituras em `removed` expandidas para o texto original.
+
+    Usado pelo `SummarizationMiddleware`: as mensagens resumidas saem do
+    estado, e uma referência a elas deixaria o agente sem o conteúdo.
+    """
+    resolved: dict[str, dict[int, str]] = {}
+    for message in removed:
+        if _is_read(message):
+            page = _parse(message.content)
+            if page is not None:
+                resolved[message.tool_call_id] = _lines_of(page, resolved)
+    if not resolved:
+        return preserved
+
+    expanded = []
+    for message in preserved:
+        page = _parse(message.content) if _is_read(message) else None
+        if page is None or not any(
+            (ref := _REFERENCE.match(line)) and ref.group(3) in resolved for line in page.body
+        ):
+            expanded.append(message)
+            continue
+        body: list[str] = []
+        for line in page.body:
+            ref = _REFERENCE.match(line)
+            source = resolved.get(ref.group(3)) if ref is not None else None
+            if source is None:
+                body.append(line)
+                continue
+            body.extend(
+                page.format(number, source[number])
+                for number in range(int(ref.group(1)), int(ref.group(2)) + 1)
+                if number in source
+            )
+        page.body = body
+        expanded.append(message.model_copy(update={"content": page.render()}))
+    return expanded
+
+
+def _known_lines(messages: Iterable[Any], path: str) -> dict[int, tuple[int, str]]:
+    """Hash e id da leitura mais recente de cada linha de `path` presente em `messages`."""
+    known: dict[int, tuple[int, str]] = {}
+    for message in messages:
+        if not _is_read(message):
+            continue
+        page = _parse(message.content)
+        if page is None or page.path != path:
+            continue
+        for line in page.body:
+            entry = page.numbered(line)
+            if entry is not None:
+                known[entry[0]] = (hash(entry[1]), message.tool_call_id)
+    return known
+
+
+def dedup_page(content: str, messages: Iterable[Any]) -> tuple[str, int]:
+    """Substitui em `content` os trechos iguais a leituras anteriores em `messages`.
+
+    Returns:
+        O conteúdo resultante e o número de linhas substituídas.
+    """
+    page = _parse(content)
+    if page is None:
+        return content, 0
+    known = _known_lines(messages, page.path)
+    if not known:
+        return content, 0
+
+    body: list[str] = []
+    run: list[str] = []
+    run_start = run_source = None
+    replaced = 0
+
+    def close_run() -> None:
+        nonlocal replaced
+        if len(run) >= MIN_DEDUP_LINES:
+            last = run_start + len(run) - 1
+            body.append(f"[UNCHANGED] linhas {run_start}-{last} inalteradas, ver leitura anterior ({run_source})")
+            replaced += len(run)
+        else:
+            body.extend(run)
+        run.clear()
+
+    for line in page.body:
+        entry = page.numbered(line)
+        match = known.get(entry[0]) if entry is not None else None
+        if match is None or match[0] != hash(entry[1]):
+            close_run()
+            body.append(line)
+            continue
+        if run and (match[1] != run_source or entry[0] != run_start + len(run)):
+            close_run()
+        if not run:
+            run_start, run_source = entry[0], match[1]
+        run.append(line)
+    close_run()
+
+    if not replaced:
+        return content, 0
+    page.body = body
+    return page.render(), replaced
+
+
+class DedupMiddleware(AgentMiddleware):
+    """Troca trechos repetidos dos resultados do `read_file` por referências às leituras anteriores."""
+
+    def _apply(self, request, result):
+        if request.tool_call.get("name") != "read_file" or not isinstance(getattr(result, "content", None), str):
+            return result
+        state = getattr(request, "state", None) or {}
+        messages = state.get("messages") if hasattr(state, "get") else None
+        if not messages:
+            return result
+        content, replaced = dedup_page(result.content, messages)
+        if not replaced:
+            return result
+        profile = current_profile()
+        if profile is not None:
+            profile.incr("dedup_lines", replaced)
+            profile.incr("dedup_chars_saved", len(result.content) - len(content))
+        return result.model_copy(update={"content": content})
+
+    def wrap_tool_call(self, request, handler: Callable):
+        return self._apply(request, handler(request))
+
+    async def awrap_tool_call(self, request, handler: Callable):
+        return self._apply(request, await handler(request))
@@ -0,0 +1,299 @@
+"""Caderno de notas da análise, em memória e endereçado por seção.
+
+Substitui as idas e voltas com o DRAFT.md (`write_file(append=True)` a cada
+conclusão e `read_file` do rascunho inteiro para compor o documento final).
+Cada repositório tem um `DraftStore` com dois documentos:
+
+  - `draft`: notas de trabalho da análise;
+  - `onboarding`: seções do documento final, renderizadas localmente para o
+    `ONBOARDING.md` em uma única passada.
+
+As seções ficam em dicts indexados pelo título normalizado (upsert O(1),
+ordem de criação preservada). A persistência também é O(1) em relação ao
+caderno: cada alteração anexa uma linha JSON ao diário
+`<repo>/.codebase-analyst/draft.jsonl` (upsert com a seção, append só com o
+trecho novo, delete com o título). Ao abrir o caderno o diário é
+reproduzido, então uma execução retomada com `--resume` encontra as notas;
+quando o diário passa de `COMPACT_RATIO` vezes o tamanho do caderno, ele é
+reescrito de forma atômica com uma linha por seção.
+
+As seções do documento final também vão para o disco assim que são escritas
+(`ONBOARDING.partial.md`, no mesmo diretório), e o `render` só antepõe o
+preâmbulo e copia esse arquivo em blocos para o `ONBOARDING.md`.
+
+Durante uma reanálise incremental, o CLI e o batch apontam o render para
+`ONBOARDING.update.md` (`rendering_to`): só as seções reescritas vão para
+esse arquivo, que depois é mesclado ao documento existente.
+"""
+
+import contextvars
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator
+
+from .analysis_state import DOCUMENT_FILE, STATE_DIR
+from .file_writer import atomic_write_chunks
+
+DRAFT_STORE_FILE = "draft.jsonl"
+# Seções do documento final gravadas à medida que são escritas (antes do render)
+DOCUMENT_STREAM_FILE = "ONBOARDING.partial.md"
+DRAFT_STORE_VERSION = 1
+DOCUMENTS = ("draft", "onboarding")
+# O diário é compactado quando fica maior que isso vezes o conteúdo vivo (e que COMPACT_MIN_BYTES)
+COMPACT_RATIO = 4
+COMPACT_MIN_BYTES = 256 * 1024
+
+
+def _key(title: str) -> str:
+    return re.sub(r"[^\w]+", " ", title.lower()).strip()
+
+
+def _section_chunk(section: dict[str, Any], first: bool) -> str:
+    """Bloco Markdown de uma seção; as seguintes à primeira começam com a linha em branco separadora."""
+    return ("" if first else "\n") + f"## {section['title']}\n\n{section['content'].strip()}\n"
+
+
+class DraftStore:
+    """Seções de notas de um repositório, persistidas no diário `draft.jsonl` (thread-safe)."""
+
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root).resolve()
+        self.path = self.root / STATE_DIR / DRAFT_STORE_FILE
+        self.stream_path = self.root / STATE_DIR / DOCUMENT_STREAM_FILE
+        self._docs: dict[str, dict[str, dict[str, Any]]] = {name: {} for name in DOCUMENTS}
+        # Bytes do diário em disco e do conteúdo vivo, para decidir a compactação
+        self._journal_bytes = 0
+        self._live_bytes = 0
+        # O arquivo de stream corresponde às seções de `onboarding` (só há seções novas no fim)
+        self._stream_ok = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, root: str | Path) -> "DraftStore":
+        """Abre o caderno de `root`, reproduzindo o diário persistido (se houver)."""
+        store = cls(root)
+        damaged = False
+        try:
+            with open(store.path, encoding="utf-8") as f:
+                for line in f:
+                    store._journal_bytes += len(line.encode("utf-8"))
+                    try:
+                        store._replay(json.loads(line))
+                    except (ValueError, KeyError, TypeError):
+                        # Linha incompleta (queda no meio de uma escrita)
+                        damaged = True
+        except OSError:
+            pass
+        store._live_bytes = sum(
+            len(section["content"]) for sections in store._docs.values() for section in sections.values()
+        )
+        if damaged:
+            # Sem isso, a próxima linha seria colada à linha incompleta
+            with store._lock:
+                store._compact_locked()
+        return store
+
+    def _replay(self, entry: dict[str, Any]) -> None:
+        sections = self._docs[entry["doc"]]
+        key = _key(entry["title"])
+        if entry["op"] == "delete":
+            sections.pop(key, None)
+            return
+        current = sections.get(key)
+        content = entry["content"]
+        if entry["op"] == "append" and current is not None and current["content"]:
+            content = current["content"].rstrip("\n") + "\n\n" + content
+        sections[key] = {
+            "title": current["title"] if current else entry["title"],
+            "content": content,
+            "updated_at": entry.get("t", time.time()),
+        }
+
+    def _journal_locked(self, entry: dict[str, Any]) -> None:
+        """Anexa uma alteração ao diário, compactando-o quando cresce demais."""
+        line = json.dumps({"v": DRAFT_STORE_VERSION, "t": time.time(), **entry}, ensure_ascii=False) + "\n"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+        self._journal_bytes += len(line.encode("utf-8"))
+        if self._journal_bytes > max(COMPACT_MIN_BYTES, COMPACT_RATIO * self._live_bytes):
+            self._compact_locked()
+
+    def _compact_locked(self) -> None:
+        """Reescreve o diário com uma linha de upsert por seção (temporário + rename)."""
+        lines = []
+        for name, sections in self._docs.items():
+            for section in sections.values():
+                entry = {
+                    "v": DRAFT_STORE_VERSION,
+                    "t": section["updated_at"],
+                    "op": "upsert",
+                    "doc": name,
+                    "title": section["title"],
+                    "content": section["content"],
+                }
+                lines.append(json.dumps(entry, ensure_ascii=False) + "\n")
+        atomic_write_chunks(self.path, lines)
+        self._journal_bytes = sum(len(line.encode("utf-8")) for line in lines)
+
+    def _document(self, document: str) -> dict[str, dict[str, Any]]:
+        if document not in self._docs:
+            raise ValueError(f"documento '{document}' inválido; use {' ou '.join(DOCUMENTS)}")
+        return self._docs[document]
+
+    def upsert(self, document: str, title: str, content: str, append: bool = False) -> dict[str, Any]:
+        """Cria ou substitui (ou, com `append`, estende) a seção `title`.
+
+        Returns:
+            A seção resultante (`title`, `content`, `updated_at`).
+        """
+        title = title.strip()
+        if not _key(title):
+            raise ValueError("o título da seção está vazio")
+        with self._lock:
+            sections = self._document(document)
+            current = sections.get(_key(title))
+            # No diário, um append leva só o trecho novo
+            entry = {"op": "append" if append else "upsert", "doc": document, "title": title, "content": content}
+            if append and current is not None and current["content"]:
+                content = current["content"].rstrip("\n") + "\n\n" + content
+            section = {"title": current["title"] if current else title, "content": content, "updated_at": time.time()}
+            sections[_key(title)] = section
+            self._live_bytes += len(content) - (len(current["content"]) if current else 0)
+            # Depois de atualizar a memória: uma compactação aqui já inclui esta alteração
+            self._journal_locked(entry)
+            if document == "onboarding":
+                self._stream_locked(section, first=len(sections) == 1, new=current is None)
+            return section
+
+    def _stream_locked(self, section: dict[str, Any], first: bool, new: bool) -> None:
+        """Anexa uma seção nova do documento final ao arquivo de stream.
+
+        Seções alteradas ou removidas tiram o stream de sincronia; o render
+        então monta o documento a partir das seções em memória.
+        """
+        if first and new:
+            self.stream_path.unlink(missing_ok=True)
+            self._stream_ok = True
+        if not (new and self._stream_ok):
+            self._stream_ok = False
+            return
+        self.stream_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.stream_path, "a", encoding="utf-8") as f:
+            f.write(_section_chunk(section, first))
+
+    def get(self, document: str, title: str) -> dict[str, Any] | None:
+        with self._lock:
+            return self._document(document).get(_key(title))
+
+    def delete(self, document: str, title: str) -> bool:
+        with self._lock:
+            removed = self._document(document).pop(_key(title), None)
+            if removed is not None:
+                self._live_bytes -= len(removed["content"])
+                self._journal_locked({"op": "delete", "doc": document, "title": title})
+                if document == "onboarding":
+                    self._stream_ok = False
+            return removed is not None
+
+    def sections(self, document: str) -> list[dict[str, Any]]:
+        """Seções do documento, na ordem de criação."""
+        with self._lock:
+            return list(self._document(document).values())
+
+    def iter_markdown(self, document: str, preamble: str = "") -> Iterator[str]:
+        """O documento em Markdown, um bloco por seção: `preamble` e depois `## título` + conteúdo."""
+        preamble = preamble.strip() if preamble else ""
+        if preamble:
+            yield preamble + "\n"
+        for i, section in enumerate(self.sections(document)):
+            yield _section_chunk(section, first=not preamble and i == 0)
+
+    def render_markdown(self, document: str, preamble: str = "") -> str:
+        """O documento inteiro em Markdown: `preamble` seguido de `## título` + conteúdo por seção."""
+        return "".join(self.iter_markdown(document, preamble))
+
+    def render_document(self, preamble: str = "", filename: str = DOCUMENT_FILE) -> Path:
+        """Grava as seções de `onboarding` em `<repo>/<filename>`, de forma atômica.
+
+        Com o arquivo de stream em sincronia, o documento é o `preamble`
+        seguido de uma cópia em blocos do stream; senão, é montado seção a
+        seção. Em nenhum caso o documento inteiro fica em memória.
+        """
+        path = self.root / filename
+        with self._lock:
+            streamed = self._stream_ok and self.stream_path.is_file()
+        if streamed:
+            atomic_write_chunks(path, self._iter_stream(preamble))
+        else:
+            atomic_write_chunks(path, self.iter_markdown("onboarding", preamble))
+        return path
+
+    def _iter_stream(self, preamble: str) -> Iterator[str]:
+        preamble = preamble.strip() if preamble else ""
+        with open(self.stream_path, encoding="utf-8") as f:
+            if preamble:
+                yield preamble + "\n"
+                # O stream começa sem separador; com preâmbulo, a primeira seção precisa de um
+                yield "\n"
+            yield from iter(lambda: f.read(1 << 16), "")
+
+    def clear(self) -> None:
+        """Descarta todas as seções e o arquivo persistido."""
+        with self._lock:
+            for sections in self._docs.values():
+                sections.clear()
+            self.path.unlink(missing_ok=True)
+            self.stream_path.unlink(missing_ok=True)
+            self._stream_ok = False
+            self._journal_bytes = self._live_bytes = 0
+
+
+# Arquivo gravado pelo render na execução atual (relativo à raiz do repositório)
+_RENDER_TARGET: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "codebase_analyst_render_target", default=DOCUMENT_FILE
+)
+
+
+def render_target() -> str:
+    """Nome do arquivo que o render grava na execução atual."""
+    return _RENDER_TARGET.get()
+
+
+@contextmanager
+def rendering_to(filename: str):
+    """Faz o render gravar `filename` durante o bloco `with` (ex.: `ONBOARDING.update.md`)."""
+    token = _RENDER_TARGET.set(filename)
+    try:
+        yield filename
+    finally:
+        _RENDER_TARGET.reset(token)
+
+
+def set_render_target(filename: str) -> None:
+    """Faz o render gravar `filename` no contexto atual (para o CLI)."""
+    _RENDER_TARGET.set(filename)
+
+
+# Cadernos abertos no processo: raiz -> DraftStore
+_STORES: dict[Path, DraftStore] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def get_store(root: str | Path) -> DraftStore:
+    """Caderno de `root`, carregado do disco na primeira vez em que é pedido."""
+    root = Path(root).resolve()
+    with _STORES_LOCK:
+        store = _STORES.get(root)
+        if store is None:
+            store = _STORES[root] = DraftStore.load(root)
+        return store
+
+
+def reset_store(root: str | Path) -> None:
+    """Começa um caderno vazio para `root` (nova análise, não retomada)."""
+    get_store(root).clear()
@@ -0,0 +1,214 @@
+"""Sumarizador extrativo local, sem chamadas ao modelo.
+
+Alternativa ao resumo feito por LLM no `SummarizationMiddleware` para
+quando o orçamento de tokens está apertado (`--summarizer extractive`) e
+fallback automático quando a chamada ao modelo de resumo falha. O resumo é
+montado só a partir da estrutura das mensagens:
+
+  - a tarefa original (primeira mensagem do usuário);
+  - os arquivos e intervalos de linhas lidos, e os diretórios listados;
+  - as seções de notas e os arquivos escritos;
+  - a última lista de tarefas (`write_todos`);
+  - as conclusões mais recentes do agente (texto das mensagens do modelo);
+  - os erros retornados pelas tools.
+
+Um resumo extrativo anterior (que substituiu as mensagens mais antigas) é
+relido seção por seção e suas listas são mescladas às novas, sem duplicatas;
+um resumo anterior feito pelo LLM entra inteiro em uma seção própria.
+
+Perde nuances que um LLM preservaria, mas custa milissegundos e nenhum token.
+"""
+
+import re
+from typing import Any
+
+# Limites de cada parte do resumo
+MAX_SUMMARY_CHARS = 12_000
+MAX_TASK_CHARS = 2_000
+MAX_CONCLUSIONS = 8
+MAX_CONCLUSION_CHARS = 800
+MAX_ERRORS = 5
+
+SUMMARY_HEADER = "# Extractive summary (local, no LLM)"
+# Prefixo com que o SummarizationMiddleware devolve o resumo ao histórico
+_SUMMARY_PREFIX = "Here is a summary of the conversation"
+_TRUNCATED = "…[TRUNCATED_SUMMARY]"
+_RANGE = re.compile(r" L\d+-(?:\d+|…)")
+_TODO = re.compile(r"^\[([^\]]*)\] ?(.*)$", re.S)
+_NOTES = re.compile(r"^notes\[([^\]]+)\]: (.*)$")
+
+
+def _text(message: Any) -> str:
+    content = getattr(message, "content", "")
+    if isinstance(content, str):
+        return content
+    parts = []
+    for block in content or []:
+        if isinstance(block, str):
+            parts.append(block)
+        elif isinstance(block, dict) and block.get("type") == "text":
+            parts.append(str(block.get("text", "")))
+    return "\n".join(parts)
+
+
+def _clip(text: str, limit: int) -> str:
+    text = text.strip()
+    return text if len(text) <= limit else text[:limit].rstrip() + " …"
+
+
+def _read_range(args: dict[str, Any]) -> str:
+    start, end = args.get("start"), args.get("end")
+    if start in (None, 1) and end is None:
+        return ""
+    return f" L{start or 1}-{end if end is not None else '…'}"
+
+
+def _bullet(text: str) -> str:
+    """Item de lista; linhas seguintes recuadas, para o item ser relido inteiro."""
+    return "- " + "\n".join(f"  {line}" if line else line for line in text.splitlines()).lstrip()
+
+
+def _bullets(body: str) -> list[str]:
+    """Itens de uma lista escrita por `_bullet` (o inverso dele)."""
+    items: list[str] = []
+    for line in body.splitlines():
+        if line.startswith("- "):
+            items.append(line[2:])
+        elif items and (line.startswith("  ") or not line.strip()):
+            items[-1] += "\n" + line[2:]
+    return [item.strip() for item in items]
+
+
+def parse_summary(text: str) -> dict[str, str] | None:
+    """Seções (`{título: corpo}`) de um resumo gerado por `extractive_summary`, ou None."""
+    start = text.find(SUMMARY_HEADER)
+    if start < 0:
+        return None
+    body = text[start + len(SUMMARY_HEADER):].replace(_TRUNCATED, "")
+    sections: dict[str, str] = {}
+    for chunk in re.split(r"^## ", body, flags=re.M)[1:]:
+        title, _, content = chunk.partition("\n")
+        # "Files already read (N)" -> "Files already read"
+        sections[re.sub(r" \(\d+\)$", "", title.strip())] = content.strip()
+    return sections
+
+
+def extractive_summary(messages: list[Any], max_chars: int = MAX_SUMMARY_CHARS) -> str:
+    """Resumo em Markdown de `messages`, extraído sem LLM."""
+    task: list[str] = []
+    files_read: dict[str, list[str]] = {}
+    dirs_listed: list[str] = []
+    notes: dict[str, set[str]] = {}
+    files_written: list[str] = []
+    todos: list[Any] = []
+    conclusions: list[str] = []
+    errors: list[str] = []
+    # Resumos anteriores feitos pelo LLM (sem estrutura para mesclar)
+    earlier: list[str] = []
+
+    def read(path: str, span: str) -> None:
+        spans = files_read.setdefault(path, [])
+        if span not in spans:
+            spans.append(span)
+
+    def merge(sections: dict[str, str]) -> None:
+        """Acrescenta as listas de um resumo extrativo anterior às desta passada."""
+        nonlocal todos
+        if sections.get("Task") and not task:
+            task.append(sections["Task"])
+        if sections.get("Earlier summary"):
+            earlier.append(sections["Earlier summary"])
+        parsed_todos = []
+        for item in _bullets(sections.get("Todo list", "")):
+            match = _TODO.match(item)
+            if match:
+                parsed_todos.append({"status": match.group(1), "content": match.group(2)})
+        todos = parsed_todos or todos
+        for item in _bullets(sections.get("Files already read", "")):
+            spans = _RANGE.findall(item)
+            path = _RANGE.sub("", item).rstrip(",").strip() if spans else item
+            for span in spans or [""]:
+                read(path, span)
+        for item in _bullets(sections.get("Directories listed", "")):
+            if item not in dirs_listed:
+                dirs_listed.append(item)
+        for item in _bullets(sections.get("Notes and files written", "")):
+            match = _NOTES.match(item)
+            if match:
+                notes.setdefault(match.group(1), set()).update(t.strip() for t in match.group(2).split(", "))
+            elif item.startswith("wrote ") and item[6:] not in files_written:
+                files_written.append(item[6:])
+        conclusions.extend(_bullets(sections.get("Recent conclusions", "")))
+        errors.extend(_bullets(sections.get("Tool errors", "")))
+
+    for message in messages:
+        kind = getattr(message, "type", "")
+        text = _text(message)
+        if kind == "human":
+            if text.startswith(_SUMMARY_PREFIX):
+                sections = parse_summary(text)
+                if sections is not None:
+                    merge(sections)
+                else:
+                    earlier.append(_clip(text.partition("\n\n")[2] or text, MAX_TASK_CHARS))
+            elif not task:
+                task.append(_clip(text, MAX_TASK_CHARS))
+        elif kind == "ai":
+            if text.strip():
+                conclusion = _clip(text, MAX_CONCLUSION_CHARS)
+                if conclusion not in conclusions:
+                    conclusions.append(conclusion)
+            for call in getattr(message, "tool_calls", None) or []:
+                name, args = call.get("name"), call.get("args") or {}
+                path = str(args.get("path", ""))
+                if name == "read_file" and path:
+                    read(path, _read_range(args))
+                elif name == "list_dir" and path and path not in dirs_listed:
+                    dirs_listed.append(path)
+                elif name == "notes" and args.get("section"):
+                    action = args.get("action", "list")
+                    if action in ("upsert", "append"):
+                        notes.setdefault(str(args.get("document", "draft")), set()).add(str(args["section"]))
+                elif name == "write_file" and path and path not in files_written:
+                    files_written.append(path)
+                elif name == "write_todos":
+                    todos = args.get("todos") or todos
+        elif kind == "tool" and text.startswith("Erro"):
+            error = f"{getattr(message, 'name', None) or 'tool'}: {_clip(text.splitlines()[0], 300)}"
+            if error not in errors:
+                errors.append(error)
+
+    parts = [SUMMARY_HEADER]
+    if task:
+        parts.append("## Task\n\n" + task[0])
+    if earlier:
+        parts.append("## Earlier summary\n\n" + "\n\n".join(earlier))
+    if todos:
+        lines = []
+        for todo in todos:
+            if isinstance(todo, dict):
+                lines.append(f"- [{todo.get('status', 'pending')}] {todo.get('content', '')}")
+        if lines:
+            parts.append("## Todo list\n\n" + "\n".join(lines))
+    if files_read:
+        lines = [
+            f"- {path}" + (",".join(r for r in ranges if r) if any(ranges) else "")
+            for path, ranges in files_read.items()
+        ]
+        parts.append(f"## Files already read ({len(files_read)})\n\n" + "\n".join(lines))
+    if dirs_listed:
+        parts.append("## Directories listed\n\n" + "\n".join(f"- {d}" for d in dirs_listed))
+    if notes or files_written:
+        lines = [f"- notes[{doc}]: {', '.join(sorted(titles))}" for doc, titles in sorted(notes.items())]
+        lines += [f"- wrote {path}" for path in files_written]
+        parts.append("## Notes and files written\n\n" + "\n".join(lines))
+    if conclusions:
+        recent = conclusions[-MAX_CONCLUSIONS:]
+        parts.append("## Recent conclusions\n\n" + "\n\n".join(_bullet(c) for c in recent))
+    if errors:
+        parts.append("## Tool errors\n\n" + "\n".join(_bullet(e) for e in errors[-MAX_ERRORS:]))
+
+    summary = "\n\n".join(parts)
+    if len(summary) > max_chars:
+        summary = summary[:max_chars].rstrip() + "\n…[TRUNCATED_SUMMARY]"
+    return summary
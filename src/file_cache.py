@@ -0,0 +1,210 @@
+"""Cache em memória do conteúdo dos arquivos lidos pelo `read_file`.
+
+Cada entrada guarda os bytes do arquivo e o índice de offsets do início de
+cada linha, então ler o intervalo [start, end] é um fatiamento direto, sem
+percorrer as linhas anteriores. As entradas são validadas por mtime/tamanho
+a cada acesso e descartadas em ordem LRU acima de `MAX_CACHE_BYTES`.
+
+O cache é preenchido sob demanda pelo `read_file` e, antes dele, pelo
+prefetch especulativo (`prefetch.py`), que aquece os arquivos que o agente
+provavelmente vai ler enquanto o modelo gera o próximo turno. Entradas
+aquecidas pelo prefetch contam um `prefetch_hits` no perfil na primeira leitura.
+
+Para o formato compacto do `list_dir`, `count_lines` conta as linhas de um
+arquivo sem guardar o conteúdo (só o total, também validado por mtime).
+"""
+
+import os
+import re
+import threading
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+
+from .profiling import current_profile
+
+# Arquivos maiores que isso são lidos em streaming pelo read_file, sem cache
+MAX_CACHED_FILE_BYTES = 4 * 1024 * 1024
+# Orçamento total do cache (bytes de conteúdo)
+MAX_CACHE_BYTES = 128 * 1024 * 1024
+# Arquivos maiores que isso aparecem no list_dir só com o tamanho
+MAX_COUNTED_FILE_BYTES = 1024 * 1024
+# Máximo de totais de linhas guardados (o cache é esvaziado ao passar disso)
+MAX_LINE_COUNTS = 200_000
+
+_CACHE: "OrderedDict[Path, CachedFile]" = OrderedDict()
+_CACHE_BYTES = 0
+_LOCK = threading.Lock()
+# path -> (mtime_ns, tamanho, linhas ou None para binários)
+_LINE_COUNTS: dict[Path, tuple[int, int, int | None]] = {}
+
+
+# Terminadores de linha do modo texto do Python (universal newlines), como no read_file em streaming
+_NEWLINE = re.compile(rb"\r\n|\r|\n")
+
+
+def _line_offsets(data: bytes) -> array:
+    """Offset do início de cada linha (uma linha final sem terminador também conta).
+
+    Segue as mesmas regras de quebra do modo texto (`\\r\\n`, `\\r` e `\\n`),
+    para que arquivos servidos pelo cache e em streaming tenham a mesma numeração.
+    """
+    offsets = array("Q")
+    if not data:
+        return offsets
+    offsets.append(0)
+    if b"\r" in data:
+        size = len(data)
+        offsets.extend(m.end() for m in _NEWLINE.finditer(data) if m.end() < size)
+        return offsets
+    find = data.find
+    pos = find(b"\n")
+    while pos != -1 and pos + 1 < len(data):
+        offsets.append(pos + 1)
+        pos = find(b"\n", pos + 1)
+    return offsets
+
+
+class CachedFile:
+    """Conteúdo de um arquivo com o índice de offsets de linha."""
+
+    __slots__ = ("mtime_ns", "size", "data", "offsets", "prefetched")
+
+    def __init__(self, data: bytes, mtime_ns: int, size: int, prefetched: bool = False) -> None:
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.data = data
+        self.offsets = _line_offsets(data)
+        self.prefetched = prefetched
+
+    @property
+    def line_count(self) -> int:
+        return len(self.offsets)
+
+    def line(self, number: int) -> str:
+        """Linha `number` (1-indexed), sem o terminador (`\\r\\n`, `\\r` ou `\\n`).
+
+        Raises:
+            UnicodeDecodeError: se a linha não for UTF-8 válido (arquivo binário).
+        """
+        begin = self.offsets[number - 1]
+        end = self.offsets[number] if number < len(self.offsets) else len(self.data)
+        raw = self.data[begin:end]
+        if raw.endswith(b"\n"):
+            raw = raw[:-1]
+        if raw.endswith(b"\r"):
+            raw = raw[:-1]
+        return raw.decode("utf-8")
+
+
+def _store(path: Path, entry: CachedFile) -> None:
+    global _CACHE_BYTES
+    with _LOCK:
+        old = _CACHE.pop(path, None)
+        if old is not None:
+            _CACHE_BYTES -= old.size
+        _CACHE[path] = entry
+        _CACHE_BYTES += entry.size
+        while _CACHE_BYTES > MAX_CACHE_BYTES and len(_CACHE) > 1:
+            _, evicted = _CACHE.popitem(last=False)
+            _CACHE_BYTES -= evicted.size
+
+
+def _load(path: Path, prefetched: bool = False) -> CachedFile | None:
+    try:
+        st = path.stat()
+        if st.st_size > MAX_CACHED_FILE_BYTES:
+            return None
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    entry = CachedFile(data, st.st_mtime_ns, len(data), prefetched=prefetched)
+    _store(path, entry)
+    return entry
+
+
+def get_file(path: str | Path) -> CachedFile | None:
+    """Entrada atualizada de `path`, carregando-a se preciso; None se for grande demais ou ilegível."""
+    path = Path(path).resolve()
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    with _LOCK:
+        entry = _CACHE.get(path)
+        if entry is not None and entry.mtime_ns == st.st_mtime_ns and entry.size == st.st_size:
+            _CACHE.move_to_end(path)
+            hit, entry.prefetched = entry.prefetched, False
+        else:
+            entry = None
+    if entry is None:
+        return _load(path)
+    if hit:
+        profile = current_profile()
+        if profile is not None:
+            profile.incr("prefetch_hits")
+    return entry
+
+
+def warm_file(path: str | Path) -> bool:
+    """Carrega `path` no cache se ainda não estiver atualizado (usado pelo prefetch).
+
+    Returns:
+        True se o arquivo foi lido do disco agora.
+    """
+    path = Path(path).resolve()
+    try:
+        st = path.stat()
+    except OSError:
+        return False
+    with _LOCK:
+        entry = _CACHE.get(path)
+        if entry is not None and entry.mtime_ns == st.st_mtime_ns and entry.size == st.st_size:
+            return False
+    return _load(path, prefetched=True) is not None
+
+
+def count_lines(path: str | Path, st: os.stat_result | None = None) -> int | None:
+    """Total de linhas de `path` (como no header do read_file), cacheado por mtime.
+
+    Returns:
+        None para arquivos binários, ilegíveis ou maiores que `MAX_COUNTED_FILE_BYTES`.
+    """
+    path = Path(path)
+    try:
+        st = st or path.stat()
+    except OSError:
+        return None
+    if st.st_size > MAX_COUNTED_FILE_BYTES:
+        return None
+    with _LOCK:
+        known = _LINE_COUNTS.get(path)
+        if known is not None and known[:2] == (st.st_mtime_ns, st.st_size):
+            return known[2]
+        entry = _CACHE.get(path)
+    if entry is not None and entry.mtime_ns == st.st_mtime_ns and entry.size == st.st_size:
+        data = entry.data
+    else:
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+    if b"\0" in data[:8192]:
+        count = None
+    else:
+        count = len(_line_offsets(data))
+    with _LOCK:
+        if len(_LINE_COUNTS) >= MAX_LINE_COUNTS:
+            _LINE_COUNTS.clear()
+        _LINE_COUNTS[path] = (st.st_mtime_ns, st.st_size, count)
+    return count
+
+
+def clear_file_cache() -> None:
+    global _CACHE_BYTES
+    with _LOCK:
+        _CACHE.clear()
+        _LINE_COUNTS.clear()
+        _CACHE_BYTES = 0
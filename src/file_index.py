@@ -0,0 +1,112 @@
+"""Índice de arquivos do repositório analisado.
+
+Varre o repositório ignorando diretórios de dependências, builds e caches
+(`SKIP_DIRS`) e calcula impressões digitais dos arquivos (mtime, tamanho e
+SHA-1). O hash só é recalculado quando mtime ou tamanho mudam em relação a
+um índice anterior, então revarrer um repositório grande e quase inalterado
+custa basicamente um `stat` por arquivo.
+"""
+
+import hashlib
+import os
+from pathlib import Path
+from typing import Any, Iterator
+
+# Diretórios nunca indexados (dependências, builds, caches e metadados)
+SKIP_DIRS = frozenset(
+    {
+        ".git",
+        ".hg",
+        ".svn",
+        ".codebase-analyst",
+        ".venv",
+        "venv",
+        "env",
+        "node_modules",
+        "__pycache__",
+        ".mypy_cache",
+        ".pytest_cache",
+        ".ruff_cache",
+        ".tox",
+        ".nox",
+        ".idea",
+        ".vscode",
+        "dist",
+        "build",
+        "target",
+        ".next",
+        ".cache",
+    }
+)
+
+# Arquivos maiores que isso entram no índice, mas sem hash de conteúdo
+MAX_HASH_BYTES = 32 * 1024 * 1024
+
+
+def iter_repo_files(root: Path, include_hidden: bool = False) -> Iterator[tuple[str, os.stat_result]]:
+    """Itera (caminho relativo POSIX, stat) dos arquivos regulares do repositório."""
+    root = Path(root)
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            entries = list(os.scandir(current))
+        except (PermissionError, FileNotFoundError, NotADirectoryError):
+            continue
+        for entry in sorted(entries, key=lambda e: e.name):
+            if not include_hidden and entry.name.startswith("."):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in SKIP_DIRS:
+                        stack.append(Path(entry.path))
+                elif entry.is_file(follow_symlinks=False):
+                    rel = Path(entry.path).relative_to(root).as_posix()
+                    yield rel, entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+
+
+def is_indexed_path(rel: str, include_hidden: bool = False) -> bool:
+    """Indica se um caminho relativo seria visitado por `iter_repo_files`."""
+    parts = rel.replace("\\", "/").split("/")
+    if any(part in SKIP_DIRS for part in parts[:-1]):
+        return False
+    return include_hidden or not any(part.startswith(".") for part in parts)
+
+
+def file_sha1(path: Path) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def fingerprint_repo(
+    root: Path, previous: dict[str, dict[str, Any]] | None = None
+) -> dict[str, dict[str, Any]]:
+    """Impressões digitais `{rel: {"mtime_ns", "size", "sha1"}}` dos arquivos.
+
+    Args:
+        root: Raiz do repositório.
+        previous: Índice anterior; entradas com mesmo mtime e tamanho
+            reaproveitam o hash sem reler o arquivo.
+    """
+    root = Path(root)
+    previous = previous or {}
+    index: dict[str, dict[str, Any]] = {}
+    for rel, st in iter_repo_files(root):
+        mtime_ns = st.st_mtime_ns
+        old = previous.get(rel)
+        if old and old.get("mtime_ns") == mtime_ns and old.get("size") == st.st_size:
+            index[rel] = old
+            continue
+        sha1 = None
+        if st.st_size <= MAX_HASH_BYTES:
+            try:
+                sha1 = file_sha1(root / rel)
+            except OSError:
+                continue
+        index[rel] = {"mtime_ns": mtime_ns, "size": st.st_size, "sha1": sha1}
+    return index
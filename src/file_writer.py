@@ -0,0 +1,198 @@
+"""Escrita durável dos arquivos gerados pelo agente.
+
+Duas estratégias, usadas pelo `write_file`:
+
+  - sobrescrita atômica (`atomic_write_text`): o conteúdo vai para um arquivo
+    temporário no mesmo diretório, que substitui o destino com `os.replace`.
+    Uma queda no meio da escrita deixa o arquivo antigo intacto, nunca um
+    `ONBOARDING.md` truncado;
+  - write-behind para appends (`append_text`, opcional): os trechos anexados
+    ficam em um buffer em memória por arquivo e são gravados em uma única
+    escrita quando o buffer passa de `WRITE_BEHIND_MAX_BYTES`, no primeiro
+    append feito depois que o buffer ficou mais velho que
+    `WRITE_BEHIND_MAX_SECONDS` (não há timer: a idade só é verificada em
+    `append_text`), antes de qualquer leitura do arquivo pelas tools
+    (`flush_writes`) e ao final da execução. Remover o arquivo descarta os
+    appends pendentes sem gravá-los (`discard_writes`).
+
+O write-behind é ligado com `configure_writes(write_behind=True)` (ou a
+variável `CODEBASE_ANALYST_WRITE_BEHIND=1`). A política de fsync
+(`configure_writes` ou a variável `CODEBASE_ANALYST_FSYNC`):
+
+  - `never`: nenhum fsync (o sistema operacional decide quando gravar);
+  - `atomic` (padrão): fsync do temporário antes do rename, de modo que o
+    rename nunca expõe um arquivo incompleto após uma queda de energia;
+  - `always`: também fsync do diretório após o rename e de cada append gravado.
+"""
+
+import atexit
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Iterable
+
+FSYNC_POLICIES = ("never", "atomic", "always")
+DEFAULT_FSYNC = "atomic"
+# Limites do buffer de write-behind de cada arquivo
+WRITE_BEHIND_MAX_BYTES = 64 * 1024
+WRITE_BEHIND_MAX_SECONDS = 2.0
+
+_FSYNC = os.getenv("CODEBASE_ANALYST_FSYNC", DEFAULT_FSYNC)
+if _FSYNC not in FSYNC_POLICIES:
+    _FSYNC = DEFAULT_FSYNC
+_WRITE_BEHIND = os.getenv("CODEBASE_ANALYST_WRITE_BEHIND", "") not in ("", "0")
+
+
+class _Pending:
+    """Trechos anexados a um arquivo que ainda não foram gravados."""
+
+    def __init__(self, has_content: bool) -> None:
+        self.parts: list[str] = []
+        self.size = 0
+        self.since = time.monotonic()
+        # O arquivo (somado ao buffer) já tem conteúdo: o próximo trecho leva separador
+        self.has_content = has_content
+
+
+_PENDING: dict[Path, _Pending] = {}
+_LOCK = threading.Lock()
+
+
+def configure_writes(fsync: str | None = None, write_behind: bool | None = None) -> None:
+    """Define a política de fsync e liga/desliga o write-behind dos appends."""
+    global _FSYNC, _WRITE_BEHIND
+    if fsync is not None:
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"política de fsync '{fsync}' inválida; use {', '.join(FSYNC_POLICIES)}")
+        _FSYNC = fsync
+    if write_behind is not None:
+        _WRITE_BEHIND = write_behind
+        if not write_behind:
+            flush_writes()
+
+
+def _fsync_dir(directory: Path) -> None:
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return  # ex.: Windows não abre diretórios
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write_text(path: str | Path, text: str) -> Path:
+    """Substitui o conteúdo de `path` de forma atômica (temporário + rename)."""
+    return atomic_write_chunks(path, (text,))
+
+
+def atomic_write_chunks(path: str | Path, chunks: Iterable[str]) -> Path:
+    """Como `atomic_write_text`, mas grava `chunks` um a um no temporário.
+
+    O conteúdo nunca precisa estar inteiro em memória: cada bloco (ex.: uma
+    seção do documento) vai para o disco assim que é produzido.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Appends pendentes seriam gravados por cima do conteúdo novo
+    with _LOCK:
+        _PENDING.pop(path.resolve(), None)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            for chunk in chunks:
+                f.write(chunk)
+            if _FSYNC != "never":
+                f.flush()
+                os.fsync(f.fileno())
+        try:
+            # Preserva as permissões de um arquivo existente
+            os.chmod(tmp, path.stat().st_mode)
+        except OSError:
+            pass
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    if _FSYNC == "always":
+        _fsync_dir(path.parent)
+    return path
+
+
+def _write_appends(path: Path, data: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(data)
+        if _FSYNC == "always":
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def append_text(path: str | Path, text: str, separator: str = "\n\n") -> bool:
+    """Anexa `text` a `path` (precedido de `separator` se o arquivo já tiver conteúdo).
+
+    Returns:
+        True se o trecho ficou no buffer de write-behind; False se foi gravado.
+    """
+    path = Path(path).resolve()
+    with _LOCK:
+        pending = _PENDING.get(path)
+        if pending is None:
+            try:
+                has_content = path.stat().st_size > 0
+            except OSError:
+                has_content = False
+            pending = _Pending(has_content)
+        chunk = separator + text if pending.has_content else text
+        pending.has_content = pending.has_content or bool(text)
+
+        if not _WRITE_BEHIND:
+            _PENDING.pop(path, None)
+            _write_appends(path, "".join(pending.parts) + chunk)
+            return False
+
+        pending.parts.append(chunk)
+        pending.size += len(chunk)
+        _PENDING[path] = pending
+        if pending.size < WRITE_BEHIND_MAX_BYTES and time.monotonic() - pending.since < WRITE_BEHIND_MAX_SECONDS:
+            return True
+        del _PENDING[path]
+        _write_appends(path, "".join(pending.parts))
+        return False
+
+
+def flush_writes(path: str | Path | None = None) -> list[Path]:
+    """Grava os appends pendentes de `path` (arquivo ou diretório) ou de todos os arquivos.
+
+    Returns:
+        Os arquivos gravados.
+    """
+    base = Path(path).resolve() if path is not None else None
+    flushed: list[Path] = []
+    with _LOCK:
+        if not _PENDING:
+            return flushed
+        for target in list(_PENDING):
+            if base is not None and target != base and base not in target.parents:
+                continue
+            pending = _PENDING.pop(target)
+            _write_appends(target, "".join(pending.parts))
+            flushed.append(target)
+    return flushed
+
+
+def discard_writes(path: str | Path) -> bool:
+    """Descarta os appends pendentes de `path` (ex.: o arquivo vai ser removido).
+
+    Returns:
+        True se havia appends pendentes.
+    """
+    with _LOCK:
+        return _PENDING.pop(Path(path).resolve(), None) is not None
+
+
+atexit.register(flush_writes)
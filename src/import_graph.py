@@ -0,0 +1,436 @@
+"""Grafo de imports (dependências internas) do repositório analisado.
+
+Construído a partir dos imports extraídos pelo índice de símbolos
+(`code_index.py`), então reaproveita o mesmo cache por mtime e a mesma
+indexação paralela:
+
+  - Python: imports absolutos resolvidos pelo nome do módulo (pacotes com
+    `__init__.py`, layout `src/` e scripts soltos) e imports relativos pelo
+    caminho do arquivo;
+  - JS/TS: especificadores relativos (`./x`, `../y`) resolvidos com as
+    extensões usuais e `index.*`; os demais contam como pacotes externos;
+  - Go: imports com o prefixo do módulo do `go.mod`; cada pacote
+    (diretório) é um nó do grafo.
+
+Sobre o grafo são calculados fan-in/fan-out, centralidade (PageRank), pontos
+de entrada e ciclos (componentes fortemente conexos), consultados pelo
+agente com a tool `import_graph` para priorizar os módulos centrais em vez
+de ler arquivos em largura.
+"""
+
+import json
+import re
+import sys
+import threading
+from pathlib import Path, PurePosixPath
+from typing import Any
+
+from .code_index import CACHE_DIR, build_index
+
+GRAPH_FILE = "import_graph.json"
+
+# Diretórios usados como raiz de código além da raiz do repositório
+_SOURCE_ROOTS = ("src", "lib", "python", "app")
+_JS_EXTENSIONS = (".ts", ".tsx", ".js", ".jsx", ".mjs", ".cjs")
+# Nomes típicos de pontos de entrada quando nada importa o arquivo
+_ENTRY_NAMES = frozenset({"main.py", "app.py", "manage.py", "wsgi.py", "asgi.py", "cli.py", "server.py", "__main__.py"})
+_TEST_PATTERN = re.compile(r"(^|/)(tests?|__tests__|spec)(/|$)|(^|/)test_[^/]*$|_test\.(py|go)$|\.(test|spec)\.[jt]sx?$")
+_SCRIPT_RE = re.compile(r"""["']?[\w.-]+["']?\s*=\s*["']([\w.]+):[\w.]+["']""")
+
+_STDLIB = frozenset(getattr(sys, "stdlib_module_names", ()))
+
+# Cache em memória: raiz -> (assinatura dos arquivos indexados, grafo)
+_GRAPHS: dict[Path, tuple[int, "ImportGraph"]] = {}
+_GRAPHS_LOCK = threading.Lock()
+
+
+def is_test_path(rel: str) -> bool:
+    return bool(_TEST_PATTERN.search(rel))
+
+
+class ImportGraph:
+    """Grafo dirigido `importador -> importado` entre arquivos/pacotes do repositório.
+
+    Attributes:
+        nodes: nó -> {"language", "lines", "files"}.
+        edges: nó -> nós que ele importa.
+        reverse: nó -> nós que o importam.
+        external: nó -> dependências externas (pacote de primeiro nível).
+        entry_points: nó -> motivo pelo qual é um ponto de entrada.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.nodes: dict[str, dict[str, Any]] = {}
+        self.edges: dict[str, set[str]] = {}
+        self.reverse: dict[str, set[str]] = {}
+        self.external: dict[str, set[str]] = {}
+        self.entry_points: dict[str, str] = {}
+        self._rank: dict[str, float] | None = None
+        self._cycles: list[list[str]] | None = None
+
+    def add_node(self, node: str, language: str, lines: int | None) -> None:
+        info = self.nodes.setdefault(node, {"language": language, "lines": 0, "files": 0})
+        info["lines"] += lines or 0
+        info["files"] += 1
+        self.edges.setdefault(node, set())
+        self.reverse.setdefault(node, set())
+        self.external.setdefault(node, set())
+
+    def add_edge(self, source: str, target: str) -> None:
+        if source != target:
+            self.edges[source].add(target)
+            self.reverse[target].add(source)
+
+    def fan_in(self, node: str) -> int:
+        return len(self.reverse.get(node, ()))
+
+    def fan_out(self, node: str) -> int:
+        return len(self.edges.get(node, ()))
+
+    @property
+    def edge_count(self) -> int:
+        return sum(len(targets) for targets in self.edges.values())
+
+    def pagerank(self, damping: float = 0.85, iterations: int = 30) -> dict[str, float]:
+        """Centralidade: módulos importados por módulos importantes pontuam mais."""
+        if self._rank is not None:
+            return self._rank
+        nodes = list(self.nodes)
+        n = len(nodes)
+        if not n:
+            self._rank = {}
+            return self._rank
+        rank = dict.fromkeys(nodes, 1.0 / n)
+        dangling = [node for node in nodes if not self.edges[node]]
+        for _ in range(iterations):
+            leaked = damping * sum(rank[node] for node in dangling) / n
+            base = (1.0 - damping) / n + leaked
+            new_rank = dict.fromkeys(nodes, base)
+            for node in nodes:
+                targets = self.edges[node]
+                if targets:
+                    share = damping * rank[node] / len(targets)
+                    for target in targets:
+                        new_rank[target] += share
+            rank = new_rank
+        self._rank = rank
+        return rank
+
+    def cycles(self) -> list[list[str]]:
+        """Ciclos de imports (componentes fortemente conexos com mais de um nó), maiores primeiro."""
+        if self._cycles is not None:
+            return self._cycles
+        # Tarjan iterativo: repositórios grandes estouram o limite de recursão
+        index: dict[str, int] = {}
+        low: dict[str, int] = {}
+        on_stack: set[str] = set()
+        stack: list[str] = []
+        components: list[list[str]] = []
+        counter = 0
+        for start in self.nodes:
+            if start in index:
+                continue
+            work = [(start, iter(sorted(self.edges[start])))]
+            index[start] = low[start] = counter
+            counter += 1
+            stack.append(start)
+            on_stack.add(start)
+            while work:
+                node, children = work[-1]
+                advanced = False
+                for child in children:
+                    if child not in index:
+                        index[child] = low[child] = counter
+                        counter += 1
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(sorted(self.edges[child]))))
+                        advanced = True
+                        break
+                    if child in on_stack:
+                        low[node] = min(low[node], index[child])
+                if advanced:
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1:
+                        components.append(sorted(component))
+        components.sort(key=lambda c: (-len(c), c))
+        self._cycles = components
+        return components
+
+    def central(self, limit: int = 20, include_tests: bool = False) -> list[str]:
+        rank = self.pagerank()
+        nodes = [n for n in self.nodes if include_tests or not is_test_path(n)]
+        return sorted(nodes, key=lambda n: (-rank[n], -self.fan_in(n), n))[:limit]
+
+    def external_usage(self) -> list[tuple[str, int]]:
+        """Dependências externas e quantos nós as importam, mais usadas primeiro."""
+        counts: dict[str, int] = {}
+        for deps in self.external.values():
+            for dep in deps:
+                counts[dep] = counts.get(dep, 0) + 1
+        return sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+
+    def as_dict(self) -> dict[str, Any]:
+        rank = self.pagerank()
+        return {
+            "root": str(self.root),
+            "nodes": {
+                node: {
+                    **info,
+                    "imports": sorted(self.edges[node]),
+                    "imported_by": sorted(self.reverse[node]),
+                    "external": sorted(self.external[node]),
+                    "rank": round(rank.get(node, 0.0), 6),
+                }
+                for node, info in sorted(self.nodes.items())
+            },
+            "entry_points": dict(sorted(self.entry_points.items())),
+            "cycles": self.cycles(),
+        }
+
+
+# ---------------------------------------------------------------------------
+# Resolução de imports
+# ---------------------------------------------------------------------------
+
+
+def _python_module_names(rel: str, package_dirs: set[str]) -> list[str]:
+    """Nomes pelos quais um arquivo Python pode ser importado."""
+    path = PurePosixPath(rel)
+    parts = list(path.with_suffix("").parts)
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    if not parts:
+        return []
+    names = {".".join(parts)}
+    # Sobe enquanto os diretórios forem pacotes (têm __init__.py)
+    top = len(path.parts) - 1
+    while top > 0 and "/".join(path.parts[:top]) in package_dirs:
+        top -= 1
+    names.add(".".join(parts[top:]))
+    if parts[0] in _SOURCE_ROOTS and len(parts) > 1:
+        names.add(".".join(parts[1:]))
+    return [name for name in names if name]
+
+
+def _first_segment(spec: str) -> str:
+    if spec.startswith("@"):
+        return "/".join(spec.split("/")[:2])
+    return spec.split("/")[0]
+
+
+class _Resolver:
+    def __init__(self, root: Path, index: dict[str, dict[str, Any]]) -> None:
+        self.root = root
+        self.files = set(index)
+        py_files = [rel for rel, entry in index.items() if entry.get("language") == "python"]
+        package_dirs = {str(PurePosixPath(rel).parent) for rel in py_files if rel.endswith("/__init__.py")}
+        self.modules: dict[str, list[str]] = {}
+        for rel in py_files:
+            for name in _python_module_names(rel, package_dirs):
+                self.modules.setdefault(name, []).append(rel)
+        for candidates in self.modules.values():
+            candidates.sort(key=lambda r: (r.count("/"), r))
+        self.go_module = self._read_go_module()
+
+    def _read_go_module(self) -> str | None:
+        try:
+            text = (self.root / "go.mod").read_text(encoding="utf-8")
+        except OSError:
+            return None
+        match = re.search(r"^module\s+(\S+)", text, re.MULTILINE)
+        return match.group(1) if match else None
+
+    def python_module(self, name: str) -> str | None:
+        candidates = self.modules.get(name)
+        return candidates[0] if candidates else None
+
+    def python_relative(self, rel: str, module: str, level: int) -> str | None:
+        base = PurePosixPath(rel).parent
+        for _ in range(level - 1):
+            base = base.parent
+        target = base.joinpath(*module.split(".")) if module else base
+        for candidate in (f"{target}.py", f"{target}/__init__.py"):
+            candidate = candidate.removeprefix("./")
+            if candidate in self.files:
+                return candidate
+        return None
+
+    def python(self, rel: str, spec: list[Any]) -> tuple[list[str], str | None]:
+        """(alvos internos, dependência externa) de um import Python."""
+        module, level, names = spec
+        if level:
+            targets = [self.python_relative(rel, f"{module}.{n}" if module else n, level) for n in names]
+            targets = [t for t in targets if t]
+            if not targets:
+                own = self.python_relative(rel, module, level)
+                targets = [own] if own else []
+            return targets, None
+        targets = [self.python_module(f"{module}.{n}") for n in names]
+        targets = [t for t in targets if t]
+        if not targets:
+            own = self.python_module(module)
+            if own:
+                targets = [own]
+            else:
+                top = module.split(".")[0]
+                return [], None if top in _STDLIB or top == "__future__" else top
+        return targets, None
+
+    def javascript(self, rel: str, spec: str) -> tuple[list[str], str | None]:
+        if not spec.startswith("."):
+            if spec.startswith(("node:", "/", "http:", "https:")):
+                return [], None
+            return [], _first_segment(spec)
+        target = (PurePosixPath(rel).parent / spec).as_posix()
+        # Normaliza ".." sem tocar o sistema de arquivos
+        parts: list[str] = []
+        for part in target.split("/"):
+            if part == "..":
+                if parts:
+                    parts.pop()
+            elif part not in (".", ""):
+                parts.append(part)
+        target = "/".join(parts)
+        candidates = [target]
+        stem = target
+        if target.endswith((".js", ".jsx", ".mjs")):
+            # TypeScript importa "./x.js" para o arquivo "./x.ts"
+            stem = target.rsplit(".", 1)[0]
+        candidates += [stem + ext for ext in _JS_EXTENSIONS]
+        candidates += [f"{target}/index{ext}" for ext in _JS_EXTENSIONS]
+        for candidate in candidates:
+            if candidate in self.files:
+                return [candidate], None
+        return [], None
+
+    def go(self, spec: str) -> tuple[list[str], str | None]:
+        if self.go_module and (spec == self.go_module or spec.startswith(self.go_module + "/")):
+            sub = spec[len(self.go_module):].strip("/")
+            return [go_package_node(sub)], None
+        if "." not in spec.split("/")[0]:
+            return [], None  # biblioteca padrão
+        return [], "/".join(spec.split("/")[:3])
+
+
+def go_package_node(directory: str) -> str:
+    """Nó de um pacote Go: o diretório com `/` no final (`./` na raiz)."""
+    return f"{directory.strip('/')}/" if directory.strip("/") not in ("", ".") else "./"
+
+
+def _node_of(rel: str, entry: dict[str, Any]) -> str:
+    if entry.get("language") == "go":
+        return go_package_node(str(PurePosixPath(rel).parent))
+    return rel
+
+
+def _declared_entry_points(root: Path, resolver: _Resolver) -> dict[str, str]:
+    """Pontos de entrada declarados em pyproject.toml/setup.py/package.json."""
+    found: dict[str, str] = {}
+    for name in ("pyproject.toml", "setup.py", "setup.cfg"):
+        try:
+            text = (root / name).read_text(encoding="utf-8")
+        except OSError:
+            continue
+        for module in _SCRIPT_RE.findall(text):
+            target = resolver.python_module(module)
+            if target:
+                found.setdefault(target, f"script declarado em {name}")
+    try:
+        package = json.loads((root / "package.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        package = {}
+    if isinstance(package, dict):
+        declared = [package.get("main"), package.get("module")]
+        bin_field = package.get("bin")
+        declared += list(bin_field.values()) if isinstance(bin_field, dict) else [bin_field]
+        for spec in declared:
+            if isinstance(spec, str):
+                targets, _ = resolver.javascript("package.json", "./" + spec.removeprefix("./"))
+                for target in targets:
+                    found.setdefault(target, "declarado em package.json")
+    return found
+
+
+def build_graph(root: str | Path, persist: bool = True) -> ImportGraph:
+    """Constrói (ou reaproveita do cache) o grafo de imports de `root`.
+
+    Args:
+        root: Raiz do repositório.
+        persist: Se True, usa o cache em disco do índice de símbolos e grava o
+            grafo em `<root>/.codebase-analyst/import_graph.json`.
+    """
+    root = Path(root).resolve()
+    index = build_index(root, persist=persist)
+    signature = hash(tuple((rel, entry.get("mtime_ns"), entry.get("size")) for rel, entry in sorted(index.items())))
+    with _GRAPHS_LOCK:
+        cached = _GRAPHS.get(root)
+    if cached and cached[0] == signature:
+        return cached[1]
+
+    resolver = _Resolver(root, index)
+    graph = ImportGraph(root)
+    for rel, entry in index.items():
+        if entry.get("language") in ("python", "javascript", "typescript", "go"):
+            graph.add_node(_node_of(rel, entry), entry["language"], entry.get("lines"))
+
+    for rel, entry in index.items():
+        language = entry.get("language")
+        if language not in ("python", "javascript", "typescript", "go"):
+            continue
+        node = _node_of(rel, entry)
+        for spec in entry.get("imports", []):
+            if language == "python":
+                targets, external = resolver.python(rel, spec)
+            elif language == "go":
+                targets, external = resolver.go(spec)
+            else:
+                targets, external = resolver.javascript(rel, spec)
+            for target in targets:
+                if target in graph.nodes:
+                    graph.add_edge(node, target)
+            if external:
+                graph.external[node].add(external)
+        if entry.get("main"):
+            graph.entry_points.setdefault(
+                node, "package main" if language == "go" else 'bloco if __name__ == "__main__"'
+            )
+
+    for node, reason in _declared_entry_points(root, resolver).items():
+        graph.entry_points[node] = reason
+    for node in graph.nodes:
+        if PurePosixPath(node).name in _ENTRY_NAMES and not graph.fan_in(node) and not is_test_path(node):
+            graph.entry_points.setdefault(node, "nome típico de entry point, sem importadores")
+
+    if persist:
+        path = root / CACHE_DIR / GRAPH_FILE
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".json.tmp")
+            tmp.write_text(json.dumps(graph.as_dict(), ensure_ascii=False), encoding="utf-8")
+            tmp.replace(path)
+        except OSError:
+            # Repositório somente leitura: o grafo continua em memória
+            pass
+
+    with _GRAPHS_LOCK:
+        _GRAPHS[root] = (signature, graph)
+    return graph
+
+
+def clear_graph_cache() -> None:
+    with _GRAPHS_LOCK:
+        _GRAPHS.clear()
@@ -0,0 +1,512 @@
+"""Modo map-reduce: um sub-agente por pacote de nível superior, em paralelo.
+
+Um único agente explora o repositório em série, então o tempo de parede
+cresce linearmente com o tamanho do repositório. Neste modo:
+
+  1. partição: o repositório é dividido em subárvores (pacotes ou serviços de
+     nível superior). Contêineres como `src/`, `packages/` e `services/` são
+     abertos um nível, a subárvore que domina o repositório é subdividida e
+     subárvores pequenas são agrupadas em uma partição `misc`;
+  2. map: cada partição é analisada por um sub-agente (`create_codebase_agent`
+     com o `PARTITION_PROMPT`) em um pool de threads limitado. Os sub-agentes
+     dividem o mesmo rate limiter, têm um orçamento de tokens cada e escrevem
+     um relatório parcial com seções fixas em
+     `<repo>/.codebase-analyst/partials/<partição>.md`;
+  3. reduce: um agente com o `REDUCE_PROMPT` lê os relatórios parciais e os
+     arquivos da raiz e escreve o `ONBOARDING.md`. Se ele não produzir o
+     documento, os relatórios são mesclados localmente, seção a seção.
+"""
+
+import os
+import re
+import shutil
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Callable
+
+from langchain.chat_models import BaseChatModel
+from langchain.rate_limiters import BaseRateLimiter
+from rich.text import Text
+
+from .agent import create_codebase_agent
+from .analysis_state import DOCUMENT_FILE, STATE_DIR, split_sections
+from .file_index import iter_repo_files
+from .profiling import RunProfile
+from .prompts import PARTITION_PROMPT, REDUCE_PROMPT
+from .render import console
+from .runner import run_analysis
+from .token_rate_limiter import InMemoryTokenAndRequestRateLimiter
+
+PARTIALS_DIR = "partials"
+
+# Diretórios que agrupam pacotes/serviços: cada filho vira uma partição
+CONTAINER_DIRS = frozenset(
+    {"src", "lib", "libs", "packages", "services", "apps", "modules", "plugins", "cmd", "internal", "components"}
+)
+
+# Seções de cada relatório parcial, nesta ordem
+PARTIAL_SECTIONS = (
+    "Summary",
+    "Structure",
+    "Entry Points and Public Surface",
+    "Key Files",
+    "Internal Flows",
+    "Decision Points",
+    "External Dependencies and Boundaries",
+    "Configuration",
+    "Where to Change X",
+    "Risks",
+    "Cross-Partition Dependencies",
+)
+
+DEFAULT_MAX_PARTITIONS = 8
+DEFAULT_MIN_FILES = 5
+DEFAULT_PARTITION_TOKEN_BUDGET = 1_500_000
+MISC_PARTITION = "misc"
+
+# Máximo de caminhos listados por partição na mensagem do sub-agente
+_MAX_MESSAGE_PATHS = 50
+
+
+class MapReduceCancelled(Exception):
+    """A execução map-reduce foi cancelada (ex.: Ctrl-C no processo principal)."""
+
+
+class Partition:
+    """Subárvore do repositório analisada por um sub-agente.
+
+    `paths` são relativos à raiz: diretórios (a subárvore inteira) ou, para
+    os arquivos soltos de um diretório subdividido, os próprios arquivos.
+    """
+
+    def __init__(self, name: str, paths: list[str], files: int = 0, size: int = 0) -> None:
+        self.name = name
+        self.paths = paths
+        self.files = files
+        self.size = size
+
+    @property
+    def slug(self) -> str:
+        """Nome seguro para o arquivo do relatório parcial."""
+        return re.sub(r"[^\w.-]+", "_", self.name).strip("_") or "root"
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"name": self.name, "paths": self.paths, "files": self.files, "size": self.size}
+
+
+# ---------------------------------------------------------------------------
+# Partição
+# ---------------------------------------------------------------------------
+
+
+def _unit_of(rel: str) -> str:
+    parts = rel.split("/")
+    if parts[0] in CONTAINER_DIRS and len(parts) > 2:
+        return "/".join(parts[:2])
+    return parts[0]
+
+
+def _split_unit(name: str, members: list[tuple[str, int]]) -> dict[str, list[tuple[str, int]]]:
+    """Divide a subárvore `name` pelos seus filhos diretos (arquivos soltos ficam em `name`)."""
+    depth = name.count("/") + 1
+    children: dict[str, list[tuple[str, int]]] = {}
+    for rel, size in members:
+        parts = rel.split("/")
+        key = "/".join(parts[: depth + 1]) if len(parts) > depth + 1 else name
+        children.setdefault(key, []).append((rel, size))
+    return children
+
+
+def partition_repo(
+    root: str | Path,
+    max_partitions: int = DEFAULT_MAX_PARTITIONS,
+    min_files: int = DEFAULT_MIN_FILES,
+) -> list[Partition]:
+    """Divide o repositório em partições, maiores primeiro.
+
+    Arquivos da raiz (README, manifests) não entram em nenhuma partição: eles
+    são lidos pela etapa de reduce.
+
+    Args:
+        root: Raiz do repositório.
+        max_partitions: Máximo de partições; as menores excedentes vão para `misc`.
+        min_files: Subárvores com menos arquivos que isso vão para `misc`.
+    """
+    root = Path(root).resolve()
+    max_partitions = max(1, int(max_partitions))
+    files = [(rel, st.st_size) for rel, st in iter_repo_files(root) if "/" in rel]
+    if not files:
+        return []
+
+    units: dict[str, list[tuple[str, int]]] = {}
+    for rel, size in files:
+        units.setdefault(_unit_of(rel), []).append((rel, size))
+    # Unidades subdivididas: só os arquivos soltos do diretório pertencem a elas
+    split: set[str] = set()
+
+    # Uma subárvore com metade ou mais do repositório é subdividida
+    while len(units) < max_partitions:
+        name, members = max(units.items(), key=lambda item: (len(item[1]), item[0]))
+        if name in split or len(members) * 2 < len(files):
+            break
+        children = _split_unit(name, members)
+        if len(children) < 2:
+            break
+        del units[name]
+        units.update(children)
+        if name in children:
+            split.add(name)
+
+    def _paths(name: str) -> list[str]:
+        return sorted(rel for rel, _ in units[name]) if name in split else [name]
+
+    ordered = sorted(units, key=lambda name: (-len(units[name]), name))
+    keep = [name for name in ordered if len(units[name]) >= min_files]
+    if len(keep) > max_partitions or (len(keep) == max_partitions and len(keep) < len(ordered)):
+        # Reserva a última vaga para `misc`
+        keep = keep[: max_partitions - 1]
+    rest = [name for name in ordered if name not in keep]
+    if len(rest) == 1:
+        keep, rest = keep + rest, []
+
+    partitions = [
+        Partition(name, _paths(name), len(units[name]), sum(size for _, size in units[name])) for name in keep
+    ]
+    if rest:
+        partitions.append(
+            Partition(
+                MISC_PARTITION,
+                [path for name in sorted(rest) for path in _paths(name)],
+                sum(len(units[name]) for name in rest),
+                sum(size for name in rest for _, size in units[name]),
+            )
+        )
+    return partitions
+
+
+# ---------------------------------------------------------------------------
+# Mensagens dos sub-agentes e do reduce
+# ---------------------------------------------------------------------------
+
+
+def partials_dir(root: Path) -> Path:
+    return Path(root) / STATE_DIR / PARTIALS_DIR
+
+
+def report_path(root: Path, partition: Partition) -> Path:
+    return partials_dir(root) / f"{partition.slug}.md"
+
+
+def _path_listing(root: Path, paths: list[str]) -> str:
+    shown = "\n".join(f"  - {root / rel}" for rel in paths[:_MAX_MESSAGE_PATHS])
+    if len(paths) > _MAX_MESSAGE_PATHS:
+        shown += f"\n  - ... e mais {len(paths) - _MAX_MESSAGE_PATHS}"
+    return shown
+
+
+def build_partition_message(root: Path, partition: Partition, token_budget: int | None = None) -> str:
+    """Mensagem inicial do sub-agente de uma partição."""
+    sections = "\n".join(f"## {title}" for title in PARTIAL_SECTIONS)
+    budget = (
+        f"\nSeu orçamento é de {token_budget} tokens: escreva o relatório cedo e atualize-o ao longo da análise.\n"
+        if token_budget
+        else ""
+    )
+    return (
+        f"Repositório: '{root}'.\n"
+        f"Sua partição: '{partition.name}' ({partition.files} arquivos), composta por:\n"
+        f"{_path_listing(root, partition.paths)}\n\n"
+        f"Analise somente essa partição e escreva o relatório parcial em '{report_path(root, partition)}' "
+        f"com exatamente estas seções, nesta ordem:\n{sections}\n"
+        + budget
+    )
+
+
+def build_reduce_message(root: Path, results: list[dict[str, Any]]) -> str:
+    """Mensagem inicial da etapa de reduce, com os relatórios parciais disponíveis."""
+    labels = {"ok": "completo", "budget_exhausted": "orçamento esgotado, pode estar incompleto"}
+    lines = []
+    for result in results:
+        if not result.get("has_report"):
+            continue
+        paths = ", ".join(result["paths"][:10]) + (" ..." if len(result["paths"]) > 10 else "")
+        status = labels.get(result.get("status"), "sub-agente falhou, pode estar incompleto")
+        lines.append(f"  - {result['report']} — partição '{result['partition']}' ({paths}); {status}")
+    return (
+        f"O repositório '{root}' foi dividido em partições e cada uma foi analisada por um sub-agente. "
+        f"Relatórios parciais:\n" + "\n".join(lines) + "\n\n"
+        f"Leia todos os relatórios e os arquivos da raiz do repositório, conecte as partições pelo grafo "
+        f"de imports e escreva '{root / DOCUMENT_FILE}' com todas as seções exigidas."
+    )
+
+
+# ---------------------------------------------------------------------------
+# Relatórios parciais
+# ---------------------------------------------------------------------------
+
+
+def _section_key(title: str) -> str:
+    return re.sub(r"[^\w]+", " ", title.lower()).strip()
+
+
+def read_partial_report(path: Path) -> dict[str, str]:
+    """Seções `{título: corpo}` de um relatório parcial (corpo sem a linha do título)."""
+    try:
+        text = path.read_text(encoding="utf-8")
+    except OSError:
+        return {}
+    sections = {}
+    for title, body in split_sections(text):
+        if title:
+            sections[title] = body.split("\n", 1)[1].strip() if "\n" in body else ""
+    return sections
+
+
+def missing_sections(sections: dict[str, str]) -> list[str]:
+    present = {_section_key(title) for title, body in sections.items() if body}
+    return [title for title in PARTIAL_SECTIONS if _section_key(title) not in present]
+
+
+def merge_partial_reports(root: Path, partitions: list[Partition]) -> Path:
+    """Mescla localmente os relatórios parciais em `ONBOARDING.md`, seção a seção.
+
+    Usado quando a etapa de reduce não produz o documento. Cada seção de
+    `PARTIAL_SECTIONS` reúne o conteúdo de todas as partições; seções extras
+    vão para "Other Notes". A escrita é atômica.
+    """
+    root = Path(root)
+    reports = [(partition, read_partial_report(report_path(root, partition))) for partition in partitions]
+    known = {_section_key(title) for title in PARTIAL_SECTIONS}
+
+    parts = [
+        f"# {root.name} — Onboarding\n\n"
+        "> Documento mesclado localmente a partir dos relatórios parciais de cada partição "
+        f"(`{STATE_DIR}/{PARTIALS_DIR}/`).\n"
+    ]
+    for title in PARTIAL_SECTIONS:
+        bodies = [
+            f"### {partition.name}\n\n{body}"
+            for partition, sections in reports
+            for section, body in sections.items()
+            if body and _section_key(section) == _section_key(title)
+        ]
+        if bodies:
+            parts.append(f"## {title}\n\n" + "\n\n".join(bodies) + "\n")
+    extras = [
+        f"### {partition.name}: {section}\n\n{body}"
+        for partition, sections in reports
+        for section, body in sections.items()
+        if body and _section_key(section) not in known
+    ]
+    if extras:
+        parts.append("## Other Notes\n\n" + "\n\n".join(extras) + "\n")
+
+    document_path = root / DOCUMENT_FILE
+    tmp = document_path.with_suffix(".md.tmp")
+    tmp.write_text("\n".join(parts), encoding="utf-8")
+    os.replace(tmp, document_path)
+    return document_path
+
+
+# ---------------------------------------------------------------------------
+# Execução
+# ---------------------------------------------------------------------------
+
+
+def run_map_reduce(
+    target_path: Path,
+    model_name: str | BaseChatModel = "anthropic:claude-sonnet-4-5",
+    workers: int = 4,
+    requests_per_second: float | None = None,
+    token_budget: int | None = DEFAULT_PARTITION_TOKEN_BUDGET,
+    max_partitions: int = DEFAULT_MAX_PARTITIONS,
+    rate_limiter: BaseRateLimiter | None = None,
+    config: dict | None = None,
+    on_progress: Callable[[dict[str, Any]], None] | None = None,
+    profile: RunProfile | None = None,
+    agent_options: dict[str, Any] | None = None,
+) -> dict[str, Any]:
+    """Analisa `target_path` com sub-agentes por partição e gera o `ONBOARDING.md`.
+
+    Args:
+        target_path: Caminho absoluto do repositório.
+        model_name: Modelo ('provider:model' ou `BaseChatModel`) dos sub-agentes e do reduce.
+        workers: Máximo de sub-agentes simultâneos.
+        requests_per_second: Cota de chamadas ao modelo compartilhada por todos os
+            sub-agentes e pelo reduce. Ignorado se `rate_limiter` for informado.
+        token_budget: Orçamento de tokens de cada partição (None ou 0: sem limite).
+        max_partitions: Máximo de partições.
+        rate_limiter: Limiter já existente a compartilhar (ex.: o do servidor).
+        config: Config do LangGraph repassada a cada execução (callbacks, recursion_limit).
+        on_progress: Callback chamado (de várias threads) com eventos de progresso
+            `{"partition", "kind", "time", ...}`.
+        profile: Perfil que recebe a soma dos perfis das partições e do reduce.
+        agent_options: Opções extras de `create_codebase_agent` aplicadas aos
+            sub-agentes e ao reduce (ex.: `summary_model`, `summarizer`,
+            `prompt_cache`, `prefetch`, `dedup`).
+
+    Returns:
+        Manifesto com as partições, o resultado de cada sub-agente e do reduce.
+
+    Raises:
+        ValueError: se não houver subdiretórios com arquivos para particionar.
+        MapReduceCancelled / KeyboardInterrupt: se a execução for interrompida.
+    """
+    root = Path(target_path).resolve()
+    t0 = time.perf_counter()
+    partitions = partition_repo(root, max_partitions=max_partitions)
+    if not partitions:
+        raise ValueError(f"'{root}' não tem subdiretórios com arquivos para particionar; use o modo normal")
+
+    shutil.rmtree(partials_dir(root), ignore_errors=True)
+    partials_dir(root).mkdir(parents=True, exist_ok=True)
+    if rate_limiter is None and requests_per_second:
+        rate_limiter = InMemoryTokenAndRequestRateLimiter(
+            requests_per_second=requests_per_second,
+            max_request_bucket_size=max(1.0, float(workers)),
+        )
+    cancel = threading.Event()
+
+    def _emit(partition: str, kind: str, **payload) -> None:
+        if on_progress is not None:
+            on_progress({"partition": partition, "kind": kind, "time": time.time(), **payload})
+
+    def _run(name: str, system_prompt: str, user_message: str, budget: int | None) -> dict[str, Any]:
+        result: dict[str, Any] = {"partition": name}
+
+        def on_event(event: dict[str, Any]) -> None:
+            if cancel.is_set():
+                raise MapReduceCancelled("execução cancelada")
+            if event["type"] == "tool_call":
+                _emit(name, "tool_call", name=event["name"])
+
+        run_profile = RunProfile()
+        try:
+            # O agente compilado (em cache) é compartilhado por todos os sub-agentes
+            agent = create_codebase_agent(
+                model_name=model_name,
+                rate_limiter=rate_limiter,
+                system_prompt=system_prompt,
+                **(agent_options or {}),
+            )
+            stats = run_analysis(
+                agent,
+                root,
+                config=config,
+                on_event=on_event,
+                profile=run_profile,
+                user_message=user_message,
+                token_budget=budget,
+            )
+            result.update(stats.as_dict())
+            result["status"] = "budget_exhausted" if stats.budget_exhausted else "ok"
+        except Exception as e:
+            result["status"] = "error"
+            result["error"] = f"{type(e).__name__}: {e}"
+            result["traceback"] = traceback.format_exc()
+        result["profile"] = run_profile.as_dict()
+        if profile is not None:
+            profile.merge(run_profile)
+        return result
+
+    def _map(partition: Partition) -> dict[str, Any]:
+        path = report_path(root, partition)
+        _emit(partition.name, "started", files=partition.files)
+        message = build_partition_message(root, partition, token_budget)
+        result = _run(partition.name, PARTITION_PROMPT, message, token_budget)
+        result["paths"] = partition.paths
+        result["files"] = partition.files
+        result["report"] = str(path)
+        sections = read_partial_report(path)
+        result["has_report"] = bool(sections)
+        result["missing_sections"] = missing_sections(sections)
+        _emit(partition.name, "error" if result["status"] == "error" else "finished", **_progress_fields(result))
+        return result
+
+    results: dict[str, dict[str, Any]] = {}
+    pool = ThreadPoolExecutor(
+        max_workers=max(1, min(int(workers), len(partitions))), thread_name_prefix="analyst-partition"
+    )
+    try:
+        futures = {pool.submit(_map, partition): partition for partition in partitions}
+        for future in as_completed(futures):
+            results[futures[future].name] = future.result()
+    except BaseException:
+        cancel.set()
+        pool.shutdown(wait=True, cancel_futures=True)
+        raise
+    pool.shutdown()
+    map_results = [results[partition.name] for partition in partitions]
+
+    manifest: dict[str, Any] = {
+        "path": str(root),
+        "partitions": [partition.as_dict() for partition in partitions],
+        "map": map_results,
+        "map_wall_time_s": round(time.perf_counter() - t0, 3),
+    }
+    reported = [partition for partition, result in zip(partitions, map_results) if result["has_report"]]
+    if not reported:
+        raise RuntimeError("nenhum sub-agente produziu relatório parcial; veja os erros de cada partição")
+
+    _emit("reduce", "started")
+    document_path = root / DOCUMENT_FILE
+    # Um ONBOARDING.md de uma análise anterior não conta: o reduce precisa ter gravado o documento
+    before = _file_signature(document_path)
+    reduce_result = _run("reduce", REDUCE_PROMPT, build_reduce_message(root, map_results), None)
+    after = _file_signature(document_path)
+    if after is None or after == before:
+        merge_partial_reports(root, reported)
+        reduce_result["fallback"] = "local_merge"
+    _emit("reduce", "error" if reduce_result["status"] == "error" else "finished", **_progress_fields(reduce_result))
+
+    manifest["reduce"] = reduce_result
+    manifest["output"] = str(document_path)
+    manifest["wall_time_s"] = round(time.perf_counter() - t0, 3)
+    manifest["tokens"] = sum(r.get("tokens", {}).get("total", 0) for r in [*map_results, reduce_result])
+    return manifest
+
+
+def _file_signature(path: Path) -> tuple[int, int, int] | None:
+    """(mtime, tamanho, inode) de `path`, ou None se não existir."""
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+def _progress_fields(result: dict[str, Any]) -> dict[str, Any]:
+    fields = {"status": result["status"], "tokens": result.get("tokens", {}).get("total", 0)}
+    if "wall_time_s" in result:
+        fields["wall_time_s"] = result["wall_time_s"]
+    for key in ("error", "missing_sections", "fallback"):
+        if result.get(key):
+            fields[key] = result[key]
+    return fields
+
+
+def print_progress(event: dict[str, Any], verbose: bool = False) -> None:
+    """Imprime um evento de progresso de `run_map_reduce`."""
+    name = event["partition"]
+    kind = event["kind"]
+    if kind == "started":
+        files = f" ({event['files']} arquivos)" if event.get("files") else ""
+        console.print(Text(f"  ▶ {name}: iniciado{files}", style="cyan"))
+    elif kind == "tool_call" and verbose:
+        console.print(Text(f"    · {name}: {event['name']}", style="white"))
+    elif kind == "finished":
+        details = f"{event.get('wall_time_s', 0):.1f}s, {event['tokens']} tokens"
+        if event["status"] == "budget_exhausted":
+            details += ", orçamento esgotado"
+        if event.get("missing_sections"):
+            details += f", seções ausentes: {', '.join(event['missing_sections'])}"
+        if event.get("fallback"):
+            details += ", documento mesclado localmente"
+        style = "green" if event["status"] == "ok" and not event.get("missing_sections") else "yellow"
+        console.print(Text(f"  ✓ {name}: concluído ({details})", style=style))
+    elif kind == "error":
+        suffix = ", documento mesclado localmente" if event.get("fallback") else ""
+        console.print(Text(f"  ✖ {name}: {event.get('error', 'erro')}{suffix}", style="red"))
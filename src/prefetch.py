@@ -0,0 +1,160 @@
+"""Prefetch especulativo dos próximos arquivos enquanto o modelo pensa.
+
+Entre o resultado de uma tool e a próxima tool call, a máquina fica ociosa
+esperando o modelo gerar o turno. O `PrefetchMiddleware` usa esse tempo: a
+cada tool call de exploração, prevê os arquivos que o agente deve ler em
+seguida e os carrega no cache do `read_file` (conteúdo + offsets de linha,
+`file_cache.py`) em threads de fundo. Quando o `read_file` chega, a leitura
+é um fatiamento em memória.
+
+Previsões, por tool:
+
+  - `list_dir`: os arquivos mais bem ranqueados (`ranking.py`) sob o
+    diretório listado, ou os primeiros arquivos do diretório sem ranking;
+  - `read_file`: os arquivos que o arquivo lido importa (grafo de imports),
+    do mais central para o menos;
+  - `next_files_to_read`/`import_graph`: o topo da fila de leitura.
+
+Arquivos já lidos na sessão ficam de fora. O perfil da execução conta
+`prefetch_scheduled`, `prefetch_warmed` e `prefetch_hits` (leituras servidas
+por uma entrada aquecida pelo prefetch).
+
+O grafo e o ranking vêm da visão da execução (`ranking.repo_view`), montada
+uma vez a partir do índice pré-aquecido: prever uma leitura não varre o
+repositório.
+"""
+
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable
+
+from langchain.agents.middleware import AgentMiddleware
+
+from .code_index import language_of, warmed_root_of
+from .file_cache import MAX_CACHED_FILE_BYTES, warm_file
+from .profiling import current_profile
+from .ranking import current_session, get_ranking, repo_view
+
+# Arquivos aquecidos por tool call e threads de aquecimento
+MAX_PREDICTIONS = 6
+PREFETCH_WORKERS = 4
+# Tools após as quais vale prever as próximas leituras
+_TRIGGERS = frozenset({"list_dir", "read_file", "next_files_to_read", "import_graph"})
+# Marcadores da raiz de um repositório, para tools chamadas fora de uma raiz aquecida
+_ROOT_MARKERS = (".git", ".codebase-analyst")
+
+
+def repo_root_of(path: Path) -> Path | None:
+    """Raiz do repositório que contém `path` (aquecida pelo CLI ou com .git/.codebase-analyst)."""
+    root = warmed_root_of(path)
+    if root is not None:
+        return root
+    for candidate in (path, *path.parents):
+        if any((candidate / marker).exists() for marker in _ROOT_MARKERS):
+            return candidate
+    return None
+
+
+def _unread(root: Path, rels: list[str], limit: int) -> list[Path]:
+    session = current_session()
+    picked: list[Path] = []
+    for rel in rels:
+        path = root / rel
+        if not session.was_read(path) and path.is_file() and path.stat().st_size <= MAX_CACHED_FILE_BYTES:
+            picked.append(path)
+            if len(picked) >= limit:
+                break
+    return picked
+
+
+def predict_reads(tool: str, args: dict[str, Any], limit: int = MAX_PREDICTIONS) -> list[Path]:
+    """Arquivos que o agente provavelmente lerá depois de chamar `tool` com `args`."""
+    raw = args.get("path")
+    if tool not in _TRIGGERS or not raw:
+        return []
+    path = Path(str(raw)).resolve()
+    root = repo_root_of(path)
+
+    if tool == "read_file":
+        if root is None or language_of(path) is None:
+            return []
+        rel = path.relative_to(root).as_posix()
+        view = repo_view(root)
+        imported = sorted(view.graph.edges.get(rel, ()), key=lambda node: -view.rank.get(node, 0.0))
+        return _unread(root, imported, limit)
+
+    if root is None:
+        if tool != "list_dir" or not path.is_dir():
+            return []
+        files = sorted(p.name for p in path.iterdir() if p.is_file() and not p.name.startswith("."))
+        return _unread(path, files, limit)
+
+    prefix = ""
+    if tool == "list_dir" and path != root:
+        prefix = path.relative_to(root).as_posix() + "/"
+    ranked = [item.rel for item in get_ranking(root) if item.rel.startswith(prefix)]
+    return _unread(root, ranked, limit)
+
+
+class Prefetcher:
+    """Aquece o cache do `read_file` em threads de fundo."""
+
+    def __init__(self, workers: int = PREFETCH_WORKERS) -> None:
+        self.workers = workers
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="prefetch")
+            return self._executor
+
+    def schedule(self, tool: str, args: dict[str, Any]) -> None:
+        """Prevê e aquece, em segundo plano, as leituras seguintes a uma tool call."""
+        if tool not in _TRIGGERS:
+            return
+        # O contexto leva a sessão de leitura e o perfil da execução para as threads
+        ctx = contextvars.copy_context()
+        self._pool().submit(ctx.run, self._run, tool, dict(args))
+
+    def _run(self, tool: str, args: dict[str, Any]) -> None:
+        try:
+            paths = predict_reads(tool, args)
+        except Exception:
+            # Previsão é só otimização: qualquer falha apenas deixa o cache frio
+            return
+        profile = current_profile()
+        if profile is not None and paths:
+            profile.incr("prefetch_scheduled", len(paths))
+        for path in paths:
+            if warm_file(path) and profile is not None:
+                profile.incr("prefetch_warmed")
+
+
+class PrefetchMiddleware(AgentMiddleware):
+    """Dispara o prefetch após cada tool call de exploração, sem atrasar o resultado."""
+
+    def __init__(self, prefetcher: Prefetcher | None = None) -> None:
+        super().__init__()
+        self.prefetcher = prefetcher or Prefetcher()
+
+    def _schedule(self, request) -> None:
+        call = request.tool_call
+        try:
+            self.prefetcher.schedule(call.get("name", ""), call.get("args") or {})
+        except RuntimeError:
+            # Executor encerrado (ex.: interpretador finalizando)
+            pass
+
+    def wrap_tool_call(self, request, handler: Callable):
+        result = handler(request)
+        self._schedule(request)
+        return result
+
+    async def awrap_tool_call(self, request, handler: Callable):
+        result = await handler(request)
+        self._schedule(request)
+        return result
@@ -0,0 +1,345 @@
+"""Perfil de desempenho por execução: turnos, latências, tokens e bytes.
+
+Um `RunProfile` é ativado por execução (via `contextvars`, de modo que
+execuções concorrentes no mesmo processo não se misturam) e recebe as
+medições dos pontos instrumentados:
+
+  - `ProfilingMiddleware`: cada chamada ao modelo (tempo de parede, tokens de
+    entrada/saída, tokens lidos/gravados no cache do provider) e cada tool
+    call (tempo de parede, bytes retornados, erros);
+  - `SummarizationMiddleware`: cada sumarização (tempo, mensagens e tokens);
+  - demais componentes: contadores genéricos (`incr`) e eventos (`record_event`).
+
+O perfil pode ser exibido como tabela Rich ou exportado como JSON.
+"""
+
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable
+
+from langchain.agents.middleware import AgentMiddleware
+from rich import box
+from rich.table import Table
+
+_ACTIVE_PROFILE: contextvars.ContextVar["RunProfile | None"] = contextvars.ContextVar(
+    "codebase_analyst_profile", default=None
+)
+
+# Máximo de eventos detalhados guardados por perfil (os agregados não têm limite)
+_MAX_EVENTS = 2000
+
+
+def current_profile() -> "RunProfile | None":
+    """Retorna o perfil ativo no contexto atual (ou None)."""
+    return _ACTIVE_PROFILE.get()
+
+
+def activate(profile: "RunProfile | None") -> contextvars.Token:
+    """Ativa `profile` no contexto atual até `_ACTIVE_PROFILE.reset(token)`."""
+    return _ACTIVE_PROFILE.set(profile)
+
+
+@contextmanager
+def profiling(profile: "RunProfile | None"):
+    """Ativa `profile` no contexto atual durante o bloco `with`."""
+    token = activate(profile)
+    try:
+        yield profile
+    finally:
+        _ACTIVE_PROFILE.reset(token)
+
+
+def _usage_of(message: Any) -> dict[str, int]:
+    usage = getattr(message, "usage_metadata", None) or {}
+    details = usage.get("input_token_details") or {}
+    return {
+        "input_tokens": int(usage.get("input_tokens", 0) or 0),
+        "output_tokens": int(usage.get("output_tokens", 0) or 0),
+        "cache_read_tokens": int(details.get("cache_read", 0) or 0),
+        "cache_write_tokens": int(details.get("cache_creation", 0) or 0),
+    }
+
+
+class RunProfile:
+    """Agregados de desempenho de uma execução (thread-safe)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter()
+        self.started_at = time.time()
+        self.wall_time_s: float | None = None
+        self.model = {
+            "calls": 0,
+            "time_s": 0.0,
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "cache_read_tokens": 0,
+            "cache_write_tokens": 0,
+            "errors": 0,
+        }
+        self.tools: dict[str, dict[str, Any]] = {}
+        self.summarization = {
+            "count": 0,
+            "extractive": 0,
+            "time_s": 0.0,
+            "max_time_s": 0.0,
+            "messages_summarized": 0,
+            "tokens_before": 0,
+            "tokens_after": 0,
+            "input_tokens": 0,
+            "output_tokens": 0,
+        }
+        self.counters: dict[str, int] = {}
+        self.events: list[dict[str, Any]] = []
+
+    def record_model_call(self, duration_s: float, message: Any = None, error: bool = False) -> None:
+        usage = _usage_of(message)
+        with self._lock:
+            self.model["calls"] += 1
+            self.model["time_s"] += duration_s
+            self.model["errors"] += int(error)
+            for key, value in usage.items():
+                self.model[key] += value
+
+    def record_tool_call(self, name: str, duration_s: float, result_bytes: int, error: bool = False) -> None:
+        with self._lock:
+            stats = self.tools.setdefault(
+                name, {"calls": 0, "time_s": 0.0, "max_time_s": 0.0, "bytes": 0, "errors": 0}
+            )
+            stats["calls"] += 1
+            stats["time_s"] += duration_s
+            stats["max_time_s"] = max(stats["max_time_s"], duration_s)
+            stats["bytes"] += result_bytes
+            stats["errors"] += int(error)
+
+    def record_summarization(
+        self,
+        duration_s: float,
+        messages_summarized: int,
+        tokens_before: int,
+        tokens_after: int,
+        message: Any = None,
+        extractive: bool = False,
+    ) -> None:
+        """Registra uma sumarização; `message` é a resposta do modelo de resumo (tokens)."""
+        usage = _usage_of(message)
+        with self._lock:
+            self.summarization["count"] += 1
+            self.summarization["extractive"] += int(extractive)
+            self.summarization["time_s"] += duration_s
+            self.summarization["max_time_s"] = max(self.summarization["max_time_s"], duration_s)
+            self.summarization["messages_summarized"] += messages_summarized
+            self.summarization["tokens_before"] += tokens_before
+            self.summarization["tokens_after"] += tokens_after
+            self.summarization["input_tokens"] += usage["input_tokens"]
+            self.summarization["output_tokens"] += usage["output_tokens"]
+
+    def incr(self, counter: str, amount: int = 1) -> None:
+        """Incrementa um contador genérico (ex.: 'agent_cache_hits')."""
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def record_event(self, kind: str, **data: Any) -> None:
+        """Guarda um evento pontual (ex.: uma decisão de paginação)."""
+        with self._lock:
+            if len(self.events) < _MAX_EVENTS:
+                self.events.append({"kind": kind, "t": round(time.perf_counter() - self._t0, 4), **data})
+            else:
+                self.counters["events_dropped"] = self.counters.get("events_dropped", 0) + 1
+
+    def merge(self, other: "RunProfile") -> None:
+        """Soma os agregados de `other` (ex.: sub-agentes do modo map-reduce) a este perfil."""
+        data = other.as_dict()
+        with self._lock:
+            for key in self.model:
+                self.model[key] += data["model"][key]
+            for name, stats in data["tools"].items():
+                mine = self.tools.setdefault(
+                    name, {"calls": 0, "time_s": 0.0, "max_time_s": 0.0, "bytes": 0, "errors": 0}
+                )
+                for key, value in stats.items():
+                    mine[key] = max(mine[key], value) if key == "max_time_s" else mine[key] + value
+            for key, value in data["summarization"].items():
+                if key == "max_time_s":
+                    self.summarization[key] = max(self.summarization[key], value)
+                else:
+                    self.summarization[key] += value
+            for counter, value in data["counters"].items():
+                self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def finish(self) -> "RunProfile":
+        self.wall_time_s = time.perf_counter() - self._t0
+        return self
+
+    def as_dict(self) -> dict[str, Any]:
+        with self._lock:
+            wall = self.wall_time_s if self.wall_time_s is not None else time.perf_counter() - self._t0
+            tool_time = sum(t["time_s"] for t in self.tools.values())
+            return {
+                "started_at": self.started_at,
+                "wall_time_s": round(wall, 4),
+                "breakdown_s": {
+                    "model": round(self.model["time_s"], 4),
+                    "tools": round(tool_time, 4),
+                    "summarization": round(self.summarization["time_s"], 4),
+                    "other": round(max(0.0, wall - self.model["time_s"] - tool_time - self.summarization["time_s"]), 4),
+                },
+                "model": {k: round(v, 4) if isinstance(v, float) else v for k, v in self.model.items()},
+                "tools": {
+                    name: {k: round(v, 4) if isinstance(v, float) else v for k, v in stats.items()}
+                    for name, stats in sorted(self.tools.items())
+                },
+                "summarization": {
+                    k: round(v, 4) if isinstance(v, float) else v for k, v in self.summarization.items()
+                },
+                "counters": dict(sorted(self.counters.items())),
+                "events": list(self.events),
+            }
+
+    def write_json(self, path: str | Path) -> Path:
+        path = Path(path).resolve()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.as_dict(), indent=2, ensure_ascii=False), encoding="utf-8")
+        return path
+
+    def summary_table(self) -> Table:
+        """Tabela Rich com o resumo do perfil."""
+        data = self.as_dict()
+        table = Table(title="Perfil da execução", box=box.SIMPLE, title_justify="left")
+        table.add_column("Etapa", style="cyan")
+        table.add_column("Chamadas", justify="right")
+        table.add_column("Tempo (s)", justify="right")
+        table.add_column("Detalhes", style="white")
+
+        model = data["model"]
+        table.add_row(
+            "modelo",
+            str(model["calls"]),
+            f"{model['time_s']:.2f}",
+            f"in {model['input_tokens']} / out {model['output_tokens']} tokens"
+            + (
+                f" | cache r/w {model['cache_read_tokens']}/{model['cache_write_tokens']}"
+                f" ({model['cache_read_tokens'] / max(1, model['input_tokens']):.0%} da entrada do cache)"
+                if model["cache_read_tokens"] or model["cache_write_tokens"]
+                else ""
+            ),
+        )
+        for name, stats in data["tools"].items():
+            table.add_row(
+                f"tool: {name}",
+                str(stats["calls"]),
+                f"{stats['time_s']:.2f}",
+                f"{stats['bytes']} bytes | máx {stats['max_time_s']:.3f}s"
+                + (f" | {stats['errors']} erro(s)" if stats["errors"] else ""),
+            )
+        summ = data["summarization"]
+        table.add_row(
+            "sumarização",
+            str(summ["count"]),
+            f"{summ['time_s']:.2f}",
+            f"{summ['messages_summarized']} msgs | {summ['tokens_before']} → {summ['tokens_after']} tokens"
+            f" | máx {summ['max_time_s']:.2f}s"
+            + (f" | modelo in {summ['input_tokens']} / out {summ['output_tokens']}" if summ["input_tokens"] else "")
+            + (f" | {summ['extractive']} extrativa(s)" if summ["extractive"] else ""),
+        )
+        breakdown = data["breakdown_s"]
+        table.add_row(
+            "total",
+            "",
+            f"{data['wall_time_s']:.2f}",
+            f"outros {breakdown['other']:.2f}s"
+            + "".join(f" | {k} {v}" for k, v in data["counters"].items()),
+        )
+        return table
+
+
+def _result_size(result: Any) -> int:
+    content = getattr(result, "content", result)
+    if isinstance(content, bytes):
+        return len(content)
+    return len(str(content).encode("utf-8", errors="replace"))
+
+
+class ProfilingMiddleware(AgentMiddleware):
+    """Mede cada chamada ao modelo e cada tool call no perfil ativo.
+
+    Sem perfil ativo, apenas repassa a chamada; por isso pode ficar
+    permanentemente instalada em agentes compilados e reutilizados.
+    """
+
+    def wrap_model_call(self, request, handler: Callable):
+        profile = current_profile()
+        if profile is None:
+            return handler(request)
+        t0 = time.perf_counter()
+        try:
+            response = handler(request)
+        except Exception:
+            profile.record_model_call(time.perf_counter() - t0, error=True)
+            raise
+        profile.record_model_call(time.perf_counter() - t0, _last_message(response))
+        return response
+
+    async def awrap_model_call(self, request, handler: Callable):
+        profile = current_profile()
+        if profile is None:
+            return await handler(request)
+        t0 = time.perf_counter()
+        try:
+            response = await handler(request)
+        except Exception:
+            profile.record_model_call(time.perf_counter() - t0, error=True)
+            raise
+        profile.record_model_call(time.perf_counter() - t0, _last_message(response))
+        return response
+
+    def wrap_tool_call(self, request, handler: Callable):
+        profile = current_profile()
+        if profile is None:
+            return handler(request)
+        name = request.tool_call.get("name", "unknown")
+        t0 = time.perf_counter()
+        try:
+            result = handler(request)
+        except Exception:
+            profile.record_tool_call(name, time.perf_counter() - t0, 0, error=True)
+            raise
+        profile.record_tool_call(
+            name, time.perf_counter() - t0, _result_size(result), error=_is_error(result)
+        )
+        return result
+
+    async def awrap_tool_call(self, request, handler: Callable):
+        profile = current_profile()
+        if profile is None:
+            return await handler(request)
+        name = request.tool_call.get("name", "unknown")
+        t0 = time.perf_counter()
+        try:
+            result = await handler(request)
+        except Exception:
+            profile.record_tool_call(name, time.perf_counter() - t0, 0, error=True)
+            raise
+        profile.record_tool_call(
+            name, time.perf_counter() - t0, _result_size(result), error=_is_error(result)
+        )
+        return result
+
+
+def _last_message(response: Any) -> Any:
+    messages = getattr(response, "result", None)
+    if isinstance(messages, list) and messages:
+        return messages[-1]
+    return response
+
+
+def _is_error(result: Any) -> bool:
+    if getattr(result, "status", None) == "error":
+        return True
+    content = getattr(result, "content", None)
+    # As tools deste pacote sinalizam falhas com mensagens iniciadas por "Erro"
+    return isinstance(content, str) and content.startswith("Erro")
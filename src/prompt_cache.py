@@ -0,0 +1,94 @@
+"""Cache de prompt do provider para o prefixo estático das chamadas ao modelo.
+
+Toda chamada reenvia o system prompt (grande) e os schemas JSON de todas as
+tools. Na Anthropic, o prefixo da requisição é `tools → system → messages`;
+um breakpoint de `cache_control` no bloco do system prompt faz o provider
+guardar tools + system, que passam a ser cobrados e processados como leitura
+de cache nos turnos seguintes.
+
+O `PromptCachingMiddleware` põe dois breakpoints:
+
+  - no system prompt: o prefixo estável. A sumarização só reescreve as
+    mensagens, nunca o system prompt nem a lista de tools, então este cache
+    sobrevive a ela;
+  - na última mensagem: o histórico da conversa até aqui, reaproveitado no
+    turno seguinte (invalidado a cada sumarização, como esperado).
+
+Providers com cache automático de prefixo (OpenAI, Google) não precisam de
+marcação: basta o prefixo estável, que vem da lista fixa de tools e do
+system prompt inalterado. Os tokens lidos/gravados no cache aparecem no
+perfil da execução (`ProfilingMiddleware`) e no `RunStats`.
+"""
+
+from typing import Any, Callable
+
+from langchain.agents.middleware import AgentMiddleware
+from langchain_core.messages import SystemMessage
+
+from .profiling import current_profile
+
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def supports_cache_control(model: Any) -> bool:
+    """Se o chat model aceita breakpoints `cache_control` (Anthropic)."""
+    if type(model).__name__ == "ChatAnthropic":
+        return True
+    try:
+        return getattr(model, "_llm_type", "") == "anthropic-chat"
+    except Exception:
+        return False
+
+
+def _with_breakpoint(message: Any) -> Any:
+    """Cópia de `message` com `cache_control` no último bloco de conteúdo."""
+    content = message.content
+    if isinstance(content, str):
+        if not content:
+            return message
+        blocks = [{"type": "text", "text": content, "cache_control": CACHE_CONTROL}]
+    elif isinstance(content, list) and content and isinstance(content[-1], dict):
+        blocks = [*content[:-1], {**content[-1], "cache_control": CACHE_CONTROL}]
+    else:
+        return message
+    return message.model_copy(update={"content": blocks})
+
+
+class PromptCachingMiddleware(AgentMiddleware):
+    """Marca o prefixo estático (tools + system) e o histórico para o cache do provider.
+
+    Deve ser o middleware mais interno, para ver o system prompt final (o
+    `TodoListMiddleware`, por exemplo, acrescenta instruções a ele). Para
+    modelos sem suporte a `cache_control`, apenas repassa a chamada.
+    """
+
+    def __init__(self, cache_messages: bool = True) -> None:
+        super().__init__()
+        self.cache_messages = cache_messages
+
+    def _apply(self, request):
+        if not supports_cache_control(request.model):
+            return request
+        system_message = getattr(request, "system_message", None)
+        text = system_message.content if system_message is not None else request.system_prompt
+        if not text or not isinstance(text, str):
+            return request
+
+        system = SystemMessage(content=[{"type": "text", "text": text, "cache_control": CACHE_CONTROL}])
+        messages = list(request.messages)
+        if self.cache_messages and messages:
+            messages[-1] = _with_breakpoint(messages[-1])
+
+        profile = current_profile()
+        if profile is not None:
+            profile.incr("prompt_cache_requests")
+        if hasattr(request, "system_message"):
+            return request.override(system_message=system, messages=messages)
+        # Versões sem `system_message`: o system prompt vai como primeira mensagem
+        return request.override(system_prompt=None, messages=[system, *messages])
+
+    def wrap_model_call(self, request, handler: Callable):
+        return handler(self._apply(request))
+
+    async def awrap_model_call(self, request, handler: Callable):
+        return await handler(self._apply(request))
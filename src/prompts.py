@@ -85,7 +85,7 @@ Include, in this order:
 
 8) **DRAFT.md State**
    - Whether DRAFT.md exists and its location.
-   - What sections are already written (Scope/Tree/Key Files/...).
+   - What sections are already written (Scope/Tree/Key Files/...), including the section titles saved with the notes tool (draft and onboarding documents); their content stays in the notes and does not need to be repeated.
    - Any partial documentation already drafted.
 
 9) **Next Actions (Deterministic, Minimal)**
@@ -129,5 +129,11 @@ Use exactly this section structure in your output:
 from pathlib import Path
 
 _current_dir = Path(__file__).parent
-with open(_current_dir / "prompts" / "system_prompt_v1.1.5.md", "r") as f:
-   SYSTEM_PROMPT = f.read()
\ No newline at end of file
+with open(_current_dir / "prompts" / "system_prompt_v1.2.0.md", "r") as f:
+   SYSTEM_PROMPT = f.read()
+
+# Modo map-reduce: sub-agente por partição e etapa de reduce
+with open(_current_dir / "prompts" / "partition_prompt_v1.2.0.md", "r") as f:
+   PARTITION_PROMPT = f.read()
+with open(_current_dir / "prompts" / "reduce_prompt_v1.2.0.md", "r") as f:
+   REDUCE_PROMPT = f.read()
@@ -0,0 +1,364 @@
+"""Ranking de importância dos arquivos e fila de "próximos arquivos a ler".
+
+Antes de o agente começar a explorar, cada arquivo do repositório recebe uma
+pontuação local, sem chamadas ao modelo, combinando:
+
+  - ponto de entrada detectado pelo grafo de imports;
+  - centralidade no grafo (PageRank) e número de importadores (fan-in);
+  - tamanho (módulos médios primeiro; arquivos gigantes ou vazios perdem pontos);
+  - atividade recente no histórico do git (commits que tocaram o arquivo);
+  - tipo do arquivo (README/manifests > código > configuração > testes >
+    gerados/vendor/lockfiles).
+
+A tool `next_files_to_read` expõe o ranking como uma fila: devolve os
+próximos arquivos ainda não lidos nesta execução (o `read_file` marca os
+arquivos lidos na sessão de leitura ativa), para o agente gastar o
+orçamento de tokens nos arquivos que importam.
+"""
+
+import contextvars
+import math
+import re
+import subprocess
+import threading
+from contextlib import contextmanager
+from pathlib import Path, PurePosixPath
+from typing import Any
+
+from .code_index import language_of, wait_for_warmup
+from .file_index import iter_repo_files
+from .import_graph import ImportGraph, build_graph, go_package_node, is_test_path
+
+# Peso de cada sinal na pontuação final
+WEIGHTS = {
+    "entry_point": 3.0,
+    "centrality": 4.0,
+    "fan_in": 1.5,
+    "recency": 1.5,
+    "type": 2.0,
+    "size": 1.0,
+    "depth": 0.5,
+}
+
+# Commits considerados para a atividade recente
+GIT_HISTORY_COMMITS = 300
+
+_DOC_NAMES = re.compile(r"^(readme|architecture|contributing|design|overview)(\.[\w.]+)?$", re.IGNORECASE)
+_MANIFEST_NAMES = frozenset(
+    {
+        "pyproject.toml", "setup.py", "setup.cfg", "requirements.txt", "package.json", "go.mod",
+        "cargo.toml", "pom.xml", "build.gradle", "build.gradle.kts", "gemfile", "composer.json",
+        "dockerfile", "docker-compose.yml", "docker-compose.yaml", "makefile", "procfile",
+        "tsconfig.json", ".env.example", "manage.py",
+    }
+)
+_CONFIG_SUFFIXES = frozenset({".toml", ".yaml", ".yml", ".ini", ".cfg", ".json", ".conf", ".env", ".properties"})
+_DOC_SUFFIXES = frozenset({".md", ".rst", ".txt", ".adoc"})
+_LOW_VALUE = re.compile(
+    r"(^|/)(vendor|third_party|migrations|generated|fixtures|testdata)/|\.min\.(js|css)$|\.lock$|"
+    r"(^|/)(package-lock\.json|yarn\.lock|pnpm-lock\.yaml|poetry\.lock|go\.sum)$|_pb2(_grpc)?\.py$|\.pb\.go$",
+    re.IGNORECASE,
+)
+# Extensões que nunca entram na fila (binários, mídia, dados)
+_SKIP_SUFFIXES = frozenset(
+    {
+        ".png", ".jpg", ".jpeg", ".gif", ".svg", ".ico", ".webp", ".pdf", ".zip", ".gz", ".tar",
+        ".jar", ".so", ".dll", ".exe", ".bin", ".woff", ".woff2", ".ttf", ".eot", ".mp3", ".mp4",
+        ".pyc", ".class", ".o", ".a", ".db", ".sqlite", ".parquet", ".csv", ".pkl", ".npy",
+    }
+)
+
+
+class ReadingSession:
+    """Arquivos já lidos pelo agente em uma execução, e o grafo/ranking usados nela.
+
+    Args:
+        pin_views: Se True, o grafo e o ranking de cada raiz são montados uma
+            vez e reaproveitados até `drop_views`; se False (sessão fora de uma
+            execução), são revalidados a cada pedido.
+    """
+
+    def __init__(self, pin_views: bool = True) -> None:
+        self.read: set[str] = set()
+        self.pin_views = pin_views
+        self._views: dict[Path, "RepoView"] = {}
+        self._lock = threading.Lock()
+
+    def mark_read(self, path: str | Path) -> None:
+        with self._lock:
+            self.read.add(str(Path(path).resolve()))
+
+    def was_read(self, path: Path) -> bool:
+        return str(path) in self.read
+
+    def view(self, root: Path) -> "RepoView | None":
+        with self._lock:
+            return self._views.get(root)
+
+    def keep_view(self, root: Path, view: "RepoView") -> None:
+        if self.pin_views:
+            with self._lock:
+                self._views[root] = view
+
+    def drop_views(self, path: Path) -> None:
+        """Descarta o grafo/ranking das raízes que contêm `path`."""
+        with self._lock:
+            for root in [root for root in self._views if root in path.parents]:
+                del self._views[root]
+
+
+_ACTIVE_SESSION: contextvars.ContextVar[ReadingSession | None] = contextvars.ContextVar(
+    "codebase_analyst_reading_session", default=None
+)
+# Sessão usada fora de uma execução (ex.: tools chamadas diretamente)
+_DEFAULT_SESSION = ReadingSession(pin_views=False)
+
+
+def current_session() -> ReadingSession:
+    return _ACTIVE_SESSION.get() or _DEFAULT_SESSION
+
+
+@contextmanager
+def reading_session():
+    """Ativa uma sessão de leitura nova durante o bloco `with`."""
+    token = _ACTIVE_SESSION.set(ReadingSession())
+    try:
+        yield _ACTIVE_SESSION.get()
+    finally:
+        _ACTIVE_SESSION.reset(token)
+
+
+def start_reading_session() -> ReadingSession:
+    """Ativa uma sessão de leitura nova no contexto atual (para o CLI)."""
+    session = ReadingSession()
+    _ACTIVE_SESSION.set(session)
+    return session
+
+
+def mark_read(path: str | Path) -> None:
+    current_session().mark_read(path)
+
+
+# ---------------------------------------------------------------------------
+# Sinais
+# ---------------------------------------------------------------------------
+
+
+def git_activity(repo: Path, max_commits: int = GIT_HISTORY_COMMITS) -> dict[str, tuple[int, int]]:
+    """`{rel: (commits que tocaram o arquivo, índice do commit mais recente)}` (0 = HEAD)."""
+    try:
+        result = subprocess.run(
+            ["git", "-C", str(repo), "log", "-n", str(max_commits), "--name-only", "--format=@@%H", "--relative"],
+            capture_output=True,
+            text=True,
+            timeout=30,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return {}
+    if result.returncode != 0:
+        return {}
+    activity: dict[str, tuple[int, int]] = {}
+    commit = -1
+    for line in result.stdout.splitlines():
+        if line.startswith("@@"):
+            commit += 1
+        elif line:
+            count, latest = activity.get(line, (0, commit))
+            activity[line] = (count + 1, latest)
+    return activity
+
+
+def type_score(rel: str) -> tuple[float, str | None]:
+    """Peso do tipo de arquivo (0 a 1) e o rótulo exibido nos motivos."""
+    name = PurePosixPath(rel).name
+    suffix = PurePosixPath(rel).suffix.lower()
+    if _LOW_VALUE.search(rel):
+        return 0.0, "gerado/vendor/lockfile"
+    if is_test_path(rel):
+        return 0.15, "teste"
+    if _DOC_NAMES.match(name):
+        return 1.0 if "/" not in rel else 0.7, "documentação"
+    if name.lower() in _MANIFEST_NAMES:
+        return 0.9, "manifesto/configuração do projeto"
+    if language_of(rel) is not None:
+        return 0.6, None
+    if suffix in _DOC_SUFFIXES:
+        return 0.35, "documentação"
+    if suffix in _CONFIG_SUFFIXES:
+        return 0.3, "configuração"
+    return 0.1, None
+
+
+def size_score(lines: int | None, size: int) -> float:
+    """Prefere arquivos médios: vazios/triviais e gigantes valem menos."""
+    lines = lines if lines is not None else size // 40
+    if lines < 30:
+        return max(0.1, lines / 30)
+    if lines > 800:
+        return max(0.2, 800 / lines)
+    return 1.0
+
+
+class RankedFile:
+    """Arquivo com pontuação e os motivos que a explicam."""
+
+    def __init__(self, rel: str, score: float, reasons: list[str], lines: int | None) -> None:
+        self.rel = rel
+        self.score = score
+        self.reasons = reasons
+        self.lines = lines
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"path": self.rel, "score": round(self.score, 4), "reasons": self.reasons, "lines": self.lines}
+
+
+def rank_files(root: str | Path, graph: ImportGraph | None = None, persist: bool = False) -> list[RankedFile]:
+    """Pontua todos os arquivos do repositório, mais importantes primeiro.
+
+    Args:
+        root: Raiz do repositório.
+        graph: Grafo de imports já construído (padrão: `build_graph(root)`).
+        persist: Repassado a `build_graph` quando o grafo é construído aqui.
+    """
+    root = Path(root).resolve()
+    graph = graph or build_graph(root, persist=persist)
+    rank = graph.pagerank()
+    max_rank = max(rank.values(), default=0.0) or 1.0
+    central_order = {node: i for i, node in enumerate(graph.central(limit=len(graph.nodes)))}
+    max_fan_in = max((graph.fan_in(n) for n in graph.nodes), default=0)
+    activity = git_activity(root)
+    max_churn = max((count for count, _ in activity.values()), default=0)
+
+    ranked: list[RankedFile] = []
+    for rel, st in iter_repo_files(root):
+        if PurePosixPath(rel).suffix.lower() in _SKIP_SUFFIXES:
+            continue
+        language = language_of(rel)
+        node = go_package_node(str(PurePosixPath(rel).parent)) if language == "go" else rel
+        in_graph = node in graph.nodes
+        reasons: list[str] = []
+        score = 0.0
+
+        kind, kind_label = type_score(rel)
+        score += WEIGHTS["type"] * kind
+        if kind_label:
+            reasons.append(kind_label)
+        if "/" not in rel and kind >= 0.9:
+            # README e manifests da raiz orientam a leitura do resto do repositório
+            score += WEIGHTS["entry_point"]
+
+        if in_graph and node in graph.entry_points:
+            score += WEIGHTS["entry_point"]
+            reasons.append(f"entry point ({graph.entry_points[node]})")
+
+        lines = None
+        if in_graph:
+            info = graph.nodes[node]
+            lines = info["lines"] // max(1, info["files"]) if language == "go" else info["lines"]
+            centrality = rank[node] / max_rank
+            score += WEIGHTS["centrality"] * centrality
+            fan_in = graph.fan_in(node)
+            if max_fan_in:
+                score += WEIGHTS["fan_in"] * math.log1p(fan_in) / math.log1p(max_fan_in)
+            if fan_in and central_order.get(node, len(central_order)) < 20:
+                reasons.append(f"central (#{central_order[node] + 1}, importado por {fan_in})")
+            elif fan_in:
+                reasons.append(f"importado por {fan_in}")
+
+        score += WEIGHTS["size"] * size_score(lines, st.st_size)
+
+        if rel in activity and max_churn:
+            count, latest = activity[rel]
+            recency = 1.0 - latest / GIT_HISTORY_COMMITS
+            churn = math.log1p(count) / math.log1p(max_churn)
+            score += WEIGHTS["recency"] * (0.5 * recency + 0.5 * churn)
+            if count > 1:
+                reasons.append(f"alterado em {count} commits recentes")
+
+        score -= WEIGHTS["depth"] * min(rel.count("/"), 6) / 6
+        ranked.append(RankedFile(rel, score, reasons, lines))
+
+    ranked.sort(key=lambda f: (-f.score, f.rel))
+    return ranked
+
+
+class RepoView:
+    """Grafo de imports de um repositório com o PageRank e o ranking derivados dele."""
+
+    def __init__(self, graph: ImportGraph, ranking: list[RankedFile]) -> None:
+        self.graph = graph
+        self.rank = graph.pagerank()
+        self.ranking = ranking
+
+
+# Cache em memória: raiz -> visão do último grafo construído
+_RANKINGS: dict[Path, RepoView] = {}
+_RANKINGS_LOCK = threading.Lock()
+
+
+def repo_view(root: str | Path, persist: bool = False) -> RepoView:
+    """Grafo e ranking de `root` para a execução atual.
+
+    Montar o grafo varre o repositório inteiro, então cada sessão de leitura
+    monta a visão uma única vez (depois do pré-aquecimento do índice) e a
+    reaproveita até um arquivo de código ser alterado pelas tools
+    (`invalidate_ranking`). O ranking só é recalculado quando o grafo muda.
+    """
+    root = Path(root).resolve()
+    session = current_session()
+    view = session.view(root)
+    if view is not None:
+        return view
+    wait_for_warmup(root)
+    graph = build_graph(root, persist=persist)
+    with _RANKINGS_LOCK:
+        view = _RANKINGS.get(root)
+    if view is None or view.graph is not graph:
+        view = RepoView(graph, rank_files(root, graph=graph))
+        with _RANKINGS_LOCK:
+            _RANKINGS[root] = view
+    session.keep_view(root, view)
+    return view
+
+
+def get_ranking(root: str | Path, persist: bool = False) -> list[RankedFile]:
+    """Ranking de `root` na execução atual (ver `repo_view`)."""
+    return repo_view(root, persist=persist).ranking
+
+
+def invalidate_ranking(path: str | Path) -> None:
+    """Faz a próxima consulta da execução reconstruir o grafo/ranking que cobre `path`.
+
+    Só arquivos de código mudam o grafo; outros arquivos escritos (notas,
+    documento final) não entram no ranking da execução.
+    """
+    if language_of(path) is None:
+        return
+    current_session().drop_views(Path(path).resolve())
+
+
+def next_files(
+    root: str | Path, count: int = 10, include_tests: bool = False, persist: bool = False
+) -> tuple[list[RankedFile], int, int]:
+    """Próximos arquivos não lidos na sessão atual.
+
+    Returns:
+        (arquivos, total ranqueado, quantos do ranking já foram lidos).
+    """
+    root = Path(root).resolve()
+    ranking = get_ranking(root, persist=persist)
+    session = current_session()
+    queue: list[RankedFile] = []
+    already_read = 0
+    for item in ranking:
+        if session.was_read(root / item.rel):
+            already_read += 1
+            continue
+        if len(queue) < count and (include_tests or not is_test_path(item.rel)):
+            queue.append(item)
+    return queue, len(ranking), already_read
+
+
+def clear_ranking_cache() -> None:
+    with _RANKINGS_LOCK:
+        _RANKINGS.clear()
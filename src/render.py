@@ -0,0 +1,300 @@
+"""Renderização dos eventos do agente no terminal.
+
+Os eventos produzidos por `runner.iter_agent_events` passam por um
+renderer escolhido conforme o destino da saída:
+
+  - `RichRenderer`: painéis Rich para terminais interativos. As atualizações
+    são acumuladas e desenhadas em lote a uma taxa fixa de quadros, e
+    mensagens consecutivas do agente viram um único documento Markdown.
+  - `PlainRenderer`: texto simples, sem painéis nem parse de Markdown
+    (ideal para logs de CI sem TTY).
+  - `JsonlRenderer`: um objeto JSON por evento, para consumo por máquinas.
+"""
+
+import json
+import sys
+import threading
+import time
+from typing import Any
+
+from rich import box
+from rich.console import Console, Group
+from rich.markdown import Markdown
+from rich.panel import Panel
+from rich.table import Table
+from rich.text import Text
+
+# Configuração do console Rich
+console = Console()
+
+# Cores do tema (inspirado no Claude Code)
+THEME = {
+    "primary": "cyan",
+    "secondary": "magenta",
+    "success": "green",
+    "warning": "yellow",
+    "error": "red",
+    "muted": "white",
+    "text": "bright_white",
+    "agent": "cyan",
+    "tool": "yellow",
+    "result": "green",
+}
+
+OUTPUT_MODES = ("auto", "rich", "plain", "jsonl")
+
+
+def truncate_lines(content: str, max_lines: int) -> tuple[str, int]:
+    """Retorna as primeiras `max_lines` linhas e quantas linhas foram omitidas.
+
+    Faz um único `split` limitado, em vez de quebrar o conteúdo inteiro.
+    """
+    parts = content.split("\n", max_lines)
+    if len(parts) <= max_lines:
+        return content, 0
+    hidden = parts[-1].count("\n") + 1
+    return "\n".join(parts[:max_lines]), hidden
+
+
+def agent_message_renderables(content: str) -> list:
+    """Renderables da mensagem do agente (Markdown em painel)."""
+    if not content:
+        return []
+    return [
+        Text(""),
+        Text("◆ Agente", style=f"bold {THEME['agent']}"),
+        Panel(Markdown(content), box=box.ROUNDED, border_style=THEME["agent"], padding=(1, 2)),
+    ]
+
+
+def tool_call_renderables(tool_name: str, tool_args: dict) -> list:
+    """Renderables da chamada de ferramenta."""
+    # Header da tool
+    tool_header = Text()
+    tool_header.append("⚡ ", style=f"bold {THEME['tool']}")
+    tool_header.append("Tool: ", style=THEME["tool"])
+    tool_header.append(tool_name, style=f"bold {THEME['tool']}")
+
+    renderables = [Text(""), tool_header]
+
+    # Argumentos
+    if tool_args:
+        args_table = Table(show_header=False, box=box.SIMPLE, padding=(0, 1))
+        args_table.add_column("Param", style="cyan")
+        args_table.add_column("Value", style="white", overflow="fold")
+
+        for key, value in tool_args.items():
+            value_str = str(value)
+            # Truncar valores muito longos
+            if len(value_str) > 150:
+                value_str = value_str[:150] + "..."
+
+            # Se parece ser código ou path, destacar
+            if key in ["path", "file_path", "dir_path"]:
+                args_table.add_row(f"  {key}", Text(value_str, style="bold blue"))
+            elif key == "content" and len(value_str) > 50:
+                args_table.add_row(f"  {key}", Text(f"[{len(value)} chars]", style="italic white"))
+            else:
+                args_table.add_row(f"  {key}", value_str)
+
+        renderables.append(args_table)
+    return renderables
+
+
+def tool_result_renderables(content: str, tool_name: str = None, max_lines: int = 20) -> list:
+    """Renderables do resultado de ferramenta (truncado em `max_lines`)."""
+    if not content:
+        return []
+
+    display_content, hidden = truncate_lines(content, max_lines)
+    if hidden:
+        display_content += f"\n... [+{hidden} linhas]"
+
+    # Header do resultado
+    result_header = Text()
+    result_header.append("✓ ", style=f"bold {THEME['result']}")
+    if tool_name:
+        result_header.append(f"Resultado de ", style=THEME["result"])
+        result_header.append(tool_name, style=f"bold {THEME['result']}")
+    else:
+        result_header.append("Resultado", style=THEME["result"])
+
+    # Conteúdo em painel
+    return [
+        result_header,
+        Panel(
+            Text(display_content, style="white"),
+            box=box.SIMPLE,
+            border_style="green",
+            padding=(0, 1),
+        ),
+    ]
+
+
+def print_agent_message(content: str):
+    """Imprime mensagem do agente com formatação Markdown."""
+    renderables = agent_message_renderables(content)
+    if renderables:
+        console.print(Group(*renderables))
+
+
+def print_tool_call(tool_name: str, tool_args: dict):
+    """Imprime chamada de ferramenta com destaque."""
+    console.print(Group(*tool_call_renderables(tool_name, tool_args)))
+
+
+def print_tool_result(content: str, tool_name: str = None, max_lines: int = 20):
+    """Imprime resultado de ferramenta."""
+    renderables = tool_result_renderables(content, tool_name, max_lines)
+    if renderables:
+        console.print(Group(*renderables))
+
+
+class RichRenderer:
+    """Renderer Rich com atualizações agrupadas a uma taxa fixa de quadros.
+
+    `handle` apenas enfileira o evento; uma thread de fundo desenha o que
+    estiver pendente no máximo `fps` vezes por segundo, com um único
+    `console.print` por quadro.
+    """
+
+    def __init__(self, target: Console | None = None, fps: float = 10.0) -> None:
+        self.console = target or console
+        self.interval = 1.0 / max(0.1, float(fps))
+        self._pending: list[dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._print_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="rich-renderer", daemon=True)
+        self._thread.start()
+
+    def handle(self, event: dict[str, Any]) -> None:
+        with self._lock:
+            self._pending.append(event)
+        self._wake.set()
+
+    def flush(self) -> None:
+        with self._print_lock:
+            with self._lock:
+                events, self._pending = self._pending, []
+            if not events:
+                return
+            renderables = self._frame_renderables(events)
+            if renderables:
+                self.console.print(Group(*renderables))
+
+    def close(self) -> None:
+        self._closed = True
+        self._wake.set()
+        self._thread.join(timeout=5)
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wake.wait()
+            self._wake.clear()
+            self.flush()
+            # Limita a taxa de quadros: eventos que chegarem neste intervalo
+            # são desenhados juntos no próximo quadro.
+            time.sleep(self.interval)
+
+    @staticmethod
+    def _frame_renderables(events: list[dict[str, Any]]) -> list:
+        renderables: list = []
+        markdown_parts: list[str] = []
+
+        def _flush_markdown():
+            if markdown_parts:
+                renderables.extend(agent_message_renderables("\n\n".join(markdown_parts)))
+                markdown_parts.clear()
+
+        for event in events:
+            if event["type"] == "agent_message":
+                # Mensagens consecutivas do agente viram um único parse de Markdown
+                if event["content"]:
+                    markdown_parts.append(event["content"])
+                continue
+            _flush_markdown()
+            if event["type"] == "tool_call":
+                renderables.extend(tool_call_renderables(event["name"], event["args"]))
+            elif event["type"] == "tool_result":
+                renderables.extend(tool_result_renderables(event["content"], tool_name=event["name"]))
+        _flush_markdown()
+        return renderables
+
+
+class PlainRenderer:
+    """Renderer de texto simples (sem painéis, cores ou parse de Markdown)."""
+
+    def __init__(self, stream=None, max_lines: int = 20) -> None:
+        self.stream = stream or sys.stdout
+        self.max_lines = max_lines
+        self._lock = threading.Lock()
+
+    def handle(self, event: dict[str, Any]) -> None:
+        kind = event["type"]
+        if kind == "agent_message":
+            if not event["content"]:
+                return
+            text = f"\n◆ Agente\n{event['content']}\n"
+        elif kind == "tool_call":
+            args = ", ".join(
+                f"{key}=[{len(str(value))} chars]" if key == "content" else f"{key}={str(value)[:150]}"
+                for key, value in (event["args"] or {}).items()
+            )
+            text = f"\n⚡ Tool: {event['name']}({args})\n"
+        elif kind == "tool_result":
+            if not event["content"]:
+                return
+            display_content, hidden = truncate_lines(event["content"], self.max_lines)
+            if hidden:
+                display_content += f"\n... [+{hidden} linhas]"
+            text = f"✓ Resultado de {event['name']}\n{display_content}\n"
+        else:
+            return
+        with self._lock:
+            self.stream.write(text)
+
+    def flush(self) -> None:
+        with self._lock:
+            self.stream.flush()
+
+    def close(self) -> None:
+        self.flush()
+
+
+class JsonlRenderer:
+    """Renderer JSONL: um evento por linha, serializado em JSON."""
+
+    def __init__(self, stream=None) -> None:
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def handle(self, event: dict[str, Any]) -> None:
+        line = json.dumps({"time": time.time(), **event}, ensure_ascii=False, default=str)
+        with self._lock:
+            self.stream.write(line + "\n")
+
+    def flush(self) -> None:
+        with self._lock:
+            self.stream.flush()
+
+    def close(self) -> None:
+        self.flush()
+
+
+def make_renderer(mode: str = "auto", fps: float = 10.0):
+    """Cria o renderer para o modo de saída informado.
+
+    Args:
+        mode: 'rich', 'plain', 'jsonl' ou 'auto' (Rich em TTY, texto simples fora dele).
+        fps: Taxa máxima de quadros do `RichRenderer`.
+    """
+    if mode == "auto":
+        mode = "rich" if console.is_terminal else "plain"
+    if mode == "rich":
+        return RichRenderer(console, fps=fps)
+    if mode == "jsonl":
+        return JsonlRenderer(sys.stdout)
+    return PlainRenderer(sys.stdout)
@@ -0,0 +1,263 @@
+"""Execução não-interativa do agente de análise de codebase.
+
+Este módulo concentra o que é comum a todos os modos de execução (CLI,
+batch, etc.): a construção do prompt de cada tarefa, a tradução dos chunks
+de `agent.stream(...)` em eventos simples e a contabilização de turnos,
+tool calls e tokens de uma execução.
+"""
+
+import time
+from contextlib import aclosing, closing
+from pathlib import Path
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Iterable, Iterator
+
+from .file_writer import flush_writes
+from .profiling import RunProfile, profiling
+from .ranking import reading_session
+
+# Arquivo gerado por cada tarefa (tarefas ausentes não criam arquivos)
+OUTPUT_FILES = {
+    "onboarding": "ONBOARDING.md",
+}
+
+# Nomes dos nós do grafo que produzem mensagens do modelo/tools.
+# "agent" é mantido por compatibilidade com grafos no estilo create_react_agent.
+_MODEL_STEPS = {"model", "agent"}
+_TOOL_STEPS = {"tools"}
+
+
+def build_user_message(task: str, target_path: Path) -> str:
+    """Monta a mensagem inicial do usuário para a tarefa informada."""
+    task_prompts = {
+        "analyze": f"Analise a codebase em '{target_path}' e forneça um resumo técnico completo.",
+        "onboarding": f"Analise a codebase em '{target_path}' e gere um arquivo ONBOARDING.md completo e detalhado na raiz do projeto. Este arquivo deve facilitar o entendimento do código para novos desenvolvedores, incluindo: estrutura do projeto, entry points, arquivos principais, fluxos de execução, configurações, dependências e um roadmap de leitura do código.",
+    }
+    return task_prompts[task]
+
+
+def prepare_output_file(target_path: Path, task: str, overwrite: bool) -> str | None:
+    """Libera o arquivo de saída da tarefa para uma execução não-interativa.
+
+    Returns:
+        None se a execução pode prosseguir (removendo o arquivo antigo quando
+        `overwrite` é True) ou uma mensagem explicando por que foi bloqueada.
+    """
+    output_name = OUTPUT_FILES.get(task)
+    if not output_name:
+        return None
+    output_path = target_path / output_name
+    if not output_path.exists():
+        return None
+    if not overwrite:
+        return f"{output_name} já existe (use overwrite)"
+    output_path.unlink()
+    return None
+
+
+def iter_agent_events(chunks: Iterable[dict]) -> Iterator[dict[str, Any]]:
+    """Converte chunks de `agent.stream(..., stream_mode="updates")` em eventos.
+
+    Eventos emitidos (dicts serializáveis em JSON):
+      - {"type": "agent_message", "content": str, "usage": dict | None}
+      - {"type": "tool_call", "name": str, "args": dict, "id": str | None}
+      - {"type": "tool_result", "name": str, "content": str, "id": str | None}
+    """
+    for chunk in chunks:
+        yield from _chunk_events(chunk)
+
+
+async def aiter_agent_events(chunks: AsyncIterable[dict]) -> AsyncIterator[dict[str, Any]]:
+    """Versão assíncrona de `iter_agent_events`, para `agent.astream(...)`."""
+    async for chunk in chunks:
+        for event in _chunk_events(chunk):
+            yield event
+
+
+def _chunk_events(chunk: dict) -> Iterator[dict[str, Any]]:
+    for step, data in chunk.items():
+        if not data or "messages" not in data:
+            continue
+        if step in _MODEL_STEPS:
+            msg = data["messages"][-1]
+            yield {
+                "type": "agent_message",
+                "content": msg.content if isinstance(msg.content, str) else str(msg.content),
+                "usage": getattr(msg, "usage_metadata", None),
+            }
+            for tc in getattr(msg, "tool_calls", None) or []:
+                yield {
+                    "type": "tool_call",
+                    "name": tc.get("name", tc.get("type", "unknown")),
+                    "args": tc.get("args", {}),
+                    "id": tc.get("id"),
+                }
+        elif step in _TOOL_STEPS:
+            for msg in data["messages"]:
+                yield {
+                    "type": "tool_result",
+                    "name": getattr(msg, "name", None) or "unknown",
+                    "content": str(msg.content) if hasattr(msg, "content") else str(msg),
+                    "id": getattr(msg, "tool_call_id", None),
+                }
+
+
+class RunStats:
+    """Acumula métricas de uma execução a partir dos eventos do agente."""
+
+    def __init__(self) -> None:
+        self.turns = 0
+        self.tool_calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.total_tokens = 0
+        self.cache_read_tokens = 0
+        self.cache_write_tokens = 0
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self.wall_time_s = 0.0
+        self.budget_exhausted = False
+        # Sumarizações da execução (do perfil, quando houver): latência separada das chamadas ao modelo
+        self.summarization: dict[str, Any] | None = None
+
+    def observe(self, event: dict[str, Any]) -> None:
+        """Atualiza os contadores com um evento de `iter_agent_events`."""
+        if event["type"] == "agent_message":
+            self.turns += 1
+            usage = event.get("usage") or {}
+            self.input_tokens += int(usage.get("input_tokens", 0) or 0)
+            self.output_tokens += int(usage.get("output_tokens", 0) or 0)
+            self.total_tokens += int(usage.get("total_tokens", 0) or 0)
+            details = usage.get("input_token_details") or {}
+            self.cache_read_tokens += int(details.get("cache_read", 0) or 0)
+            self.cache_write_tokens += int(details.get("cache_creation", 0) or 0)
+        elif event["type"] == "tool_call":
+            self.tool_calls += 1
+
+    def over_budget(self, token_budget: int | None) -> bool:
+        """Indica se a execução consumiu `token_budget` tokens (e marca `budget_exhausted`)."""
+        if not token_budget:
+            return False
+        used = self.total_tokens or self.input_tokens + self.output_tokens
+        if used >= token_budget:
+            self.budget_exhausted = True
+        return self.budget_exhausted
+
+    def finish(self) -> "RunStats":
+        """Congela o tempo de parede da execução."""
+        self.wall_time_s = time.perf_counter() - self._t0
+        return self
+
+    def as_dict(self) -> dict[str, Any]:
+        data = {
+            "started_at": self.started_at,
+            "wall_time_s": round(self.wall_time_s, 3),
+            "turns": self.turns,
+            "tool_calls": self.tool_calls,
+            "tokens": {
+                "input": self.input_tokens,
+                "output": self.output_tokens,
+                "total": self.total_tokens,
+                "cache_read": self.cache_read_tokens,
+                "cache_write": self.cache_write_tokens,
+            },
+        }
+        if self.summarization is not None:
+            data["summarization"] = {
+                key: self.summarization[key]
+                for key in ("count", "extractive", "time_s", "max_time_s", "input_tokens", "output_tokens")
+            }
+        if self.budget_exhausted:
+            data["budget_exhausted"] = True
+        return data
+
+
+def run_analysis(
+    agent,
+    target_path: Path,
+    task: str = "onboarding",
+    config: dict | None = None,
+    on_event: Callable[[dict[str, Any]], None] | None = None,
+    profile: RunProfile | None = None,
+    user_message: str | None = None,
+    token_budget: int | None = None,
+) -> RunStats:
+    """Executa o agente até o fim, sem UI, e retorna as métricas da execução.
+
+    Args:
+        agent: Agente criado por `create_codebase_agent`.
+        target_path: Caminho absoluto do repositório a analisar.
+        task: Tarefa a executar ('analyze' ou 'onboarding').
+        config: Config do LangGraph (callbacks, recursion_limit, ...).
+        on_event: Callback opcional chamado para cada evento emitido.
+        profile: Perfil de desempenho ativado durante a execução (opcional).
+        user_message: Mensagem inicial (padrão: `build_user_message(task, target_path)`).
+        token_budget: Máximo de tokens da execução. Ao atingi-lo, o streaming é
+            interrompido ao fim do passo atual e `budget_exhausted` é marcado.
+
+    Returns:
+        `RunStats` finalizado. Exceções do agente são propagadas.
+    """
+    stats = RunStats()
+    user_message = user_message or build_user_message(task, target_path)
+    with profiling(profile), reading_session():
+        try:
+            chunks = agent.stream(
+                {"messages": [{"role": "user", "content": user_message}]},
+                stream_mode="updates",
+                config=config or {"recursion_limit": 1000},
+            )
+            # Fechar o stream cancela o grafo quando o orçamento interrompe a execução
+            with closing(chunks):
+                for event in iter_agent_events(chunks):
+                    stats.observe(event)
+                    if on_event is not None:
+                        on_event(event)
+                    if stats.over_budget(token_budget):
+                        break
+        finally:
+            # Appends em buffer (write-behind) vão para o disco ao fim da execução
+            flush_writes(target_path)
+    if profile is not None:
+        profile.finish()
+        stats.summarization = profile.as_dict()["summarization"]
+    return stats.finish()
+
+
+async def arun_analysis(
+    agent,
+    target_path: Path,
+    task: str = "onboarding",
+    config: dict | None = None,
+    on_event: Callable[[dict[str, Any]], None] | None = None,
+    profile: RunProfile | None = None,
+    user_message: str | None = None,
+    token_budget: int | None = None,
+) -> RunStats:
+    """Versão assíncrona de `run_analysis`, baseada em `agent.astream(...)`.
+
+    Tool calls emitidas no mesmo turno são executadas concorrentemente pelo
+    nó de tools do LangGraph.
+    """
+    stats = RunStats()
+    user_message = user_message or build_user_message(task, target_path)
+    with profiling(profile), reading_session():
+        try:
+            chunks = agent.astream(
+                {"messages": [{"role": "user", "content": user_message}]},
+                stream_mode="updates",
+                config=config or {"recursion_limit": 1000},
+            )
+            async with aclosing(chunks):
+                async for event in aiter_agent_events(chunks):
+                    stats.observe(event)
+                    if on_event is not None:
+                        on_event(event)
+                    if stats.over_budget(token_budget):
+                        break
+        finally:
+            # Appends em buffer (write-behind) vão para o disco ao fim da execução
+            flush_writes(target_path)
+    if profile is not None:
+        profile.finish()
+        stats.summarization = profile.as_dict()["summarization"]
+    return stats.finish()
@@ -0,0 +1,354 @@
+"""Busca textual rápida no repositório analisado.
+
+O conteúdo de todos os arquivos de texto do repositório é carregado uma vez
+em um único buffer em memória (o *corpus*), com os arquivos separados por
+`\\n` e um vetor com o offset inicial de cada um. Cada consulta é então um
+`re.search` em C sobre o buffer inteiro (ou só sobre os arquivos que passam
+nos filtros de glob); o arquivo de cada ocorrência sai de um `bisect` nos
+offsets. Com isso, buscar em um repositório de 100k arquivos custa dezenas
+de milissegundos depois que o corpus está montado.
+
+A montagem lê os arquivos em paralelo (threads; o I/O libera o GIL) e usa
+`mmap` para arquivos grandes. O corpus é revalidado por mtime/tamanho a cada
+`REVALIDATE_SECONDS` e arquivos escritos pelas tools (`invalidate_path`) são
+relidos na próxima busca.
+"""
+
+import mmap
+import os
+import re
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import Iterator
+
+from .file_index import iter_repo_files
+from .ranking import invalidate_ranking
+
+# Arquivos maiores que isso ficam fora do corpus (dumps, dados, minificados)
+MAX_FILE_BYTES = 2 * 1024 * 1024
+# A partir deste tamanho o arquivo é lido via mmap em vez de read()
+MMAP_MIN_BYTES = 256 * 1024
+# Intervalo mínimo entre revalidações completas (stat de todos os arquivos)
+REVALIDATE_SECONDS = 30.0
+
+_READ_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+_CORPORA: dict[Path, "Corpus"] = {}
+_CORPORA_LOCK = threading.Lock()
+
+
+def _read_text_bytes(path: Path, size: int) -> bytes | None:
+    """Conteúdo de um arquivo de texto, ou None para binários/grandes demais."""
+    if size > MAX_FILE_BYTES:
+        return None
+    try:
+        with open(path, "rb") as f:
+            if size >= MMAP_MIN_BYTES:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    if mm.find(b"\0", 0, 8192) != -1:
+                        return None
+                    return mm[:]
+            data = f.read()
+    except (OSError, ValueError):
+        return None
+    return None if b"\0" in data[:8192] else data
+
+
+class Corpus:
+    """Conteúdo dos arquivos de texto de um repositório em um único buffer."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        # (buffer, caminhos ordenados, offset inicial, offset final) trocados de uma vez
+        self.snapshot: tuple[bytes, list[str], list[int], list[int]] = (b"", [], [], [])
+        self.checked_at = 0.0
+        self._stats: dict[str, tuple[int, int]] = {}
+        self._contents: dict[str, bytes] = {}
+        self._stale: set[str] = set()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.snapshot[1])
+
+    def mark_stale(self, rel: str) -> None:
+        with self._lock:
+            self._stale.add(rel)
+
+    def refresh(self, force: bool = False) -> None:
+        """Relê arquivos novos/alterados e remonta o buffer se algo mudou."""
+        with self._lock:
+            if force or not self.checked_at or time.monotonic() - self.checked_at >= REVALIDATE_SECONDS:
+                changed = self._rescan()
+            else:
+                changed = self._reload_stale()
+            self._stale.clear()
+            if changed:
+                self._rebuild()
+
+    def _rescan(self) -> bool:
+        current: dict[str, tuple[int, int]] = {}
+        pending: list[tuple[str, int]] = []
+        for rel, st in iter_repo_files(self.root):
+            key = (st.st_mtime_ns, st.st_size)
+            current[rel] = key
+            if self._stats.get(rel) != key or rel in self._stale:
+                pending.append((rel, st.st_size))
+        removed = self._stats.keys() - current.keys()
+        for rel in removed:
+            self._contents.pop(rel, None)
+        self._stats = current
+        self._load(pending)
+        self.checked_at = time.monotonic()
+        return bool(pending or removed)
+
+    def _reload_stale(self) -> bool:
+        pending: list[tuple[str, int]] = []
+        for rel in self._stale:
+            try:
+                st = (self.root / rel).stat()
+            except OSError:
+                self._stats.pop(rel, None)
+                self._contents.pop(rel, None)
+                continue
+            self._stats[rel] = (st.st_mtime_ns, st.st_size)
+            pending.append((rel, st.st_size))
+        self._load(pending)
+        return bool(self._stale)
+
+    def _load(self, pending: list[tuple[str, int]]) -> None:
+        def _read(item: tuple[str, int]) -> tuple[str, bytes | None]:
+            rel, size = item
+            return rel, _read_text_bytes(self.root / rel, size)
+
+        if len(pending) > 64:
+            with ThreadPoolExecutor(max_workers=_READ_WORKERS) as pool:
+                results = list(pool.map(_read, pending))
+        else:
+            results = [_read(item) for item in pending]
+        for rel, data in results:
+            if data is None:
+                self._contents.pop(rel, None)
+            else:
+                self._contents[rel] = data
+
+    def _rebuild(self) -> None:
+        paths = sorted(self._contents)
+        starts: list[int] = []
+        ends: list[int] = []
+        offset = 0
+        for rel in paths:
+            starts.append(offset)
+            offset += len(self._contents[rel])
+            ends.append(offset)
+            offset += 1  # separador
+        blob = b"\n".join(self._contents[rel] for rel in paths)
+        self.snapshot = (blob, paths, starts, ends)
+
+
+def get_corpus(path: str | Path) -> tuple[Corpus, str]:
+    """Corpus que cobre `path` e o prefixo relativo de `path` dentro dele.
+
+    Reaproveita o corpus de um diretório ancestral quando já existe um
+    (ex.: a raiz do repositório pré-aquecida pelo CLI).
+    """
+    path = Path(path).resolve()
+    with _CORPORA_LOCK:
+        corpus = None
+        for root, candidate in _CORPORA.items():
+            if path == root or root in path.parents:
+                corpus = candidate
+                break
+        if corpus is None:
+            root = path.parent if path.is_file() else path
+            corpus = _CORPORA[root] = Corpus(root)
+    corpus.refresh()
+    prefix = "" if path == corpus.root else path.relative_to(corpus.root).as_posix()
+    return corpus, prefix
+
+
+def warm_corpus(root: str | Path) -> threading.Thread:
+    """Monta o corpus de `root` em segundo plano."""
+
+    def _build() -> None:
+        try:
+            get_corpus(root)
+        except Exception:
+            # Sem pré-aquecimento a primeira busca monta o corpus sob demanda
+            pass
+
+    thread = threading.Thread(target=_build, name="search-corpus-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def invalidate_path(path: str | Path) -> None:
+    """Marca um arquivo alterado pelas tools (ex.: write_file) para ser relido na próxima busca."""
+    path = Path(path).resolve()
+    # O grafo de imports e o ranking da execução também dependem dos arquivos de código
+    invalidate_ranking(path)
+    with _CORPORA_LOCK:
+        corpora = list(_CORPORA.values())
+    for corpus in corpora:
+        if corpus.root in path.parents:
+            corpus.mark_stale(path.relative_to(corpus.root).as_posix())
+
+
+def clear_search_cache() -> None:
+    with _CORPORA_LOCK:
+        _CORPORA.clear()
+
+
+def _split_globs(patterns: str | list[str] | None) -> list[str]:
+    if not patterns:
+        return []
+    if isinstance(patterns, str):
+        patterns = patterns.split(",")
+    return [p.strip() for p in patterns if p.strip()]
+
+
+def glob_match(rel: str, pattern: str) -> bool:
+    """Glob estilo gitignore: sem `/` compara o nome do arquivo; `**/` casa zero ou mais diretórios."""
+    if "/" not in pattern:
+        return fnmatchcase(rel.rsplit("/", 1)[-1], pattern)
+    pattern = pattern.lstrip("/")
+    return fnmatchcase(rel, pattern) or ("**/" in pattern and fnmatchcase(rel, pattern.replace("**/", "")))
+
+
+def compile_query(query: str, regex: bool = False, case_sensitive: bool = True) -> re.Pattern[bytes]:
+    """Compila a consulta para busca sobre bytes (UTF-8).
+
+    Raises:
+        re.error: se `regex=True` e a expressão for inválida.
+    """
+    source = query if regex else re.escape(query)
+    flags = re.MULTILINE | (0 if case_sensitive else re.IGNORECASE)
+    return re.compile(source.encode("utf-8"), flags)
+
+
+class SearchResult:
+    """Ocorrências encontradas por `search` (uma por linha)."""
+
+    def __init__(self, root: Path, files_searched: int) -> None:
+        self.root = root
+        self.files_searched = files_searched
+        self.matches: list[tuple[str, int, str]] = []
+        self.files_matched = 0
+        self.capped_files = 0
+        self.truncated = False
+        self.elapsed_s = 0.0
+
+
+def _line_matches(
+    blob: bytes, pattern: re.Pattern[bytes], start: int, end: int
+) -> Iterator[tuple[int, int, int]]:
+    """(início da linha, fim da linha, número da linha) de cada linha com ocorrência em blob[start:end]."""
+    pos = start
+    counted_until = start
+    line_no = 1
+    while pos <= end:
+        m = pattern.search(blob, pos, end)
+        if m is None:
+            return
+        line_start = blob.rfind(b"\n", start, m.start()) + 1 or start
+        line_end = blob.find(b"\n", m.start(), end)
+        if line_end == -1:
+            line_end = end
+        line_no += blob.count(b"\n", counted_until, line_start)
+        counted_until = line_start
+        yield line_start, line_end, line_no
+        # Uma ocorrência por linha, como o grep
+        pos = line_end + 1
+
+
+def search(
+    path: str | Path,
+    query: str,
+    regex: bool = False,
+    case_sensitive: bool = True,
+    include: str | list[str] | None = None,
+    exclude: str | list[str] | None = None,
+    max_results: int = 100,
+    max_per_file: int = 5,
+    max_line_chars: int = 300,
+) -> SearchResult:
+    """Busca `query` nos arquivos de texto sob `path`.
+
+    Args:
+        path: Diretório (ou arquivo) onde buscar.
+        query: Texto literal ou expressão regular (`regex=True`).
+        include: Globs de arquivos a considerar (lista ou separados por vírgula).
+        exclude: Globs de arquivos a ignorar.
+        max_results: Máximo de linhas retornadas no total.
+        max_per_file: Máximo de linhas retornadas por arquivo.
+        max_line_chars: Linhas mais longas são cortadas neste tamanho.
+
+    Raises:
+        re.error: se a expressão regular for inválida.
+    """
+    t0 = time.perf_counter()
+    pattern = compile_query(query, regex=regex, case_sensitive=case_sensitive)
+    corpus, prefix = get_corpus(path)
+    includes = _split_globs(include)
+    excludes = _split_globs(exclude)
+
+    # Snapshot consistente mesmo se outra thread remontar o corpus
+    blob, paths, starts, ends = corpus.snapshot
+
+    if prefix:
+        # `paths` é ordenado: "<prefix>/..." fica entre "<prefix>/" e "<prefix>0" ("0" vem logo após "/")
+        lo, hi = bisect_left(paths, prefix + "/"), bisect_left(paths, prefix + "0")
+        selected = list(range(lo, hi))
+        exact = bisect_left(paths, prefix)
+        if exact < len(paths) and paths[exact] == prefix:
+            selected.append(exact)
+    else:
+        selected = range(len(paths))
+
+    if includes or excludes or prefix:
+        selected = [
+            i for i in selected
+            if (not includes or any(glob_match(paths[i], g) for g in includes))
+            and not any(glob_match(paths[i], g) for g in excludes)
+        ]
+        segments: list[tuple[int, int]] = [(starts[i], ends[i]) for i in selected]
+    else:
+        # Sem filtros, uma única varredura do buffer inteiro
+        segments = [(0, len(blob))]
+
+    result = SearchResult(corpus.root, len(selected))
+    max_results = max(1, int(max_results))
+    max_per_file = max(1, int(max_per_file))
+
+    for seg_start, seg_end in segments:
+        pos = seg_start
+        while pos <= seg_end and not result.truncated:
+            m = pattern.search(blob, pos, seg_end)
+            if m is None:
+                break
+            i = bisect_right(starts, m.start()) - 1
+            file_start, file_end = starts[i], ends[i]
+            per_file = 0
+            for line_start, line_end, line_no in _line_matches(blob, pattern, file_start, file_end):
+                if per_file == max_per_file:
+                    result.capped_files += 1
+                    break
+                if len(result.matches) == max_results:
+                    result.truncated = True
+                    break
+                text = blob[line_start:min(line_end, line_start + max_line_chars * 4)].decode("utf-8", "replace")
+                text = text.rstrip("\r")
+                if len(text) > max_line_chars:
+                    text = text[:max_line_chars] + " …[TRUNCATED_LINE]"
+                result.matches.append((paths[i], line_no, text))
+                per_file += 1
+            if per_file:
+                result.files_matched += 1
+            pos = file_end + 1
+        if result.truncated:
+            break
+
+    result.elapsed_s = time.perf_counter() - t0
+    return result
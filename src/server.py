@@ -0,0 +1,427 @@
+"""Modo servidor: o analista como serviço HTTP/JSON local de longa duração.
+
+O processo sobe uma vez (imports do LangChain, agente compilado, clients
+HTTP dos modelos e caches ficam quentes em memória) e recebe jobs de
+análise por uma API HTTP local. Os jobs entram em uma fila limitada e são
+processados por um número configurável de workers; o progresso de cada job
+pode ser acompanhado via server-sent events (SSE).
+
+Endpoints:
+  - GET  /health               -> estado do servidor e da fila
+  - POST /jobs                 -> enfileira um job {"path", "task", "model", "overwrite"}
+                                  (409 se o repositório já tem um job na fila ou em execução)
+  - GET  /jobs                 -> lista resumida dos jobs conhecidos
+  - GET  /jobs/<id>            -> estado, resultado e eventos de um job
+  - GET  /jobs/<id>/events     -> stream SSE de eventos do job (suporta Last-Event-ID)
+"""
+
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from rich.console import Console
+from rich.text import Text
+
+from .agent import create_codebase_agent
+from .draft_store import reset_store
+from .profiling import RunProfile
+from .runner import OUTPUT_FILES, prepare_output_file, run_analysis
+from .token_rate_limiter import InMemoryTokenAndRequestRateLimiter
+
+console = Console()
+
+_TASKS = ("analyze", "onboarding")
+_FINISHED = ("done", "error", "skipped")
+
+
+class Job:
+    """Um job de análise e seu log de eventos (consumido pelos streams SSE)."""
+
+    def __init__(self, path: Path, task: str, model_name: str, overwrite: bool) -> None:
+        self.id = uuid.uuid4().hex[:12]
+        self.path = path
+        self.task = task
+        self.model_name = model_name
+        self.overwrite = overwrite
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.result: dict[str, Any] | None = None
+        self.error: str | None = None
+        self.events: list[dict[str, Any]] = []
+        self._cond = threading.Condition()
+
+    def add_event(self, event: dict[str, Any]) -> None:
+        with self._cond:
+            self.events.append(event)
+            self._cond.notify_all()
+
+    def set_status(self, status: str, **fields) -> None:
+        with self._cond:
+            self.status = status
+            for key, value in fields.items():
+                setattr(self, key, value)
+            self.events.append({"type": "status", "status": status})
+            self._cond.notify_all()
+
+    def wait_events(self, start: int, timeout: float) -> tuple[list[dict[str, Any]], bool]:
+        """Bloqueia até haver eventos a partir de `start` (ou o job terminar).
+
+        Returns:
+            (novos eventos, job finalizado?)
+        """
+        with self._cond:
+            if len(self.events) <= start and self.status not in _FINISHED:
+                self._cond.wait(timeout)
+            return self.events[start:], self.status in _FINISHED
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "path": str(self.path),
+            "task": self.task,
+            "model": self.model_name,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+    def as_dict(self) -> dict[str, Any]:
+        data = self.summary()
+        data["result"] = self.result
+        data["error"] = self.error
+        data["events"] = len(self.events)
+        return data
+
+
+class QueueFullError(Exception):
+    """A fila de jobs atingiu `max_queue`."""
+
+
+class JobConflictError(Exception):
+    """Já existe um job na fila ou em execução para o mesmo repositório."""
+
+
+class JobManager:
+    """Fila limitada de jobs processada por um pool de threads worker."""
+
+    def __init__(
+        self,
+        model_name: str,
+        workers: int = 2,
+        max_queue: int = 16,
+        max_history: int = 200,
+        requests_per_second: float | None = None,
+    ) -> None:
+        self.model_name = model_name
+        self.workers = max(1, int(workers))
+        self.max_history = max(1, int(max_history))
+        self.rate_limiter = (
+            InMemoryTokenAndRequestRateLimiter(
+                requests_per_second=requests_per_second,
+                max_request_bucket_size=max(1.0, float(self.workers)),
+            )
+            if requests_per_second
+            else None
+        )
+        self._queue: queue.Queue[Job | None] = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._lock = threading.Lock()
+        self._running = 0
+        self._threads: list[threading.Thread] = []
+
+    def warm_up(self, model_name: str | None = None) -> None:
+        """Compila o agente do modelo padrão antes do primeiro job."""
+        create_codebase_agent(model_name=model_name or self.model_name, rate_limiter=self.rate_limiter)
+
+    def start(self) -> None:
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"analyst-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        for _ in self._threads:
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                break
+
+    def submit(self, path: Path, task: str, model_name: str | None, overwrite: bool) -> Job:
+        job = Job(path, task, model_name or self.model_name, overwrite)
+        with self._lock:
+            # Jobs do mesmo repositório dividiriam o caderno de notas e o documento de saída
+            for other in self._jobs.values():
+                if other.path == path and other.status not in _FINISHED:
+                    raise JobConflictError(f"o job {other.id} já está analisando '{path}'")
+            # Antes de enfileirar: um worker livre pode emitir "running" logo após o put
+            job.add_event({"type": "status", "status": "queued"})
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                raise QueueFullError(f"fila cheia ({self._queue.maxsize} jobs aguardando)")
+            self._jobs[job.id] = job
+            self._prune_locked()
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> list[dict[str, Any]]:
+        with self._lock:
+            return [job.summary() for job in self._jobs.values()]
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            running = self._running
+        return {
+            "status": "ok",
+            "model": self.model_name,
+            "workers": self.workers,
+            "running": running,
+            "queued": self._queue.qsize(),
+            "max_queue": self._queue.maxsize,
+        }
+
+    def _prune_locked(self) -> None:
+        """Descarta os jobs finalizados mais antigos além de `max_history`."""
+        excess = len(self._jobs) - self.max_history
+        for job_id in list(self._jobs):
+            if excess <= 0:
+                break
+            if self._jobs[job_id].status in _FINISHED:
+                del self._jobs[job_id]
+                excess -= 1
+
+    def _worker(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            with self._lock:
+                self._running += 1
+            try:
+                self._run_job(job)
+            finally:
+                with self._lock:
+                    self._running -= 1
+
+    def _run_job(self, job: Job) -> None:
+        reason = prepare_output_file(job.path, job.task, job.overwrite)
+        if reason:
+            job.set_status("skipped", error=reason, finished_at=time.time())
+            return
+
+        job.set_status("running", started_at=time.time())
+        try:
+            agent = create_codebase_agent(model_name=job.model_name, rate_limiter=self.rate_limiter)
+            profile = RunProfile()
+            reset_store(job.path)
+            stats = run_analysis(agent, job.path, task=job.task, on_event=job.add_event, profile=profile)
+            result = stats.as_dict()
+            result["profile"] = profile.as_dict()
+            output_name = OUTPUT_FILES.get(job.task)
+            if output_name:
+                result["output"] = str(job.path / output_name)
+            job.set_status("done", result=result, finished_at=time.time())
+        except Exception as e:
+            console.print(Text(f"  ✖ job {job.id}: {e}", style="red"))
+            job.set_status(
+                "error",
+                error=f"{type(e).__name__}: {e}",
+                result={"traceback": traceback.format_exc()},
+                finished_at=time.time(),
+            )
+
+
+def make_handler(manager: JobManager):
+    """Cria a classe de handler HTTP ligada a um `JobManager`."""
+
+    class AnalystRequestHandler(BaseHTTPRequestHandler):
+        server_version = "codebase-analyst"
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):  # noqa: A002 - assinatura da stdlib
+            console.print(Text(f"  {self.address_string()} {format % args}", style="white"))
+
+        def _send_json(self, status: int, payload: Any, headers: dict | None = None) -> None:
+            body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _error(self, status: int, message: str, headers: dict | None = None) -> None:
+            self._send_json(status, {"error": message}, headers)
+
+        def _parts(self) -> list[str]:
+            return [p for p in self.path.split("?", 1)[0].split("/") if p]
+
+        def do_GET(self):
+            parts = self._parts()
+            if parts == ["health"]:
+                return self._send_json(HTTPStatus.OK, manager.stats())
+            if parts == ["jobs"]:
+                return self._send_json(HTTPStatus.OK, {"jobs": manager.list()})
+            if len(parts) in (2, 3) and parts[0] == "jobs":
+                job = manager.get(parts[1])
+                if job is None:
+                    return self._error(HTTPStatus.NOT_FOUND, f"job '{parts[1]}' não encontrado")
+                if len(parts) == 2:
+                    return self._send_json(HTTPStatus.OK, job.as_dict())
+                if parts[2] == "events":
+                    return self._stream_events(job)
+            return self._error(HTTPStatus.NOT_FOUND, "rota não encontrada")
+
+        def do_POST(self):
+            if self._parts() != ["jobs"]:
+                return self._error(HTTPStatus.NOT_FOUND, "rota não encontrada")
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except (ValueError, json.JSONDecodeError):
+                return self._error(HTTPStatus.BAD_REQUEST, "corpo JSON inválido")
+            if not isinstance(payload, dict) or not payload.get("path"):
+                return self._error(HTTPStatus.BAD_REQUEST, "campo 'path' é obrigatório")
+
+            path = Path(str(payload["path"])).expanduser().resolve()
+            if not path.is_dir():
+                return self._error(HTTPStatus.BAD_REQUEST, f"'{path}' não é um diretório")
+            task = payload.get("task", "onboarding")
+            if task not in _TASKS:
+                return self._error(HTTPStatus.BAD_REQUEST, f"tarefa inválida: {task}")
+
+            try:
+                job = manager.submit(path, task, payload.get("model"), bool(payload.get("overwrite", False)))
+            except QueueFullError as e:
+                return self._error(HTTPStatus.SERVICE_UNAVAILABLE, str(e), {"Retry-After": "5"})
+            except JobConflictError as e:
+                return self._error(HTTPStatus.CONFLICT, str(e))
+            return self._send_json(
+                HTTPStatus.ACCEPTED,
+                job.summary(),
+                {"Location": f"/jobs/{job.id}"},
+            )
+
+        def _stream_events(self, job: Job) -> None:
+            """Envia os eventos do job como SSE até o job terminar."""
+            try:
+                cursor = int(self.headers.get("Last-Event-ID", -1)) + 1
+            except ValueError:
+                cursor = 0
+
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+
+            try:
+                while True:
+                    events, finished = job.wait_events(cursor, timeout=15.0)
+                    if not events and not finished:
+                        # Keep-alive para proxies/clients não encerrarem a conexão
+                        self.wfile.write(b": keep-alive\n\n")
+                    for event in events:
+                        data = json.dumps(event, ensure_ascii=False, default=str)
+                        self.wfile.write(
+                            f"id: {cursor}\nevent: {event['type']}\ndata: {data}\n\n".encode("utf-8")
+                        )
+                        cursor += 1
+                    self.wfile.flush()
+                    if finished and cursor >= len(job.events):
+                        end = json.dumps(job.as_dict(), ensure_ascii=False, default=str)
+                        self.wfile.write(f"event: end\ndata: {end}\n\n".encode("utf-8"))
+                        self.wfile.flush()
+                        return
+            except (BrokenPipeError, ConnectionResetError):
+                return
+
+    return AnalystRequestHandler
+
+
+def main():
+    """Entry point do modo servidor."""
+    from .cli import print_error, validate_api_key
+
+    parser = argparse.ArgumentParser(
+        description="Codebase Analyst Agent (server) - Expõe o analista como serviço HTTP/JSON local",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Exemplos de uso:
+  codebase-analyst-server --port 8765 --workers 2
+  curl -X POST localhost:8765/jobs -d '{"path": "/repos/app", "task": "onboarding"}'
+  curl -N localhost:8765/jobs/<id>/events
+        """,
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Endereço de escuta (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="Porta de escuta (default: 8765)")
+    parser.add_argument("--model", default="anthropic:claude-sonnet-4-5", help="Modelo padrão dos jobs")
+    parser.add_argument("--workers", type=int, default=2, help="Jobs executados simultaneamente (default: 2)")
+    parser.add_argument("--max-queue", type=int, default=16, help="Máximo de jobs aguardando na fila (default: 16)")
+    parser.add_argument(
+        "--requests-per-second",
+        type=float,
+        default=None,
+        help="Cota de chamadas ao modelo compartilhada entre os workers (default: sem limite)",
+    )
+    args = parser.parse_args()
+
+    if not validate_api_key(args.model):
+        sys.exit(1)
+
+    manager = JobManager(
+        model_name=args.model,
+        workers=args.workers,
+        max_queue=args.max_queue,
+        requests_per_second=args.requests_per_second,
+    )
+    with console.status("[cyan]Aquecendo agente...", spinner="dots"):
+        try:
+            manager.warm_up()
+        except Exception as e:
+            print_error(f"Falha ao criar agente: {e}")
+            sys.exit(1)
+    manager.start()
+
+    httpd = ThreadingHTTPServer((args.host, args.port), make_handler(manager))
+    httpd.daemon_threads = True
+    console.print(
+        Text(
+            f"◆ Codebase Analyst server em http://{args.host}:{args.port} "
+            f"({args.workers} worker(s), fila máx. {args.max_queue})",
+            style="bold cyan",
+        )
+    )
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        console.print(Text("⚠ Servidor encerrado pelo usuário", style="yellow"))
+    finally:
+        manager.stop()
+        httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""Esqueleto estrutural de arquivos grandes para o `read_file`.
+
+Quando o agente pede um arquivo inteiro que não cabe no orçamento do
+`read_file` (`max_lines`/`max_chars`), paginar do início custa dezenas de
+turnos. Em vez disso o `read_file` devolve, em uma única resposta:
+
+  - docstring do módulo e bloco de imports;
+  - constantes de nível de módulo com os valores (resumidos);
+  - classes, funções e métodos com assinaturas, docstrings e intervalos de
+    linhas (do índice de símbolos, `code_index.py`);
+  - trechos relevantes: instruções de "montagem" no nível do módulo (ex.:
+    `app = FastAPI()`, registros de rotas) e o bloco `if __name__ == "__main__"`.
+
+Para Markdown o esqueleto é a árvore de títulos. O esqueleto completo é
+calculado localmente e cacheado por (caminho, mtime, tamanho); o corte no
+orçamento de caracteres de cada leitura é feito na saída do cache.
+"""
+
+import ast
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from .code_index import MAX_INDEX_BYTES, file_outline, format_outline, is_main_guard, language_of
+
+# Entradas mantidas no cache de esqueletos
+_CACHE_SIZE = 256
+_CACHE: "OrderedDict[str, tuple[int, int, list[str]]]" = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+
+_IMPORT_LINE = re.compile(
+    r"^\s*(import\b|from\s+\S+\s+import\b|export\s+\*?\s*\{?[^}]*\}?\s*from\b|const\s+\w+\s*=\s*require\(|"
+    r"package\s+\w+|use\s+[\w:]+|#include\b|using\s+[\w.]+;|require(_relative)?\s)"
+)
+_MD_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+
+# Máximo de linhas por seção do esqueleto (o restante vira um contador)
+_MAX_SECTION_LINES = {"imports": 60, "constants": 40, "excerpts": 40}
+
+
+def _clip(text: str, limit: int = 160) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+def _capped(lines: list[str], limit: int, label: str) -> list[str]:
+    if len(lines) <= limit:
+        return lines
+    return [*lines[:limit], f"  ... +{len(lines) - limit} {label}"]
+
+
+def _python_sections(source: str) -> tuple[list[str], list[str], list[str], list[str]]:
+    """(docstring, imports, constantes, trechos) de um módulo Python."""
+    tree = ast.parse(source)
+    lines = source.splitlines()
+    doc = ast.get_docstring(tree, clean=True) or ""
+    doc_lines = [f"  {line}" for line in doc.splitlines()[:8]]
+
+    imports: list[str] = []
+    constants: list[str] = []
+    excerpts: list[str] = []
+    for node in tree.body:
+        end = getattr(node, "end_lineno", node.lineno)
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            imports.append(f"  L{node.lineno}  {_clip(ast.unparse(node), 200)}")
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            names = [t.id for t in targets if isinstance(t, ast.Name)]
+            if names and all(n.isupper() or n == "__all__" for n in names):
+                constants.append(f"  L{node.lineno}  {_clip(ast.unparse(node))}")
+            else:
+                excerpts.append(f"  [L{node.lineno}-{end}] {_clip(ast.unparse(node))}")
+        elif isinstance(node, ast.If) and is_main_guard(node):
+            block = lines[node.lineno - 1:end][:30]
+            excerpts.append(f"  [L{node.lineno}-{end}]")
+            excerpts.extend(f"    {line}" for line in block)
+        elif isinstance(node, ast.Expr) and not isinstance(node.value, ast.Constant):
+            excerpts.append(f"  [L{node.lineno}-{end}] {_clip(ast.unparse(node))}")
+        elif isinstance(node, (ast.Try, ast.If, ast.With)):
+            excerpts.append(f"  [L{node.lineno}-{end}] {_clip(lines[node.lineno - 1])} …")
+    return (
+        doc_lines,
+        _capped(imports, _MAX_SECTION_LINES["imports"], "imports"),
+        _capped(constants, _MAX_SECTION_LINES["constants"], "constantes"),
+        _capped(excerpts, _MAX_SECTION_LINES["excerpts"], "trechos"),
+    )
+
+
+def _generic_sections(source: str) -> tuple[list[str], list[str]]:
+    """(comentário de topo, imports) de arquivos não-Python."""
+    header: list[str] = []
+    imports: list[str] = []
+    for lineno, line in enumerate(source.splitlines(), start=1):
+        stripped = line.strip()
+        if not imports and not header and not stripped:
+            continue
+        if not imports and stripped.startswith(("//", "/*", "*", "#", "--")) and len(header) < 8:
+            header.append(f"  {_clip(stripped)}")
+            continue
+        if _IMPORT_LINE.match(line):
+            imports.append(f"  L{lineno}  {_clip(stripped, 200)}")
+        if lineno > 400 or len(imports) >= 80:
+            break
+    return header, _capped(imports, _MAX_SECTION_LINES["imports"], "imports")
+
+
+def _markdown_outline(source: str) -> list[str]:
+    headings: list[tuple[int, int, str]] = []
+    in_fence = False
+    lines = source.splitlines()
+    for lineno, line in enumerate(lines, start=1):
+        if line.lstrip().startswith(("```", "~~~")):
+            in_fence = not in_fence
+            continue
+        match = None if in_fence else _MD_HEADING.match(line)
+        if match:
+            headings.append((len(match.group(1)), lineno, match.group(2)))
+    out = []
+    for i, (level, lineno, title) in enumerate(headings):
+        # A seção vai até o próximo título de nível igual ou superior
+        end = next((h[1] - 1 for h in headings[i + 1:] if h[0] <= level), len(lines))
+        out.append(f"{'  ' * level}{'#' * level} {_clip(title, 120)}  [L{lineno}-{end}]")
+    return out
+
+
+def skeleton_lines(path: Path) -> list[str] | None:
+    """Linhas do esqueleto completo do arquivo, ou None se o tipo não for suportado."""
+    suffix = path.suffix.lower()
+    language = language_of(path)
+    if language is None and suffix not in (".md", ".markdown"):
+        return None
+    if path.stat().st_size > MAX_INDEX_BYTES:
+        return None
+    source = path.read_text(encoding="utf-8", errors="replace")
+
+    sections: list[tuple[str, list[str]]] = []
+    if language is None:
+        sections.append(("Títulos", _markdown_outline(source)))
+    else:
+        if language == "python":
+            try:
+                doc, imports, constants, excerpts = _python_sections(source)
+            except SyntaxError:
+                doc, imports = _generic_sections(source)
+                constants, excerpts = [], []
+        else:
+            doc, imports = _generic_sections(source)
+            constants, excerpts = [], []
+        entry = file_outline(path)
+        structure = [
+            line for line in format_outline(path.name, entry, with_docs=True)[1:]
+            if not line.startswith("  const:")
+        ] if entry else []
+        sections += [
+            ("Docstring/comentário do módulo", doc),
+            ("Imports", imports),
+            ("Constantes", constants),
+            ("Estrutura (classes, funções e métodos)", structure),
+            ("Trechos de nível de módulo", excerpts),
+        ]
+
+    out: list[str] = []
+    for title, lines in sections:
+        if lines:
+            out += [f"{title}:", *lines, ""]
+    return out or None
+
+
+def _fit(lines: list[str], max_chars: int) -> str:
+    """Junta as linhas do esqueleto até `max_chars`, marcando o corte."""
+    out: list[str] = []
+    used = 0
+    for line in lines:
+        if used + len(line) + 1 > max_chars:
+            out.append("…[TRUNCATED_OUTPUT_MAX_CHARS] use outline(path) ou read_file com start/end")
+            break
+        out.append(line)
+        used += len(line) + 1
+    return "\n".join(out).rstrip()
+
+
+def build_skeleton(path: Path, max_chars: int) -> str | None:
+    """Esqueleto do arquivo cortado em `max_chars`, ou None se o tipo não for suportado."""
+    lines = skeleton_lines(path)
+    return _fit(lines, max_chars) if lines is not None else None
+
+
+def file_skeleton(path: str | Path, max_chars: int) -> str | None:
+    """`build_skeleton` com o esqueleto completo em cache por caminho, validado por mtime/tamanho."""
+    path = Path(path).resolve()
+    st = path.stat()
+    key = str(path)
+    with _CACHE_LOCK:
+        cached = _CACHE.get(key)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            _CACHE.move_to_end(key)
+            lines = cached[2]
+        else:
+            lines = None
+    if lines is None:
+        lines = skeleton_lines(path)
+        if lines is None:
+            return None
+        with _CACHE_LOCK:
+            _CACHE[key] = (st.st_mtime_ns, st.st_size, lines)
+            _CACHE.move_to_end(key)
+            while len(_CACHE) > _CACHE_SIZE:
+                _CACHE.popitem(last=False)
+    return _fit(lines, max_chars)
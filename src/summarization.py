@@ -1,5 +1,6 @@
 """Summarization middleware."""
 
+import time
 import uuid
 import warnings
 from collections.abc import Callable, Iterable, Mapping
@@ -23,8 +24,16 @@ from typing_extensions import override
 from langchain.agents.middleware.types import AgentMiddleware, AgentState
 from langchain.chat_models import BaseChatModel, init_chat_model
 
+from .context_budget import ContextBudget, context_budget
+from .dedup import expand_references
+from .extractive_summary import extractive_summary
+from .profiling import current_profile
+
 TokenCounter = Callable[[Iterable[MessageLikeRepresentation]], int]
 
+Summarizer = Literal["model", "extractive"]
+"""How summaries are produced: by a chat model or by the local extractive summarizer."""
+
 DEFAULT_SUMMARY_PROMPT = """<role>
 Context Extraction Assistant
 </role>
@@ -134,6 +143,9 @@ class SummarizationMiddleware(AgentMiddleware):
     This middleware monitors message token counts and automatically summarizes older
     messages when a threshold is reached, preserving recent messages and maintaining
     context continuity by ensuring AI/Tool message pairs remain together.
+
+    Around each tool call it also publishes the token headroom left before the
+    trigger (`context_budget.current_budget`), so tools can size their output to fit.
     """
 
     def __init__(
@@ -145,12 +157,16 @@ class SummarizationMiddleware(AgentMiddleware):
         token_counter: TokenCounter = count_tokens_approximately,
         summary_prompt: str = DEFAULT_SUMMARY_PROMPT,
         trim_tokens_to_summarize: int | None = _DEFAULT_TRIM_TOKEN_LIMIT,
+        summary_model: str | BaseChatModel | None = None,
+        summarizer: Summarizer = "model",
         **deprecated_kwargs: Any,
     ) -> None:
         """Initialize summarization middleware.
 
         Args:
-            model: The language model to use for generating summaries.
+            model: The agent's language model. Its profile (`max_input_tokens`) drives
+                fractional `trigger`/`keep` values, and it generates the summaries
+                unless `summary_model` is given.
             trigger: One or more thresholds that trigger summarization.
 
                 Provide a single
@@ -201,6 +217,11 @@ class SummarizationMiddleware(AgentMiddleware):
                 the summarization call.
 
                 Pass `None` to skip trimming entirely.
+            summary_model: A separate (typically cheaper, faster) model used only to
+                generate summaries. Defaults to `model`.
+            summarizer: `"model"` summarizes with `summary_model` (falling back to the
+                local extractive summarizer if the call fails); `"extractive"` always
+                uses the local extractive summarizer, with no LLM call.
         """
         # Handle deprecated parameters
         if "max_tokens_before_summary" in deprecated_kwargs:
@@ -228,7 +249,15 @@ class SummarizationMiddleware(AgentMiddleware):
         if isinstance(model, str):
             model = init_chat_model(model)
 
+        if isinstance(summary_model, str):
+            summary_model = init_chat_model(summary_model)
+        if summarizer not in ("model", "extractive"):
+            msg = f"Unsupported summarizer {summarizer!r}; use 'model' or 'extractive'."
+            raise ValueError(msg)
+
         self.model = model
+        self.summary_model = summary_model or model
+        self.summarizer = summarizer
         if trigger is None:
             self.trigger: ContextSize | list[ContextSize] | None = None
             trigger_conditions: list[ContextSize] = []
@@ -279,9 +308,15 @@ class SummarizationMiddleware(AgentMiddleware):
             return None
 
         messages_to_summarize, preserved_messages = self._partition_messages(messages, cutoff_index)
+        # Back-references (DedupMiddleware) to reads being summarized away become text again
+        preserved_messages = expand_references(preserved_messages, messages_to_summarize)
 
-        summary = self._create_summary(messages_to_summarize)
+        t0 = time.perf_counter()
+        summary, response = self._create_summary(messages_to_summarize)
         new_messages = self._build_new_messages(summary)
+        self._record_summarization(
+            t0, messages_to_summarize, total_tokens, [*new_messages, *preserved_messages], response
+        )
 
         return {
             "messages": [
@@ -307,9 +342,15 @@ class SummarizationMiddleware(AgentMiddleware):
             return None
 
         messages_to_summarize, preserved_messages = self._partition_messages(messages, cutoff_index)
+        # Back-references (DedupMiddleware) to reads being summarized away become text again
+        preserved_messages = expand_references(preserved_messages, messages_to_summarize)
 
-        summary = await self._acreate_summary(messages_to_summarize)
+        t0 = time.perf_counter()
+        summary, response = await self._acreate_summary(messages_to_summarize)
         new_messages = self._build_new_messages(summary)
+        self._record_summarization(
+            t0, messages_to_summarize, total_tokens, [*new_messages, *preserved_messages], response
+        )
 
         return {
             "messages": [
@@ -319,6 +360,69 @@ class SummarizationMiddleware(AgentMiddleware):
             ]
         }
 
+    @override
+    def wrap_tool_call(self, request: Any, handler: Callable) -> Any:
+        """Run the tool with the current token headroom published for it."""
+        with context_budget(self._tool_budget(request)):
+            return handler(request)
+
+    @override
+    async def awrap_tool_call(self, request: Any, handler: Callable) -> Any:
+        """Run the tool with the current token headroom published for it."""
+        with context_budget(self._tool_budget(request)):
+            return await handler(request)
+
+    def _tool_budget(self, request: Any) -> ContextBudget | None:
+        """Headroom before the token trigger, as seen by the tool call in `request`."""
+        trigger = self._token_threshold()
+        state = getattr(request, "state", None)
+        if trigger is None or not isinstance(state, Mapping) or not state.get("messages"):
+            return None
+        messages = state["messages"]
+        try:
+            tokens = self.token_counter(messages)
+        except Exception:  # noqa: BLE001
+            return None
+        # Parallel tool calls from the same turn share the headroom
+        parallel = len(getattr(messages[-1], "tool_calls", None) or ()) or 1
+        return ContextBudget(tokens=tokens, trigger=trigger, parallel_calls=parallel)
+
+    def _token_threshold(self) -> int | None:
+        """Lowest token count that triggers summarization (`messages` triggers are ignored)."""
+        thresholds = []
+        for kind, value in self._trigger_conditions:
+            if kind == "tokens":
+                thresholds.append(int(value))
+            elif kind == "fraction":
+                max_input_tokens = self._get_profile_limits()
+                if max_input_tokens is not None:
+                    thresholds.append(max(1, int(max_input_tokens * value)))
+        return min(thresholds) if thresholds else None
+
+    def _record_summarization(
+        self,
+        t0: float,
+        messages_to_summarize: list[AnyMessage],
+        tokens_before: int,
+        remaining_messages: list[AnyMessage],
+        response: Any = None,
+    ) -> None:
+        """Registra a sumarização no perfil de execução ativo, se houver.
+
+        `response` é a resposta do modelo de resumo; None indica o sumarizador extrativo.
+        """
+        profile = current_profile()
+        if profile is None:
+            return
+        profile.record_summarization(
+            time.perf_counter() - t0,
+            messages_summarized=len(messages_to_summarize),
+            tokens_before=tokens_before,
+            tokens_after=self.token_counter(remaining_messages),
+            message=response,
+            extractive=response is None,
+        )
+
     def _should_summarize(self, messages: list[AnyMessage], total_tokens: int) -> bool:
         """Determine whether summarization should run for the current token usage."""
         if not self._trigger_conditions:
@@ -482,37 +586,54 @@ class SummarizationMiddleware(AgentMiddleware):
             cutoff_index += 1
         return cutoff_index
 
-    def _create_summary(self, messages_to_summarize: list[AnyMessage]) -> str:
-        """Generate summary for the given messages."""
+    def _create_summary(self, messages_to_summarize: list[AnyMessage]) -> tuple[str, Any]:
+        """Generate summary for the given messages.
+
+        Returns the summary and the summary model's response (`None` when the
+        extractive summarizer produced it).
+        """
         if not messages_to_summarize:
-            return "No previous conversation history."
+            return "No previous conversation history.", None
+        if self.summarizer == "extractive":
+            return extractive_summary(messages_to_summarize), None
 
         trimmed_messages = self._trim_messages_for_summary(messages_to_summarize)
         if not trimmed_messages:
-            return "Previous conversation was too long to summarize."
+            return extractive_summary(messages_to_summarize), None
 
         try:
-            response = self.model.invoke(self.summary_prompt.format(messages=trimmed_messages))
-            return response.text.strip()
+            response = self.summary_model.invoke(self.summary_prompt.format(messages=trimmed_messages))
+            return response.text.strip(), response
         except Exception as e:
-            return f"Error generating summary: {e!s}"
+            return self._fallback_summary(messages_to_summarize, e), None
 
-    async def _acreate_summary(self, messages_to_summarize: list[AnyMessage]) -> str:
+    async def _acreate_summary(self, messages_to_summarize: list[AnyMessage]) -> tuple[str, Any]:
         """Generate summary for the given messages."""
         if not messages_to_summarize:
-            return "No previous conversation history."
+            return "No previous conversation history.", None
+        if self.summarizer == "extractive":
+            return extractive_summary(messages_to_summarize), None
 
         trimmed_messages = self._trim_messages_for_summary(messages_to_summarize)
         if not trimmed_messages:
-            return "Previous conversation was too long to summarize."
+            return extractive_summary(messages_to_summarize), None
 
         try:
-            response = await self.model.ainvoke(
+            response = await self.summary_model.ainvoke(
                 self.summary_prompt.format(messages=trimmed_messages)
             )
-            return response.text.strip()
+            return response.text.strip(), response
         except Exception as e:
-            return f"Error generating summary: {e!s}"
+            return self._fallback_summary(messages_to_summarize, e), None
+
+    def _fallback_summary(self, messages_to_summarize: list[AnyMessage], error: Exception) -> str:
+        """Extractive summary used when the summary model call fails."""
+        profile = current_profile()
+        if profile is not None:
+            profile.incr("summary_model_errors")
+        return f"(Summary model failed: {error!s}; extractive summary follows.)\n\n" + extractive_summary(
+            messages_to_summarize
+        )
 
     def _trim_messages_for_summary(self, messages: list[AnyMessage]) -> list[AnyMessage]:
         """Trim messages to fit within summary generation limits."""
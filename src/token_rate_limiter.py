@@ -6,6 +6,7 @@ import abc
 import asyncio
 import threading
 import time
+from multiprocessing.managers import BaseManager
 
 
 class InMemoryTokenAndRequestRateLimiter(BaseRateLimiter):
@@ -185,4 +186,52 @@ class InMemoryTokenAndRequestRateLimiter(BaseRateLimiter):
         return True
 
 
-__all__ = ["InMemoryTokenAndRequestRateLimiter"]
+class RateLimiterManager(BaseManager):
+    """Manager que hospeda um único limiter compartilhado entre processos.
+
+    O limiter vive no processo do manager; os workers recebem apenas um proxy
+    e o envolvem em `ProxyRateLimiter`, de modo que todos consomem do mesmo
+    balde de requests/tokens.
+    """
+
+
+RateLimiterManager.register("TokenAndRequestRateLimiter", InMemoryTokenAndRequestRateLimiter)
+
+
+class ProxyRateLimiter(BaseRateLimiter):
+    """Adapter `BaseRateLimiter` sobre um proxy de `RateLimiterManager`.
+
+    Cada tentativa é não-bloqueante no processo do manager (uma ida e volta
+    IPC); a espera entre tentativas acontece localmente, para não ocupar as
+    threads do servidor do manager.
+    """
+
+    def __init__(self, proxy, *, check_every_n_seconds: float = 0.1) -> None:
+        if check_every_n_seconds <= 0:
+            raise ValueError("check_every_n_seconds must be > 0.")
+        self.proxy = proxy
+        self.check_every_n_seconds = float(check_every_n_seconds)
+
+    def acquire(self, *, blocking: bool = True, token_cost: float | None = None) -> bool:
+        """Sync acquire."""
+        while True:
+            if self.proxy.acquire(blocking=False, token_cost=token_cost):
+                return True
+            if not blocking:
+                return False
+            time.sleep(self.check_every_n_seconds)
+
+    async def aacquire(self, *, blocking: bool = True, token_cost: float | None = None) -> bool:
+        """Async acquire."""
+        while True:
+            acquired = await asyncio.to_thread(
+                self.proxy.acquire, blocking=False, token_cost=token_cost
+            )
+            if acquired:
+                return True
+            if not blocking:
+                return False
+            await asyncio.sleep(self.check_every_n_seconds)
+
+
+__all__ = ["InMemoryTokenAndRequestRateLimiter", "ProxyRateLimiter", "RateLimiterManager"]
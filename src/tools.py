@@ -4,10 +4,141 @@ Este módulo implementa as ferramentas que o agente usa para interagir
 com o sistema de arquivos de forma cross-platform usando pathlib.
 """
 
+import asyncio
+import re
 from pathlib import Path
+from typing import Iterator
 
 from langchain_core.tools import tool
 
+from .code_index import (
+    MAX_INDEX_BYTES,
+    build_index,
+    file_outline,
+    format_outline,
+    is_warmed_root,
+    language_of,
+    wait_for_warmup,
+)
+from .context_budget import page_size
+from .draft_store import DOCUMENTS, get_store, render_target
+from .file_cache import count_lines, get_file
+from .file_writer import append_text, atomic_write_text, discard_writes, flush_writes
+from .import_graph import build_graph, is_test_path
+from .ranking import mark_read, next_files
+from .search import invalidate_path, search
+from .skeleton import file_skeleton
+
+
+def _flush_pending(path: Path) -> None:
+    """Grava os appends em buffer (write-behind) sob `path` antes de uma leitura."""
+    for written in flush_writes(path):
+        invalidate_path(written)
+
+
+# Máximo de diretórios unidos em uma cadeia do formato compacto (ex.: src/main/java/com/...)
+_MAX_CHAIN = 32
+_COMPACT_LEGEND = (
+    "Legenda: dir/ | a/b/c/ = diretórios com um único filho | arquivo 120L 4.1K = linhas e tamanho"
+    " | +N = itens além de max_depth | [LNK] = symlink"
+)
+
+
+def _format_size(size: int) -> str:
+    """Tamanho curto: 512B, 4.1K, 38K, 1.2M."""
+    if size < 1024:
+        return f"{size}B"
+    value = float(size)
+    for unit in ("K", "M", "G"):
+        value /= 1024
+        if value < 1024 or unit == "G":
+            return f"{value:.1f}{unit}" if value < 10 else f"{value:.0f}{unit}"
+    return f"{size}B"
+
+
+def _compact_tree(
+    root: Path,
+    max_entries: int,
+    max_depth: int,
+    include_hidden: bool,
+    follow_symlinks: bool,
+) -> tuple[list[str], int, bool, int]:
+    """Árvore compacta de `root` para o `list_dir`.
+
+    Só o nome de cada entrada, indentado pela profundidade; diretórios com um
+    único filho que também é diretório são unidos em uma cadeia (`a/b/c/`) que
+    conta como uma entrada e um nível. Arquivos levam linhas e tamanho.
+
+    Returns:
+        (linhas, entradas exibidas, truncado por max_entries, diretórios sem permissão)
+    """
+    lines: list[str] = []
+    entry_count = 0
+    denied_count = 0
+    truncated = False
+
+    def _children(cur: Path) -> list[Path] | None:
+        try:
+            entries = [c for c in cur.iterdir() if include_hidden or not c.name.startswith(".")]
+        except PermissionError:
+            return None
+        return sorted(entries, key=lambda p: (not p.is_dir(), p.name.lower()))
+
+    def _walk(children: list[Path], depth: int) -> None:
+        nonlocal entry_count, denied_count, truncated
+        indent = "  " * depth
+        for child in children:
+            if entry_count >= max_entries:
+                truncated = True
+                return
+
+            if not child.is_dir():
+                try:
+                    st = child.stat()
+                except OSError:
+                    lines.append(f"{indent}{child.name} [LNK]" if child.is_symlink() else f"{indent}{child.name}")
+                else:
+                    total = count_lines(child, st)
+                    info = f"{total}L {_format_size(st.st_size)}" if total is not None else _format_size(st.st_size)
+                    link = " [LNK]" if child.is_symlink() else ""
+                    lines.append(f"{indent}{child.name}  {info}{link}")
+                entry_count += 1
+                continue
+
+            # Une a cadeia de diretórios com um único filho (sem seguir symlinks, por padrão)
+            name = child.name
+            is_link = child.is_symlink()
+            sub = None if is_link and not follow_symlinks else _children(child)
+            for _ in range(_MAX_CHAIN):
+                if not sub or len(sub) != 1 or not sub[0].is_dir():
+                    break
+                child = sub[0]
+                name += "/" + child.name
+                is_link = child.is_symlink()
+                sub = None if is_link and not follow_symlinks else _children(child)
+
+            line = f"{indent}{name}/"
+            if is_link:
+                line += " [LNK]"
+            elif sub is None:
+                line += " [DENIED]"
+                denied_count += 1
+            entry_count += 1
+
+            if sub and (depth + 1) < max_depth:
+                lines.append(line)
+                _walk(sub, depth + 1)
+                if truncated:
+                    return
+            else:
+                lines.append(line + (f" +{len(sub)}" if sub else ""))
+
+    top = _children(root)
+    if top is None:
+        return ["[DENIED] ./"], 0, False, 1
+    _walk(top, 0)
+    return lines, entry_count, truncated, denied_count
+
 
 @tool
 def list_dir(
@@ -16,6 +147,7 @@ def list_dir(
     max_depth: int = 5,
     include_hidden: bool = False,
     follow_symlinks: bool = False,
+    format: str = "compact",
 ) -> str:
     """
     Lista o conteúdo de um diretório com limites duros de volume e profundidade.
@@ -27,12 +159,21 @@ def list_dir(
       - opcionalmente ignora arquivos ocultos (nomes iniciados com '.');
       - opcionalmente evita seguir symlinks de diretórios (previne loops).
 
+    Formatos:
+      - "compact" (padrão): árvore só com o nome de cada entrada, cadeias de
+        diretórios com um único filho unidas (`src/main/java/`), e linhas e
+        tamanho de cada arquivo (`agent.py  312L 11K`). Sem repetir o prefixo
+        do caminho, `max_entries` cobre muito mais do repositório;
+      - "paths": uma entrada por linha com o caminho relativo completo e as
+        tags `[DIR]`/`[FILE]`.
+
     Args:
         path: Caminho do diretório a ser listado (relativo ou absoluto).
         max_entries: Máximo de entradas (arquivos/dirs) retornadas no output.
         max_depth: Profundidade máxima de varredura. 1 = apenas o diretório raiz.
         include_hidden: Se True, inclui itens ocultos (prefixo '.').
         follow_symlinks: Se True, permite descer em diretórios que são symlinks.
+        format: "compact" (árvore compacta) ou "paths" (caminhos relativos completos).
 
     Returns:
         String formatada com header e itens listados.
@@ -42,6 +183,7 @@ def list_dir(
     """
     try:
         dir_path = Path(path).resolve()
+        _flush_pending(dir_path)
 
         if not dir_path.exists():
             return f"Erro: O diretório '{path}' não existe."
@@ -50,6 +192,21 @@ def list_dir(
 
         max_entries = max(1, int(max_entries))
         max_depth = max(1, int(max_depth))
+        if format not in ("compact", "paths"):
+            return f"Erro: format '{format}' inválido; use compact ou paths."
+
+        if format == "compact":
+            lines, entry_count, truncated, denied_count = _compact_tree(
+                dir_path, max_entries, max_depth, include_hidden, follow_symlinks
+            )
+            header = (
+                f"Conteúdo de: {dir_path}\n"
+                f"Formato: compact | Max entries: {max_entries} | Max depth: {max_depth}\n"
+                f"{_COMPACT_LEGEND}\n"
+                + "-" * 60
+                + "\n"
+            )
+            return _list_dir_output(header, dir_path, lines, entry_count, truncated, denied_count)
 
         lines: list[str] = []
         truncated = False
@@ -123,30 +280,95 @@ def list_dir(
             + "\n"
         )
 
-        if not lines:
-            return header + f"(vazio) {dir_path}"
-
-        footer_parts = []
-        if truncated:
-            footer_parts.append(f"[TRUNCATED] exibindo {entry_count} de >= {entry_count + 1} entradas")
-        if denied_count:
-            footer_parts.append(f"[DENIED] {denied_count} diretório(s) sem permissão")
-
-        footer = ("\n" + "-" * 60 + "\n" + " | ".join(footer_parts)) if footer_parts else ""
-        return header + "\n".join(lines) + footer
+        return _list_dir_output(header, dir_path, lines, entry_count, truncated, denied_count)
 
     except Exception as e:
         return f"Erro ao listar diretório: {e}"
 
 
+def _list_dir_output(
+    header: str, dir_path: Path, lines: list[str], entry_count: int, truncated: bool, denied_count: int
+) -> str:
+    """Junta header, entradas e rodapé ([TRUNCATED]/[DENIED]) da saída do `list_dir`."""
+    if not lines:
+        return header + f"(vazio) {dir_path}"
+
+    footer_parts = []
+    if truncated:
+        footer_parts.append(f"[TRUNCATED] exibindo {entry_count} de >= {entry_count + 1} entradas")
+    if denied_count:
+        footer_parts.append(f"[DENIED] {denied_count} diretório(s) sem permissão")
+
+    footer = ("\n" + "-" * 60 + "\n" + " | ".join(footer_parts)) if footer_parts else ""
+    return header + "\n".join(lines) + footer
+
+
+async def _alist_dir(**kwargs) -> str:
+    """Versão assíncrona de `list_dir`: a varredura roda em uma thread."""
+    return await asyncio.to_thread(list_dir.func, **kwargs)
+
+
+list_dir.coroutine = _alist_dir
+
+
+def _skeleton_response(file_path: Path, max_lines: int, max_chars: int, force: bool = False) -> str | None:
+    """Esqueleto de `file_path` se ele exceder o orçamento (ou `force`); None para paginar normalmente."""
+    size = file_path.stat().st_size
+    if size > MAX_INDEX_BYTES:
+        # Acima do limite do índice não há esqueleto; evita ler e contar o arquivo à toa
+        return None
+    cached = get_file(file_path)
+    if cached is not None:
+        total_lines = cached.line_count
+        if not force and size <= max_chars and total_lines <= max_lines:
+            return None
+    else:
+        with open(file_path, "rb") as f:
+            total_lines = sum(block.count(b"\n") for block in iter(lambda: f.read(1 << 20), b""))
+    skeleton = file_skeleton(file_path, max_chars)
+    if skeleton is None:
+        return None
+    over_budget = total_lines > max_lines or size > max_chars
+    budget = f" (excede max_lines={max_lines} / max_chars={max_chars})" if over_budget else ""
+    return (
+        f"Arquivo: {file_path}\n"
+        f"Modo: esqueleto | Total: {total_lines} linhas, {size // 1024} KB{budget}\n"
+        "Linhas em [L...] são 1-indexed: leia os trechos com read_file(path, start, end); "
+        'mode="raw" pagina o arquivo desde o início.\n'
+        + "-" * 60
+        + "\n"
+        + skeleton
+    )
+
+
+def _stream_lines(file_path: Path, start: int, end: int, scan: dict) -> Iterator[tuple[int, str]]:
+    """Linhas [start, end] de um arquivo grande, lidas em streaming.
+
+    Preenche `scan` com a última linha vista ("last") e se o fim do arquivo
+    foi alcançado ("eof"), para o header/rodapé do read_file.
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        for i_1idx, raw in enumerate(f, start=1):
+            scan["last"] = i_1idx
+            if i_1idx < start:
+                continue
+            if i_1idx > end:
+                # A linha end+1 existe: há mais conteúdo, sem ler o resto do arquivo
+                scan["eof"] = False
+                return
+            yield i_1idx, raw.rstrip("\n")
+        scan["eof"] = True
+
+
 @tool
 def read_file(
     path: str,
     start: int = 1,
     end: int | None = None,
-    max_lines: int = 400,
-    max_chars: int = 20_000,
+    max_lines: int | None = None,
+    max_chars: int | None = None,
     max_line_chars: int = 4_000,
+    mode: str = "auto",
 ) -> str:
     """
     Lê um arquivo de texto com paginação e limites duros de saída.
@@ -158,6 +380,18 @@ def read_file(
       - força um limite total de caracteres (`max_chars`) no output;
       - corta linhas individuais muito longas (`max_line_chars`).
 
+    Arquivos grandes (modo "auto"): se o arquivo inteiro for pedido (`start=1`
+    sem `end`) e não couber em `max_lines`/`max_chars`, a tool devolve em uma
+    única resposta o esqueleto do arquivo — docstring, imports, constantes,
+    assinaturas de classes/funções/métodos com intervalos de linhas e trechos
+    de nível de módulo (títulos, para Markdown) — em vez da primeira página.
+    Leia depois só os trechos necessários com `start`/`end`.
+
+    Página adaptativa: sem `max_lines`/`max_chars`, o tamanho da página segue
+    a folga de contexto até a próxima sumarização — páginas maiores (menos
+    turnos) com muita folga, menores perto do limite. Com folga desconhecida,
+    vale 400 linhas / 20.000 caracteres.
+
     Observação de indexação:
       - Entrada `start`/`end` é 1-indexed (mais natural para humanos).
       - Saída é numerada em 0-indexed (estilo VS Code), alinhada à esquerda.
@@ -166,12 +400,15 @@ def read_file(
         path: Caminho do arquivo a ser lido (relativo ou absoluto).
         start: Linha inicial (1-indexed, inclusiva).
         end: Linha final (1-indexed, inclusiva). Se None, assume start+max_lines-1.
-        max_lines: Máximo de linhas retornadas no output.
-        max_chars: Máximo aproximado de caracteres retornados no output.
+        max_lines: Máximo de linhas retornadas no output. Se None, adaptativo.
+        max_chars: Máximo aproximado de caracteres retornados no output. Se None, adaptativo.
         max_line_chars: Máximo de caracteres por linha antes de truncar.
+        mode: "auto" (esqueleto para arquivos grandes lidos sem intervalo),
+            "raw" (sempre pagina o conteúdo) ou "skeleton" (sempre o esqueleto).
 
     Returns:
-        String com header (arquivo, intervalo, limites) e linhas numeradas.
+        String com header (arquivo, intervalo, limites) e linhas numeradas,
+        ou o esqueleto do arquivo (header com "Modo: esqueleto").
         Pode incluir marcadores:
           - …[TRUNCATED_LINE] para linhas individuais truncadas;
           - …[TRUNCATED_OUTPUT_MAX_CHARS] se atingir `max_chars`;
@@ -183,6 +420,7 @@ def read_file(
     """
     try:
         file_path = Path(path).resolve()
+        _flush_pending(file_path)
 
         if not file_path.exists():
             return f"Erro: O arquivo '{path}' não existe."
@@ -193,10 +431,22 @@ def read_file(
         if start < 1:
             start = 1
 
+        if max_lines is None or max_chars is None:
+            adaptive_lines, adaptive_chars = page_size(str(file_path))
+            max_lines = adaptive_lines if max_lines is None else max_lines
+            max_chars = adaptive_chars if max_chars is None else max_chars
         max_lines = max(1, int(max_lines))
         max_chars = max(256, int(max_chars))
         max_line_chars = max(256, int(max_line_chars))
 
+        if mode not in ("auto", "raw", "skeleton"):
+            return f"Erro: mode '{mode}' inválido; use auto, raw ou skeleton."
+        if mode == "skeleton" or (mode == "auto" and start == 1 and end is None):
+            skeleton = _skeleton_response(file_path, max_lines, max_chars, force=mode == "skeleton")
+            if skeleton is not None:
+                mark_read(file_path)
+                return skeleton
+
         truncated_by_lines = False
         if end is None:
             end = start + max_lines - 1
@@ -210,48 +460,44 @@ def read_file(
 
         selected: list[str] = []
         chars_used = 0
-        reached_eof = False
         saw_any = False
-        last_line_num_1idx = 0
+        cut = False
+        # Arquivos até MAX_CACHED_FILE_BYTES vêm do cache (offsets de linha); os maiores, em streaming
+        cached = get_file(file_path)
+        if cached is not None:
+            scan = {"last": cached.line_count, "eof": end >= cached.line_count}
+            span = ((i, cached.line(i)) for i in range(start, min(end, cached.line_count) + 1))
+        else:
+            scan = {"last": 0, "eof": False}
+            span = _stream_lines(file_path, start, end, scan)
 
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                for i_1idx, raw in enumerate(f, start=1):
-                    last_line_num_1idx = i_1idx
-                    if i_1idx < start:
-                        continue
-                    if i_1idx > end:
-                        # Tenta detectar se há mais conteúdo sem ler o resto inteiro.
-                        peek = f.readline()
-                        reached_eof = (peek == "")
-                        break
+            for _, line in span:
+                saw_any = True
 
-                    saw_any = True
-                    line = raw.rstrip("\n")
+                if len(line) > max_line_chars:
+                    line = line[:max_line_chars] + " …[TRUNCATED_LINE]"
 
-                    if len(line) > max_line_chars:
-                        line = line[:max_line_chars] + " …[TRUNCATED_LINE]"
+                remaining = max_chars - chars_used
+                if remaining <= 0:
+                    selected.append("…[TRUNCATED_OUTPUT_MAX_CHARS]")
+                    cut = True
+                    break
 
-                    remaining = max_chars - chars_used
-                    if remaining <= 0:
-                        selected.append("…[TRUNCATED_OUTPUT_MAX_CHARS]")
-                        break
+                if len(line) > remaining:
+                    selected.append(line[:remaining] + " …[TRUNCATED_OUTPUT_MAX_CHARS]")
+                    cut = True
+                    break
 
-                    if len(line) > remaining:
-                        selected.append(line[:remaining] + " …[TRUNCATED_OUTPUT_MAX_CHARS]")
-                        break
-
-                    selected.append(line)
-                    chars_used += len(line) + 1  # +1 ~ newline
-
-                else:
-                    reached_eof = True
+                selected.append(line)
+                chars_used += len(line) + 1  # +1 ~ newline
 
         except UnicodeDecodeError:
             return f"Erro: '{path}' parece ser um arquivo binário e não pode ser lido como texto."
         except PermissionError:
             return f"Erro: Sem permissão para ler '{path}'."
 
+        reached_eof, last_line_num_1idx = scan["eof"] and not cut, scan["last"]
         if not saw_any:
             return f"Erro: Linha inicial {start} excede o total de linhas ({last_line_num_1idx})."
 
@@ -280,12 +526,539 @@ def read_file(
             footer_parts.append("[MORE] arquivo tem mais conteúdo além do intervalo")
 
         footer = ("\n" + "-" * 60 + "\n" + " | ".join(footer_parts)) if footer_parts else ""
+        mark_read(file_path)
         return header + "\n".join(numbered_lines) + footer
 
     except Exception as e:
         return f"Erro ao ler arquivo: {e}"
 
 
+async def _aread_file(**kwargs) -> str:
+    """Versão assíncrona de `read_file`: a leitura roda em uma thread."""
+    return await asyncio.to_thread(read_file.func, **kwargs)
+
+
+read_file.coroutine = _aread_file
+
+
+@tool
+def outline(
+    path: str,
+    max_symbols: int = 300,
+    include_docs: bool = True,
+) -> str:
+    """
+    Mostra o outline (símbolos) de um arquivo de código ou de todos os arquivos de um diretório.
+
+    Em vez de ler módulos inteiros, use esta tool para descobrir o que cada
+    arquivo define: classes, métodos, funções e suas assinaturas, com a linha
+    inicial/final (1-indexed) de cada símbolo. Depois leia só o trecho
+    necessário com read_file(path, start=<linha inicial>, end=<linha final>).
+
+    Python é analisado com `ast`; JS/TS, Go, Rust, Java, Kotlin, C#, Ruby,
+    PHP e C/C++ usam parsers leves por regex. O índice é construído em
+    paralelo e fica em cache por mtime, então chamadas repetidas são baratas.
+
+    Args:
+        path: Arquivo de código ou diretório (relativo ou absoluto).
+        max_symbols: Máximo de símbolos listados no output.
+        include_docs: Se True, inclui a primeira linha das docstrings.
+
+    Returns:
+        Outline no formato `kind nome(assinatura)  [Linicial-final]`, com
+        aninhamento por indentação. Pode incluir [TRUNCATED] quando excede
+        `max_symbols`.
+
+    Raises:
+        Nunca propaga exceções para o agente; retorna mensagens de erro em texto.
+    """
+    try:
+        target = Path(path).resolve()
+        _flush_pending(target)
+        if not target.exists():
+            return f"Erro: O caminho '{path}' não existe."
+
+        max_symbols = max(10, int(max_symbols))
+        wait_for_warmup(target)
+
+        if target.is_file():
+            if language_of(target) is None:
+                return f"Erro: Linguagem de '{path}' não suportada pelo outline; use read_file."
+            entries = {target.name: file_outline(target)}
+            header = f"Outline de: {target}\n"
+        else:
+            entries = build_index(target, persist=is_warmed_root(target))
+            header = f"Outline de: {target} ({len(entries)} arquivos de código)\n"
+            if not entries:
+                return header + "(nenhum arquivo de código suportado encontrado)"
+
+        lines: list[str] = []
+        shown_files = 0
+        truncated = False
+        for rel in sorted(entries):
+            file_lines = format_outline(rel, entries[rel], with_docs=include_docs)
+            if lines and len(lines) + len(file_lines) > max_symbols:
+                truncated = True
+                break
+            if len(file_lines) > max_symbols:
+                truncated = True
+            lines.extend(file_lines[:max_symbols])
+            shown_files += 1
+
+        footer = ""
+        if truncated:
+            footer = (
+                "\n" + "-" * 60 + "\n"
+                f"[TRUNCATED] exibindo {len(lines)} símbolos de {shown_files}/{len(entries)} arquivos; "
+                "peça o outline de um subdiretório ou arquivo específico"
+            )
+        return header + "-" * 60 + "\n" + "\n".join(lines) + footer
+
+    except Exception as e:
+        return f"Erro ao gerar outline: {e}"
+
+
+async def _aoutline(**kwargs) -> str:
+    """Versão assíncrona de `outline`: a indexação roda em uma thread."""
+    return await asyncio.to_thread(outline.func, **kwargs)
+
+
+outline.coroutine = _aoutline
+
+
+@tool
+def search_code(
+    query: str,
+    path: str,
+    regex: bool = False,
+    case_sensitive: bool = True,
+    glob: str | None = None,
+    exclude: str | None = None,
+    max_results: int = 100,
+    max_per_file: int = 5,
+    max_chars: int = 20_000,
+    max_line_chars: int = 300,
+) -> str:
+    """
+    Busca texto (literal ou regex) em todos os arquivos de texto de um diretório.
+
+    Use para descobrir onde um símbolo é definido/usado, quem importa um módulo,
+    onde uma variável de ambiente é lida etc., em vez de listar e ler arquivos
+    às cegas. Retorna uma linha por ocorrência, no formato `arquivo:linha: texto`;
+    a linha é 1-indexed e pode ser usada direto em read_file(start=..., end=...).
+
+    Args:
+        query: Texto a buscar. Literal por padrão; expressão regular se `regex=True`.
+        path: Diretório (ou arquivo) onde buscar.
+        regex: Se True, interpreta `query` como expressão regular (sintaxe do `re`).
+        case_sensitive: Se False, ignora maiúsculas/minúsculas.
+        glob: Globs de arquivos a incluir, separados por vírgula (ex.: "*.py,*.pyi" ou "src/**/*.ts").
+        exclude: Globs de arquivos a ignorar (ex.: "*test*").
+        max_results: Máximo de ocorrências no total.
+        max_per_file: Máximo de ocorrências por arquivo.
+        max_chars: Máximo aproximado de caracteres retornados no output.
+        max_line_chars: Máximo de caracteres por linha antes de truncar.
+
+    Returns:
+        Header (consulta, arquivos buscados), ocorrências e rodapé com totais.
+        Pode incluir marcadores:
+          - …[TRUNCATED_LINE] para linhas individuais truncadas;
+          - …[TRUNCATED_OUTPUT_MAX_CHARS] se atingir `max_chars`;
+          - [TRUNCATED] se a busca parou em `max_results`;
+          - [MORE] se algum arquivo tinha mais ocorrências que `max_per_file`.
+
+    Raises:
+        Nunca propaga exceções para o agente; retorna mensagens de erro em texto.
+    """
+    try:
+        target = Path(path).resolve()
+        _flush_pending(target)
+        if not target.exists():
+            return f"Erro: O caminho '{path}' não existe."
+        if not query:
+            return "Erro: A consulta está vazia."
+
+        max_chars = max(256, int(max_chars))
+        max_line_chars = max(80, int(max_line_chars))
+
+        try:
+            result = search(
+                target,
+                query,
+                regex=regex,
+                case_sensitive=case_sensitive,
+                include=glob,
+                exclude=exclude,
+                max_results=max_results,
+                max_per_file=max_per_file,
+                max_line_chars=max_line_chars,
+            )
+        except re.error as e:
+            return f"Erro: Expressão regular inválida: {e}"
+
+        mode = "regex" if regex else "literal"
+        header = (
+            f"Busca: {query!r} ({mode}) em {target}\n"
+            f"Arquivos buscados: {result.files_searched} | Tempo: {result.elapsed_s * 1000:.0f} ms\n"
+            + "-" * 60
+            + "\n"
+        )
+        if not result.matches:
+            return header + "(nenhuma ocorrência)"
+
+        lines: list[str] = []
+        chars_used = 0
+        for rel, line_no, text in result.matches:
+            line = f"{rel}:{line_no}: {text}"
+            if chars_used + len(line) > max_chars:
+                lines.append("…[TRUNCATED_OUTPUT_MAX_CHARS]")
+                break
+            lines.append(line)
+            chars_used += len(line) + 1
+
+        footer_parts = [f"{len(result.matches)} ocorrências em {result.files_matched} arquivos"]
+        if result.truncated:
+            footer_parts.append("[TRUNCATED] busca interrompida em max_results; refine a consulta ou use glob")
+        if result.capped_files:
+            footer_parts.append(f"[MORE] {result.capped_files} arquivos com mais de {max_per_file} ocorrências")
+        return header + "\n".join(lines) + "\n" + "-" * 60 + "\n" + " | ".join(footer_parts)
+
+    except Exception as e:
+        return f"Erro ao buscar: {e}"
+
+
+async def _asearch_code(**kwargs) -> str:
+    """Versão assíncrona de `search_code`: a busca roda em uma thread."""
+    return await asyncio.to_thread(search_code.func, **kwargs)
+
+
+search_code.coroutine = _asearch_code
+
+
+def _find_graph_node(graph, root: Path, module: str) -> str | None:
+    """Nó do grafo para um caminho (absoluto/relativo) ou nome de módulo Python."""
+    candidate = Path(module)
+    if candidate.is_absolute():
+        try:
+            module = candidate.resolve().relative_to(root).as_posix()
+        except ValueError:
+            return None
+    module = module.strip().removeprefix("./")
+    if module in graph.nodes:
+        return module
+    for option in (module + "/", module.replace(".", "/") + ".py", module.replace(".", "/") + "/__init__.py"):
+        if option in graph.nodes:
+            return option
+    # Sufixo único (ex.: "server/app.py" para "src/server/app.py")
+    matches = [node for node in graph.nodes if node.endswith("/" + module)]
+    return matches[0] if len(matches) == 1 else None
+
+
+@tool
+def import_graph(
+    path: str,
+    view: str = "summary",
+    module: str | None = None,
+    limit: int = 20,
+    max_chars: int = 20_000,
+) -> str:
+    """
+    Consulta o grafo de imports internos do repositório (Python, JS/TS e Go).
+
+    Use no início da análise para descobrir os módulos centrais (mais
+    importados), os pontos de entrada e os ciclos de dependência, e então
+    priorizar a leitura desses arquivos em vez de ler o repositório em largura.
+
+    Views:
+      - "summary": módulos centrais (PageRank, fan-in/fan-out), pontos de
+        entrada, ciclos e dependências externas mais usadas;
+      - "module": imports, importadores e dependências externas de `module`;
+      - "cycles": todos os ciclos de import;
+      - "entry_points": todos os pontos de entrada detectados.
+
+    Args:
+        path: Raiz do repositório.
+        view: "summary", "module", "cycles" ou "entry_points".
+        module: Arquivo (caminho relativo à raiz ou absoluto), pacote Go
+            (diretório) ou nome de módulo Python, usado com view="module".
+        limit: Máximo de itens por lista.
+        max_chars: Máximo aproximado de caracteres retornados no output.
+
+    Returns:
+        Texto com as listas pedidas. Pode terminar com …[TRUNCATED_OUTPUT_MAX_CHARS].
+
+    Raises:
+        Nunca propaga exceções para o agente; retorna mensagens de erro em texto.
+    """
+    try:
+        root = Path(path).resolve()
+        if not root.is_dir():
+            return f"Erro: '{path}' não é um diretório."
+        if view not in ("summary", "module", "cycles", "entry_points"):
+            return f"Erro: view '{view}' inválida; use summary, module, cycles ou entry_points."
+
+        limit = max(1, int(limit))
+        max_chars = max(256, int(max_chars))
+        wait_for_warmup(root)
+        graph = build_graph(root, persist=is_warmed_root(root))
+        if not graph.nodes:
+            return f"Grafo de imports: {root}\n(nenhum arquivo Python, JS/TS ou Go encontrado)"
+
+        rank = graph.pagerank()
+        languages: dict[str, int] = {}
+        for info in graph.nodes.values():
+            languages[info["language"]] = languages.get(info["language"], 0) + 1
+        header = (
+            f"Grafo de imports: {root}\n"
+            f"Módulos: {len(graph.nodes)} ({', '.join(f'{k}: {v}' for k, v in sorted(languages.items()))}) "
+            f"| Imports internos: {graph.edge_count}\n"
+            + "-" * 60
+        )
+        lines: list[str] = []
+
+        def _describe(node: str) -> str:
+            return (
+                f"{node}  rank {rank[node]:.4f} | importado por {graph.fan_in(node)} "
+                f"| importa {graph.fan_out(node)} | {graph.nodes[node]['lines']} linhas"
+            )
+
+        def _list(title: str, items: list[str], total: int) -> None:
+            lines.append(f"{title} ({total}):")
+            lines.extend(f"  - {item}" for item in items[:limit])
+            if total > limit:
+                lines.append(f"  ... e mais {total - limit}")
+
+        cycles = graph.cycles()
+        entries = [f"{node} ({reason})" for node, reason in sorted(graph.entry_points.items())]
+
+        if view == "summary":
+            lines.append("Módulos centrais (PageRank sobre os imports, sem testes):")
+            lines.extend(f"  {i}. {_describe(node)}" for i, node in enumerate(graph.central(limit), start=1))
+            _list("Pontos de entrada", entries, len(entries))
+            _list("Ciclos de import", [", ".join(c) for c in cycles], len(cycles))
+            external = graph.external_usage()
+            _list("Dependências externas mais usadas", [f"{dep} ({n} módulos)" for dep, n in external], len(external))
+            orphans = [
+                node for node in sorted(graph.nodes)
+                if not graph.fan_in(node) and node not in graph.entry_points and not is_test_path(node)
+            ]
+            _list("Módulos que nenhum outro importa (fora testes e entry points)", orphans, len(orphans))
+        elif view == "cycles":
+            _list("Ciclos de import", [f"[{len(c)}] " + ", ".join(c) for c in cycles], len(cycles))
+        elif view == "entry_points":
+            _list("Pontos de entrada", entries, len(entries))
+        else:
+            if not module:
+                return "Erro: informe `module` para view='module'."
+            node = _find_graph_node(graph, root, module)
+            if node is None:
+                return f"Erro: módulo '{module}' não encontrado no grafo (use o caminho relativo à raiz)."
+            lines.append(_describe(node))
+            if node in graph.entry_points:
+                lines.append(f"Ponto de entrada: {graph.entry_points[node]}")
+            cycle = next((c for c in cycles if node in c), None)
+            if cycle:
+                lines.append(f"Em ciclo com: {', '.join(n for n in cycle if n != node)}")
+            by_rank = lambda nodes: sorted(nodes, key=lambda n: (-rank[n], n))  # noqa: E731
+            _list("Importa", by_rank(graph.edges[node]), len(graph.edges[node]))
+            _list("Importado por", by_rank(graph.reverse[node]), len(graph.reverse[node]))
+            _list("Dependências externas", sorted(graph.external[node]), len(graph.external[node]))
+
+        body = "\n".join(lines)
+        if len(body) > max_chars:
+            body = body[:max_chars] + " …[TRUNCATED_OUTPUT_MAX_CHARS]"
+        return header + "\n" + body
+
+    except Exception as e:
+        return f"Erro ao consultar o grafo de imports: {e}"
+
+
+async def _aimport_graph(**kwargs) -> str:
+    """Versão assíncrona de `import_graph`: a construção do grafo roda em uma thread."""
+    return await asyncio.to_thread(import_graph.func, **kwargs)
+
+
+import_graph.coroutine = _aimport_graph
+
+
+@tool
+def next_files_to_read(
+    path: str,
+    count: int = 10,
+    include_tests: bool = False,
+) -> str:
+    """
+    Retorna os próximos arquivos mais importantes do repositório que ainda não foram lidos.
+
+    O ranking é calculado localmente antes da exploração, combinando pontos de
+    entrada, centralidade no grafo de imports, tamanho, atividade recente no
+    git e o tipo do arquivo (README/manifests > código > configuração > testes).
+    Arquivos já lidos com read_file nesta execução saem da fila, então chamadas
+    sucessivas avançam pelo ranking.
+
+    Args:
+        path: Raiz do repositório.
+        count: Quantos arquivos retornar.
+        include_tests: Se True, inclui arquivos de teste na fila.
+
+    Returns:
+        Lista numerada `caminho  score | motivos`, do mais importante para o menos.
+
+    Raises:
+        Nunca propaga exceções para o agente; retorna mensagens de erro em texto.
+    """
+    try:
+        root = Path(path).resolve()
+        if not root.is_dir():
+            return f"Erro: '{path}' não é um diretório."
+
+        count = min(max(1, int(count)), 50)
+        wait_for_warmup(root)
+        queue, total, already_read = next_files(
+            root, count=count, include_tests=include_tests, persist=is_warmed_root(root)
+        )
+        header = (
+            f"Próximos arquivos a ler em: {root}\n"
+            f"Arquivos ranqueados: {total} | Já lidos nesta execução: {already_read}\n"
+            + "-" * 60
+            + "\n"
+        )
+        if not queue:
+            return header + "(todos os arquivos ranqueados já foram lidos)"
+
+        lines = []
+        for i, item in enumerate(queue, start=1):
+            details = ", ".join(item.reasons)
+            size = f"{item.lines} linhas" if item.lines is not None else ""
+            suffix = " | ".join(part for part in (details, size) if part)
+            lines.append(f"{i:>2}. {item.rel}  score {item.score:.2f}" + (f" | {suffix}" if suffix else ""))
+        return header + "\n".join(lines)
+
+    except Exception as e:
+        return f"Erro ao calcular o ranking de arquivos: {e}"
+
+
+async def _anext_files_to_read(**kwargs) -> str:
+    """Versão assíncrona de `next_files_to_read`: o ranking roda em uma thread."""
+    return await asyncio.to_thread(next_files_to_read.func, **kwargs)
+
+
+next_files_to_read.coroutine = _anext_files_to_read
+
+
+@tool
+def notes(
+    path: str,
+    action: str = "list",
+    section: str | None = None,
+    content: str | None = None,
+    document: str = "draft",
+    max_chars: int = 20_000,
+) -> str:
+    """
+    Caderno de notas da análise, em memória e endereçado por seção (substitui o DRAFT.md).
+
+    Em vez de anexar conclusões a um arquivo e relê-lo inteiro, grave cada
+    conclusão em uma seção nomeada e consulte só o que precisar. As seções
+    são salvas de forma atômica a cada alteração.
+
+    Documentos:
+      - "draft": notas de trabalho da análise;
+      - "onboarding": seções do documento final; `action="render"` grava o
+        ONBOARDING.md na raiz com todas elas, na ordem de criação (em uma
+        reanálise incremental, grava ONBOARDING.update.md, mesclado depois).
+
+    Actions:
+      - "list": lista compacta das seções (título, linhas, caracteres);
+      - "get": conteúdo de `section` (ou do documento inteiro, se omitida);
+      - "upsert": cria ou substitui `section` com `content`;
+      - "append": adiciona `content` ao final de `section` (cria se não existir);
+      - "delete": remove `section`;
+      - "render": grava o ONBOARDING.md a partir do documento "onboarding";
+        `content`, se informado, vai antes das seções (ex.: título e introdução).
+
+    Args:
+        path: Raiz do repositório analisado.
+        action: "list", "get", "upsert", "append", "delete" ou "render".
+        section: Título da seção (sem "## "). Títulos são comparados sem
+            diferenciar maiúsculas nem pontuação.
+        content: Conteúdo em Markdown para "upsert"/"append" (ou o preâmbulo do "render").
+        document: "draft" ou "onboarding".
+        max_chars: Máximo aproximado de caracteres retornados por "get".
+
+    Returns:
+        Confirmação curta, a listagem das seções ou o conteúdo pedido.
+
+    Raises:
+        Nunca propaga exceções para o agente; retorna mensagens de erro em texto.
+    """
+    try:
+        root = Path(path).resolve()
+        if not root.is_dir():
+            return f"Erro: '{path}' não é um diretório (informe a raiz do repositório)."
+        if action not in ("list", "get", "upsert", "append", "delete", "render"):
+            return f"Erro: action '{action}' inválida; use list, get, upsert, append, delete ou render."
+        if document not in DOCUMENTS:
+            return f"Erro: document '{document}' inválido; use draft ou onboarding."
+        store = get_store(root)
+
+        if action == "list":
+            sections = store.sections(document)
+            if not sections:
+                return f"Notas ({document}): nenhuma seção"
+            lines = [
+                f"{i:>2}. {s['title']}  ({s['content'].count(chr(10)) + 1} linhas, {len(s['content'])} chars)"
+                for i, s in enumerate(sections, start=1)
+            ]
+            total = sum(len(s["content"]) for s in sections)
+            return f"Notas ({document}): {len(sections)} seções, {total} chars\n" + "\n".join(lines)
+
+        if action == "render":
+            sections = store.sections("onboarding")
+            if not sections:
+                return "Erro: o documento 'onboarding' não tem seções; grave-as com document='onboarding'."
+            output = store.render_document(preamble=content or "", filename=render_target())
+            invalidate_path(output)
+            return f"Arquivo criado/sobrescrito com sucesso: {output} ({len(sections)} seções)"
+
+        if action == "get" and not section:
+            text = store.render_markdown(document)
+            if not text:
+                return f"Notas ({document}): nenhuma seção"
+        else:
+            if not section:
+                return f"Erro: informe `section` para action='{action}'."
+            if action in ("upsert", "append"):
+                if content is None:
+                    return f"Erro: informe `content` para action='{action}'."
+                saved = store.upsert(document, section, content, append=action == "append")
+                return f"Seção '{saved['title']}' ({document}) salva: {len(saved['content'])} chars"
+            if action == "delete":
+                if not store.delete(document, section):
+                    return f"Erro: seção '{section}' não existe em {document}."
+                return f"Seção '{section}' ({document}) removida"
+            found = store.get(document, section)
+            if found is None:
+                return f"Erro: seção '{section}' não existe em {document}; use action='list'."
+            text = f"## {found['title']}\n\n{found['content']}"
+
+        max_chars = max(256, int(max_chars))
+        if len(text) > max_chars:
+            text = text[:max_chars] + " …[TRUNCATED_OUTPUT_MAX_CHARS]"
+        return text
+
+    except Exception as e:
+        return f"Erro nas notas: {e}"
+
+
+async def _anotes(**kwargs) -> str:
+    """Versão assíncrona de `notes`: a gravação atômica roda em uma thread."""
+    return await asyncio.to_thread(notes.func, **kwargs)
+
+
+notes.coroutine = _anotes
+
+
 @tool
 def write_file(
     path: str,
@@ -294,22 +1067,26 @@ def write_file(
     max_content_chars: int = 200_000,
 ) -> str:
     """
-    Escreve conteúdo em um arquivo com limite duro no tamanho do input.
+    Escreve conteúdo em um arquivo.
 
-    Motivo do limite: se o agente tentar escrever blobs muito grandes (por exemplo,
-    um arquivo inteiro “na raça”), isso pode estourar o contexto e também gerar
-    logs/traços enormes.
+    O conteúdo é sempre gravado inteiro. Acima de `max_content_chars` a resposta
+    avisa o agente: documentos grandes devem ser escritos seção a seção (tool
+    `notes` com document="onboarding" e action="render"), já que um único
+    argumento gigante atrasa o primeiro byte em disco e incha contexto e traces.
+
+    A sobrescrita é atômica (arquivo temporário + rename): uma queda no meio da
+    escrita nunca deixa o arquivo truncado. Com o write-behind ligado
+    (`--write-behind`), appends ficam em um buffer e são gravados em lote.
 
     Args:
         path: Caminho do arquivo a ser criado/sobrescrito (relativo ou absoluto).
         content: Conteúdo textual a ser escrito.
         append: Se True, adiciona ao final do arquivo; se False, sobrescreve.
-        max_content_chars: Máximo de caracteres aceitos em `content`. Se exceder,
-            o conteúdo é truncado e um marcador é adicionado.
+        max_content_chars: Tamanho de `content` a partir do qual a resposta sugere
+            a escrita seção a seção (nada é truncado).
 
     Returns:
         Mensagem de confirmação com o caminho resolvido do arquivo.
-        Se truncar, adiciona o marcador: ...[TRUNCATED_INPUT_MAX_CHARS]
 
     Raises:
         Nunca propaga exceções para o agente; retorna mensagens de erro em texto.
@@ -321,20 +1098,26 @@ def write_file(
         max_content_chars = max(1_000, int(max_content_chars))
         if content is None:
             content = ""
+        hint = ""
         if len(content) > max_content_chars:
-            content = content[:max_content_chars] + "\n...[TRUNCATED_INPUT_MAX_CHARS]"
+            hint = (
+                f"\n[LARGE_CONTENT] {len(content)} chars gravados por inteiro; para documentos grandes, "
+                'escreva cada seção com notes(document="onboarding") e grave com notes(action="render").'
+            )
 
         if append:
-            with open(file_path, "a", encoding="utf-8") as f:
-                if f.tell() > 0:
-                    f.write("\n\n")
-                f.write(content)
+            buffered = append_text(file_path, content)
             action = "teve conteúdo adicionado"
         else:
-            file_path.write_text(content, encoding="utf-8")
+            atomic_write_text(file_path, content)
+            buffered = False
             action = "criado/sobrescrito"
 
-        return f"Arquivo {action} com sucesso: {file_path}"
+        if buffered:
+            # Gravado em lote depois (write-behind); as tools de leitura gravam antes de ler
+            return f"Arquivo {action} com sucesso: {file_path} (em buffer){hint}"
+        invalidate_path(file_path)
+        return f"Arquivo {action} com sucesso: {file_path}{hint}"
 
     except PermissionError:
         return f"Erro: Sem permissão para escrever em '{path}'."
@@ -364,13 +1147,18 @@ def remove_draft_file(path: str) -> str:
     """
     try:
         p = Path(path).resolve()
-        
+        # Appends ainda em buffer seriam gravados só para serem apagados em seguida
+        had_pending = discard_writes(p)
+
         if not p.exists():
+            if had_pending:
+                return f"Arquivo removido com sucesso: {p}"
             return f"Erro: O arquivo '{p}' não existe."
         if not p.is_file():
             return f"Erro: '{p}' não é um arquivo."
         
         os.remove(p)
+        invalidate_path(p)
         
         return f"Arquivo removido com sucesso: {p}"
 
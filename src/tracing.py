@@ -0,0 +1,150 @@
+"""Tracing opcional das execuções (Langfuse ou sink no-op).
+
+O `CallbackHandler` do Langfuse apenas enfileira spans no client; o custo
+está no `flush()`, que é uma chamada de rede bloqueante. Em vez de chamar
+`flush()` a cada passo do agente, o CLI notifica um `BackgroundExporter`:
+
+  - as notificações vão para uma fila limitada e são coalescidas (vários
+    passos seguidos geram um único flush);
+  - um flush periódico roda a cada `flush_interval` segundos;
+  - `close()` faz um último flush, bloqueante, ao final da execução.
+
+O sink `noop` substitui o Langfuse por um handler/client locais que só
+contam eventos, permitindo medir o overhead de `--trace` sem servidor.
+"""
+
+import queue
+import threading
+import time
+from typing import Any
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+TRACE_SINKS = ("langfuse", "noop")
+
+
+class NoopTraceHandler(BaseCallbackHandler):
+    """Callback handler que apenas conta os eventos recebidos."""
+
+    def __init__(self) -> None:
+        self.events = 0
+        self._lock = threading.Lock()
+
+    def _count(self, *args: Any, **kwargs: Any) -> None:
+        with self._lock:
+            self.events += 1
+
+    on_chat_model_start = _count
+    on_llm_start = _count
+    on_llm_end = _count
+    on_llm_error = _count
+    on_chain_start = _count
+    on_chain_end = _count
+    on_chain_error = _count
+    on_tool_start = _count
+    on_tool_end = _count
+    on_tool_error = _count
+
+
+class NoopTraceClient:
+    """Client no-op com a mesma interface de flush do client Langfuse."""
+
+    def flush(self) -> None:
+        return None
+
+
+class BackgroundExporter:
+    """Executa `client.flush()` em uma thread de fundo, fora do loop do agente."""
+
+    def __init__(self, client, flush_interval: float = 5.0, max_pending: int = 1) -> None:
+        self.client = client
+        self.flush_interval = max(0.1, float(flush_interval))
+        self.flushes = 0
+        self.flush_time_s = 0.0
+        self.errors = 0
+        self.last_error: str | None = None
+        self._requests: queue.Queue[bool] = queue.Queue(maxsize=max(1, int(max_pending)))
+        self._stop = threading.Event()
+        self._dirty = False
+        self._flush_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def notify(self) -> None:
+        """Sinaliza que há spans novos. Não bloqueia; pedidos extras são coalescidos."""
+        self._dirty = True
+        try:
+            self._requests.put_nowait(True)
+        except queue.Full:
+            pass
+
+    def flush(self) -> None:
+        """Flush síncrono (usado pela thread de fundo e no encerramento)."""
+        with self._flush_lock:
+            self._dirty = False
+            t0 = time.perf_counter()
+            try:
+                self.client.flush()
+            except Exception as e:
+                # Falhas de exportação nunca devem derrubar a análise
+                self.errors += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+            finally:
+                self.flushes += 1
+                self.flush_time_s += time.perf_counter() - t0
+
+    def close(self) -> None:
+        """Para a thread de fundo e faz o flush final."""
+        self._stop.set()
+        try:
+            self._requests.put_nowait(True)
+        except queue.Full:
+            pass
+        self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "flushes": self.flushes,
+            "flush_time_s": round(self.flush_time_s, 4),
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
+
+    def _run(self) -> None:
+        last_flush = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                self._requests.get(timeout=self.flush_interval)
+            except queue.Empty:
+                pass
+            if self._stop.is_set():
+                return
+            # Respeita o intervalo: pedidos dentro da janela esperam o próximo flush
+            wait = self.flush_interval - (time.monotonic() - last_flush)
+            if wait > 0 and self._stop.wait(wait):
+                return
+            if self._dirty:
+                self.flush()
+            last_flush = time.monotonic()
+
+
+def create_tracing(sink: str = "langfuse", flush_interval: float = 5.0):
+    """Cria o callback handler e o exporter de tracing.
+
+    Args:
+        sink: 'langfuse' (envia para o servidor configurado) ou 'noop' (local).
+        flush_interval: Intervalo mínimo, em segundos, entre flushes de fundo.
+
+    Returns:
+        Tupla (callback handler, BackgroundExporter).
+    """
+    if sink == "noop":
+        return NoopTraceHandler(), BackgroundExporter(NoopTraceClient(), flush_interval)
+    if sink != "langfuse":
+        raise ValueError(f"Sink de tracing desconhecido: {sink}")
+
+    from langfuse import get_client
+    from langfuse.langchain import CallbackHandler
+
+    return CallbackHandler(), BackgroundExporter(get_client(), flush_interval)